@@ -0,0 +1,1069 @@
+"""
+Fake ODK Central server used to benchmark the ODK client, the cache and the
+export paths offline.
+
+It implements the subset of the ODK Central API called by
+core_apps/odk/services (sessions, projects, forms, drafts, versions,
+submissions, OData, CSV export, app users, assignments and public links) on
+top of a synthetic dataset. Submissions are generated on the fly from their
+index, so forms with millions of submissions cost no memory, and large
+responses (OData, CSV) are streamed.
+
+Latency and errors can be injected, either from the command line or at
+runtime with POST /__fake__/config:
+
+    python -m benchmarks.fake_central --port 8383 --submissions 1000000 \
+        --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+
+Then point the application at it with ODK_CENTRAL_URL=http://127.0.0.1:8383/v1.
+"""
+
+import argparse
+import bisect
+import csv
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, quote
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+VILLAGES = ["Agou", "Badou", "Kpalime", "Notse", "Tsevie", "Vogan", "Aneho", "Atakpame"]
+NAMES = ["Afi", "Kodjo", "Ama", "Yao", "Akossiwa", "Komla", "Abla", "Kossi", "Essi"]
+STREAM_CHUNK = 500
+
+
+@dataclass
+class FakeCentralConfig:
+    """Dataset size and fault injection settings, changeable at runtime"""
+
+    projects: int = 3
+    forms_per_project: int = 4
+    submissions: int = 1000
+    # Per form overrides, keyed by "<projectId>/<xmlFormId>"
+    form_submissions: dict = field(default_factory=dict)
+    versions_per_form: int = 3
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Probability of a request hanging for hang_seconds before answering
+    hang_rate: float = 0.0
+    hang_seconds: float = 30.0
+    # Requests per second over which Central answers 429 (0: no limit)
+    rate_limit: float = 0.0
+    seed: int = 42
+
+    def update(self, values: dict) -> None:
+        for key, value in values.items():
+            if not hasattr(self, key):
+                raise KeyError(key)
+            setattr(self, key, value)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, code: float = 404.1):
+        self.status = status
+        self.message = message
+        self.code = code
+
+
+def _rng(*parts) -> random.Random:
+    return random.Random(":".join(str(part) for part in parts))
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class Dataset:
+    """Deterministic synthetic projects, forms and submissions"""
+
+    def __init__(self, config: FakeCentralConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.created_projects = {}
+        self.deleted_projects = set()
+        self.created_forms = {}
+        self.deleted_forms = set()
+        self.drafts = {}
+        self.app_users = {}
+        self.assignments = {}
+        self.public_links = {}
+        self.audits = []
+        self.next_id = 10_000
+
+    def new_id(self) -> int:
+        with self.lock:
+            self.next_id += 1
+            return self.next_id
+
+    def audit(self, action: str, actee: dict, details: dict | None = None) -> None:
+        """Log an event in the /audits feed, as ODK Central does for its changes"""
+        with self.lock:
+            self.audits.append(
+                {
+                    "actorId": 1,
+                    "action": action,
+                    "acteeId": actee.get("acteeId") or uuid.uuid4().hex,
+                    "actee": actee,
+                    "details": details,
+                    "loggedAt": _iso(datetime.now(timezone.utc)),
+                }
+            )
+
+    # Projects -------------------------------------------------------------
+
+    def project_ids(self) -> list:
+        ids = [pid for pid in range(1, self.config.projects + 1)]
+        ids += list(self.created_projects)
+        return [pid for pid in ids if pid not in self.deleted_projects]
+
+    def project(self, project_id: int) -> dict:
+        if project_id not in self.project_ids():
+            raise HTTPError(404, "Could not find the resource you were looking for.")
+        if project_id in self.created_projects:
+            return self.created_projects[project_id]
+        return self._synthetic_project(project_id)
+
+    @staticmethod
+    def _synthetic_project(project_id: int) -> dict:
+        return {
+            "id": project_id,
+            "name": f"Projet {project_id}",
+            "description": f"Projet synthétique {project_id}",
+            "archived": False,
+            "keyId": None,
+            "createdAt": _iso(EPOCH),
+            "updatedAt": None,
+            "deletedAt": None,
+        }
+
+    # Forms ----------------------------------------------------------------
+
+    def form_ids(self, project_id: int) -> list:
+        self.project(project_id)
+        ids = []
+        if project_id not in self.created_projects:
+            ids = [f"form_{n}" for n in range(1, self.config.forms_per_project + 1)]
+        ids += [fid for (pid, fid) in self.created_forms if pid == project_id]
+        return [fid for fid in ids if (project_id, fid) not in self.deleted_forms]
+
+    def submission_count(self, project_id: int, form_id: str) -> int:
+        if (project_id, form_id) in self.created_forms:
+            return 0
+        key = f"{project_id}/{form_id}"
+        return int(self.config.form_submissions.get(key, self.config.submissions))
+
+    def versions(self, project_id: int, form_id: str) -> list:
+        if (project_id, form_id) in self.created_forms:
+            return [self.created_forms[(project_id, form_id)]["version"]]
+        return [f"v{n}" for n in range(1, self.config.versions_per_form + 1)]
+
+    def form(self, project_id: int, form_id: str, extended: bool = False) -> dict:
+        if form_id not in self.form_ids(project_id):
+            raise HTTPError(404, "Could not find the resource you were looking for.")
+        version = self.versions(project_id, form_id)[-1]
+        digest = hashlib.md5(f"{project_id}/{form_id}/{version}".encode()).hexdigest()
+        form = {
+            "projectId": project_id,
+            "xmlFormId": form_id,
+            "name": form_id.replace("_", " ").title(),
+            "version": version,
+            "enketoId": digest[:10],
+            "enketoOnceId": digest[10:30],
+            "hash": digest,
+            "keyId": None,
+            "state": "open",
+            "publishedAt": _iso(EPOCH),
+            "createdAt": _iso(EPOCH),
+            "updatedAt": None,
+        }
+        form.update(self.created_forms.get((project_id, form_id), {}))
+        if extended:
+            count = self.submission_count(project_id, form_id)
+            form["submissions"] = count
+            form["reviewStates"] = {"received": count, "hasIssues": 0, "edited": 0}
+            form["lastSubmission"] = (
+                _iso(self.submission_date(count - 1)) if count else None
+            )
+            form["createdBy"] = {"id": 1, "displayName": "Fake Central"}
+        return form
+
+    def form_xml(self, project_id: int, form_id: str, version: str) -> str:
+        if version not in self.versions(project_id, form_id):
+            raise HTTPError(404, "Could not find the resource you were looking for.")
+        # Later versions add fields, so that version diffs are not empty
+        extra = self.versions(project_id, form_id).index(version)
+        extra_fields = "".join(f"<note_{n}/>" for n in range(extra))
+        extra_binds = "".join(
+            f'<bind nodeset="/data/note_{n}" type="string"/>' for n in range(extra)
+        )
+        extra_body = "".join(
+            f'<input ref="/data/note_{n}"><label>Note {n}</label></input>'
+            for n in range(extra)
+        )
+        return f"""<?xml version="1.0"?>
+<h:html xmlns="http://www.w3.org/2002/xforms" xmlns:h="http://www.w3.org/1999/xhtml" xmlns:jr="http://openrosa.org/javarosa" xmlns:odk="http://www.opendatakit.org/xforms">
+  <h:head>
+    <h:title>{form_id}</h:title>
+    <model odk:xforms-version="1.0.0">
+      <instance>
+        <data id="{form_id}" version="{version}">
+          <respondent_name/><age/><village/><consent/><visit_date/><location/>
+          <household_size/><household jr:template=""><member_name/><member_age/></household>
+          {extra_fields}<meta><instanceID/></meta>
+        </data>
+      </instance>
+      <bind nodeset="/data/respondent_name" type="string" required="true()"/>
+      <bind nodeset="/data/age" type="int" constraint=". &gt;= 18"/>
+      <bind nodeset="/data/village" type="string"/>
+      <bind nodeset="/data/consent" type="string"/>
+      <bind nodeset="/data/visit_date" type="date"/>
+      <bind nodeset="/data/location" type="geopoint"/>
+      <bind nodeset="/data/household_size" type="int"/>
+      <bind nodeset="/data/household/member_name" type="string"/>
+      <bind nodeset="/data/household/member_age" type="int"/>
+      {extra_binds}<bind nodeset="/data/meta/instanceID" type="string" readonly="true()" jr:preload="uid"/>
+    </model>
+  </h:head>
+  <h:body>
+    <input ref="/data/respondent_name"><label>Nom</label></input>
+    <input ref="/data/age"><label>Age</label></input>
+    <select1 ref="/data/village"><label>Village</label></select1>
+    <select1 ref="/data/consent"><label>Consentement</label></select1>
+    <input ref="/data/visit_date"><label>Date de visite</label></input>
+    <input ref="/data/location"><label>Position</label></input>
+    <input ref="/data/household_size"><label>Taille du ménage</label></input>
+    <group ref="/data/household"><repeat nodeset="/data/household">
+      <input ref="/data/household/member_name"><label>Nom</label></input>
+      <input ref="/data/household/member_age"><label>Age</label></input>
+    </repeat></group>
+    {extra_body}
+  </h:body>
+</h:html>
+"""
+
+    # Submissions ----------------------------------------------------------
+
+    def submission_date(self, index: int) -> datetime:
+        return EPOCH + timedelta(minutes=7 * index)
+
+    def submission(self, project_id: int, form_id: str, index: int) -> dict:
+        """Raw values of the index-th submission, identical across calls"""
+        rng = _rng(self.config.seed, project_id, form_id, index)
+        count = max(1, self.submission_count(project_id, form_id))
+        instance_id = f"uuid:{uuid.UUID(int=rng.getrandbits(128), version=4)}"
+        versions = self.versions(project_id, form_id)
+        members = [
+            {"member_name": rng.choice(NAMES), "member_age": rng.randint(0, 90)}
+            for _ in range(rng.randint(0, 4))
+        ]
+        return {
+            "instanceId": instance_id,
+            "submissionDate": self.submission_date(index),
+            "submitterId": rng.randint(1, 20),
+            "deviceId": f"collect:{rng.getrandbits(32):08x}",
+            "formVersion": versions[
+                min(len(versions) - 1, index * len(versions) // count)
+            ],
+            "respondent_name": rng.choice(NAMES),
+            "age": rng.randint(18, 90),
+            "village": rng.choice(VILLAGES),
+            "consent": "yes" if rng.random() < 0.9 else "no",
+            "visit_date": (self.submission_date(index) - timedelta(days=1)).date(),
+            "latitude": round(6.2 + rng.random() * 4.8, 6),
+            "longitude": round(0.0 + rng.random() * 1.6, 6),
+            "altitude": round(rng.uniform(0, 900), 1),
+            "accuracy": round(rng.uniform(2, 25), 1),
+            "household": members,
+        }
+
+    def rest_submission(self, project_id: int, form_id: str, index: int) -> dict:
+        raw = self.submission(project_id, form_id, index)
+        return {
+            "instanceId": raw["instanceId"],
+            "submitterId": raw["submitterId"],
+            "deviceId": raw["deviceId"],
+            "createdAt": _iso(raw["submissionDate"]),
+            "updatedAt": None,
+            "reviewState": None,
+            "currentVersion": {
+                "instanceId": raw["instanceId"],
+                "instanceName": None,
+                "current": True,
+                "deviceId": raw["deviceId"],
+            },
+        }
+
+    def odata_submission(self, project_id: int, form_id: str, index: int) -> dict:
+        raw = self.submission(project_id, form_id, index)
+        instance_id = raw["instanceId"]
+        return {
+            "__id": instance_id,
+            "__system": {
+                "submissionDate": _iso(raw["submissionDate"]),
+                "updatedAt": None,
+                "submitterId": str(raw["submitterId"]),
+                "submitterName": f"collecteur {raw['submitterId']}",
+                "attachmentsPresent": 0,
+                "attachmentsExpected": 0,
+                "status": None,
+                "reviewState": None,
+                "deviceId": raw["deviceId"],
+                "edits": 0,
+                "formVersion": raw["formVersion"],
+            },
+            "meta": {"instanceID": instance_id},
+            "respondent_name": raw["respondent_name"],
+            "age": raw["age"],
+            "village": raw["village"],
+            "consent": raw["consent"],
+            "visit_date": raw["visit_date"].isoformat(),
+            "location": {
+                "type": "Point",
+                "coordinates": [raw["longitude"], raw["latitude"], raw["altitude"]],
+                "properties": {"accuracy": raw["accuracy"]},
+            },
+            "household_size": len(raw["household"]),
+            "household@odata.navigationLink": f"Submissions('{quote(instance_id)}')/household",
+        }
+
+    def odata_repeat_rows(self, project_id: int, form_id: str, index: int) -> list:
+        raw = self.submission(project_id, form_id, index)
+        rows = []
+        for position, member in enumerate(raw["household"]):
+            key = hashlib.sha1(f"{raw['instanceId']}/{position}".encode()).hexdigest()
+            rows.append(
+                {
+                    "__id": key,
+                    "__Submissions-id": raw["instanceId"],
+                    "member_name": member["member_name"],
+                    "member_age": member["member_age"],
+                }
+            )
+        return rows
+
+    def csv_row(self, project_id: int, form_id: str, index: int) -> list:
+        raw = self.submission(project_id, form_id, index)
+        return [
+            _iso(raw["submissionDate"]),
+            raw["respondent_name"],
+            raw["age"],
+            raw["village"],
+            raw["consent"],
+            raw["visit_date"].isoformat(),
+            raw["latitude"],
+            raw["longitude"],
+            raw["altitude"],
+            raw["accuracy"],
+            len(raw["household"]),
+            raw["instanceId"],
+            raw["instanceId"],
+            raw["submitterId"],
+            f"collecteur {raw['submitterId']}",
+            0,
+            0,
+            "",
+            "",
+            raw["deviceId"],
+            0,
+            raw["formVersion"],
+        ]
+
+
+CSV_HEADER = [
+    "SubmissionDate",
+    "respondent_name",
+    "age",
+    "village",
+    "consent",
+    "visit_date",
+    "location-Latitude",
+    "location-Longitude",
+    "location-Altitude",
+    "location-Accuracy",
+    "household_size",
+    "meta-instanceID",
+    "KEY",
+    "SubmitterID",
+    "SubmitterName",
+    "AttachmentsPresent",
+    "AttachmentsExpected",
+    "Status",
+    "ReviewState",
+    "DeviceID",
+    "Edits",
+    "FormVersion",
+]
+
+
+class _SubmissionDates:
+    """Lazy sorted sequence of the submission dates, for bisect"""
+
+    def __init__(self, dataset: Dataset, total: int):
+        self.dataset = dataset
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        return self.dataset.submission_date(index)
+
+
+def _filter_range(dataset: Dataset, total: int, expression: str) -> tuple:
+    """
+    Index range matching the __system/submissionDate comparisons used for
+    incremental pulls. Submission dates grow with the index, so the matching
+    submissions are always a contiguous range.
+    """
+    clauses = re.findall(
+        r"__system/submissionDate\s+(gt|ge|lt|le)\s+([0-9TZ:.\-+]+)", expression
+    )
+    if expression and not clauses:
+        raise HTTPError(
+            501, "The given OData filter expression is not supported.", 501.4
+        )
+
+    dates = _SubmissionDates(dataset, total)
+    low, high = 0, total
+    for operator, value in clauses:
+        bound = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if operator == "gt":
+            low = max(low, bisect.bisect_right(dates, bound))
+        elif operator == "ge":
+            low = max(low, bisect.bisect_left(dates, bound))
+        elif operator == "lt":
+            high = min(high, bisect.bisect_left(dates, bound))
+        else:
+            high = min(high, bisect.bisect_right(dates, bound))
+    return low, max(low, high)
+
+
+class FakeCentral:
+    """WSGI application emulating ODK Central"""
+
+    def __init__(self, config: FakeCentralConfig | None = None):
+        self.config = config or FakeCentralConfig()
+        self.data = Dataset(self.config)
+        self.stats = {"requests": 0, "errors_injected": 0, "rate_limited": 0}
+        self.stats_lock = threading.Lock()
+        # Start of the current one second window and its request count
+        self.rate_window = [0.0, 0]
+        self.tokens = set()
+        self.routes = [
+            (re.compile(pattern), handler)
+            for pattern, handler in [
+                (r"^/__fake__/config$", self.fake_config),
+                (r"^/__fake__/stats$", self.fake_stats),
+                (r"^/v1/sessions$", self.sessions),
+                (r"^/v1/sessions/(?P<token>[^/]+)$", self.session),
+                (r"^/v1/audits$", self.audits),
+                (r"^/v1/projects$", self.projects),
+                (r"^/v1/projects/(?P<pid>\d+)$", self.project),
+                (r"^/v1/projects/(?P<pid>\d+)/app-users$", self.app_users),
+                (r"^/v1/projects/(?P<pid>\d+)/app-users/(?P<uid>\d+)$", self.app_user),
+                (r"^/v1/projects/(?P<pid>\d+)/forms/?$", self.forms),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)\.xlsx$",
+                    self.form_xlsx,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)\.svc$",
+                    self.odata_service,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)\.svc/Submissions(?P<table>\.[A-Za-z0-9_.]+)?$",
+                    self.odata_submissions,
+                ),
+                (r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/.]+)$", self.form),
+                (r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/draft$", self.draft),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/draft/publish$",
+                    self.draft_publish,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/draft/submissions$",
+                    self.draft_submissions,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/versions$",
+                    self.versions,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/versions/(?P<version>[^/]+)\.xml$",
+                    self.version_xml,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/submissions\.csv$",
+                    self.submissions_csv,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/submissions$",
+                    self.submissions,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/submissions/(?P<iid>[^/]+)$",
+                    self.submission,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/assignments/app-user$",
+                    self.assignments,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/assignments/app-user/(?P<uid>\d+)$",
+                    self.assignment,
+                ),
+                (
+                    r"^/v1/projects/(?P<pid>\d+)/forms/(?P<fid>[^/]+)/public-links$",
+                    self.public_links,
+                ),
+            ]
+        ]
+
+    # WSGI plumbing ----------------------------------------------------------
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        method = environ["REQUEST_METHOD"]
+        with self.stats_lock:
+            self.stats["requests"] += 1
+
+        if not path.startswith("/__fake__/"):
+            injected = self._inject_faults()
+            if injected is not None:
+                return self._respond(start_response, *injected)
+
+        try:
+            for pattern, handler in self.routes:
+                match = pattern.match(path)
+                if match:
+                    if handler not in (
+                        self.sessions,
+                        self.fake_config,
+                        self.fake_stats,
+                    ):
+                        self._authenticate(environ)
+                    params = {
+                        key: values[-1]
+                        for key, values in parse_qs(
+                            environ.get("QUERY_STRING", "")
+                        ).items()
+                    }
+                    result = handler(method, environ, params, **match.groupdict())
+                    return self._respond(start_response, *result)
+            raise HTTPError(404, "Could not find the resource you were looking for.")
+        except HTTPError as e:
+            body = {"code": e.code, "message": e.message}
+            return self._respond(start_response, e.status, body)
+
+    def _inject_faults(self):
+        config = self.config
+        delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+        if config.hang_rate and random.random() < config.hang_rate:
+            time.sleep(config.hang_seconds)
+        if config.rate_limit:
+            with self.stats_lock:
+                now = time.monotonic()
+                if now - self.rate_window[0] >= 1:
+                    self.rate_window = [now, 0]
+                self.rate_window[1] += 1
+                if self.rate_window[1] > config.rate_limit:
+                    self.stats["rate_limited"] += 1
+                    retry_after = max(1, round(1 - (now - self.rate_window[0])))
+                    return (
+                        429,
+                        {"code": 429, "message": "Too many requests"},
+                        None,
+                        [("Retry-After", str(retry_after))],
+                    )
+        if config.error_rate and random.random() < config.error_rate:
+            with self.stats_lock:
+                self.stats["errors_injected"] += 1
+            return config.error_status, {
+                "code": config.error_status,
+                "message": "Injected failure",
+            }
+        return None
+
+    def _authenticate(self, environ) -> None:
+        header = environ.get("HTTP_AUTHORIZATION", "")
+        if not header.startswith("Bearer ") or header[7:] not in self.tokens:
+            raise HTTPError(
+                401, "Could not authenticate with the provided credentials.", 401.2
+            )
+
+    def _respond(self, start_response, status, body, content_type=None, headers=()):
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = ""
+        if isinstance(body, (dict, list)):
+            payload = [json.dumps(body).encode("utf-8")]
+            content_type = content_type or "application/json; charset=utf-8"
+        elif isinstance(body, str):
+            payload = [body.encode("utf-8")]
+        elif isinstance(body, bytes):
+            payload = [body]
+        else:
+            # Streamed body
+            payload = body
+        response_headers = [("Content-Type", content_type or "application/json")]
+        if isinstance(payload, list):
+            response_headers.append(("Content-Length", str(sum(map(len, payload)))))
+        response_headers.extend(headers)
+        start_response(f"{status} {reason}".strip(), response_headers)
+        return payload
+
+    @staticmethod
+    def _read_json(environ) -> dict:
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        raw = environ["wsgi.input"].read(length) if length else b""
+        if not raw:
+            return {}
+        try:
+            return json.loads(raw)
+        except ValueError:
+            raise HTTPError(400, "Could not parse the given data.", 400.1)
+
+    @staticmethod
+    def _read_body(environ) -> bytes:
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        return environ["wsgi.input"].read(length) if length else b""
+
+    @staticmethod
+    def _not_allowed(method):
+        raise HTTPError(405, f"Method {method} is not allowed.", 405.1)
+
+    # Fake server control ----------------------------------------------------
+
+    def fake_config(self, method, environ, params):
+        if method == "POST":
+            try:
+                self.config.update(self._read_json(environ))
+            except KeyError as e:
+                raise HTTPError(400, f"Unknown setting {e}", 400.1)
+        return 200, asdict(self.config)
+
+    def fake_stats(self, method, environ, params):
+        return 200, dict(self.stats)
+
+    # Sessions ---------------------------------------------------------------
+
+    def sessions(self, method, environ, params):
+        if method != "POST":
+            self._not_allowed(method)
+        credentials = self._read_json(environ)
+        if not credentials.get("email") or not credentials.get("password"):
+            raise HTTPError(
+                401, "Could not authenticate with the provided credentials.", 401.2
+            )
+        token = uuid.uuid4().hex
+        self.tokens.add(token)
+        expires = datetime.now(timezone.utc) + timedelta(hours=24)
+        return 200, {
+            "token": token,
+            "csrf": uuid.uuid4().hex,
+            "expiresAt": _iso(expires),
+            "createdAt": _iso(datetime.now(timezone.utc)),
+        }
+
+    def session(self, method, environ, params, token):
+        if method != "DELETE":
+            self._not_allowed(method)
+        self.tokens.discard(token)
+        return 200, {"success": True}
+
+    # Audits -----------------------------------------------------------------
+
+    def audits(self, method, environ, params):
+        # Newest first, filtered on loggedAt >= start, paginated with limit/offset
+        events = sorted(
+            (e for e in self.data.audits if e["loggedAt"] >= params.get("start", "")),
+            key=lambda e: e["loggedAt"],
+            reverse=True,
+        )
+        offset = int(params.get("offset", 0))
+        events = events[offset:]
+        if "limit" in params:
+            events = events[: int(params["limit"])]
+        if environ.get("HTTP_X_EXTENDED_METADATA") != "true":
+            events = [{k: v for k, v in e.items() if k != "actee"} for e in events]
+        return 200, events
+
+    # Projects ---------------------------------------------------------------
+
+    def projects(self, method, environ, params):
+        if method == "POST":
+            payload = self._read_json(environ)
+            project_id = self.data.new_id()
+            self.data.created_projects[project_id] = {
+                **self.data._synthetic_project(project_id),
+                "id": project_id,
+                "name": payload.get("name", f"Projet {project_id}"),
+                "description": payload.get("description", ""),
+                "createdAt": _iso(datetime.now(timezone.utc)),
+            }
+            return 200, self.data.created_projects[project_id]
+        return 200, [self.data.project(pid) for pid in self.data.project_ids()]
+
+    def project(self, method, environ, params, pid):
+        project = self.data.project(int(pid))
+        if method == "DELETE":
+            self.data.deleted_projects.add(int(pid))
+            return 200, {"success": True}
+        return 200, project
+
+    # Forms ------------------------------------------------------------------
+
+    def forms(self, method, environ, params, pid):
+        project_id = int(pid)
+        if method == "POST":
+            self.data.project(project_id)
+            body = self._read_body(environ)
+            match = re.search(rb'<data[^>]*\bid="([^"]+)"', body)
+            form_id = (
+                match.group(1).decode()
+                if match
+                else environ.get("HTTP_X_XLSFORM_FORMID_FALLBACK")
+            ) or f"form_{self.data.new_id()}"
+            if form_id in self.data.form_ids(project_id):
+                raise HTTPError(
+                    409, "A resource already exists with that xmlFormId.", 409.3
+                )
+            self.data.created_forms[(project_id, form_id)] = {
+                "version": "v1",
+                "state": "open" if params.get("publish") == "true" else "closing",
+                "createdAt": _iso(datetime.now(timezone.utc)),
+            }
+            self.data.audit("form.create", self.data.form(project_id, form_id))
+            return 200, self.data.form(project_id, form_id)
+        extended = environ.get("HTTP_X_EXTENDED_METADATA") == "true"
+        return 200, [
+            self.data.form(project_id, fid, extended)
+            for fid in self.data.form_ids(project_id)
+        ]
+
+    def form(self, method, environ, params, pid, fid):
+        form = self.data.form(int(pid), fid, extended=True)
+        if method == "DELETE":
+            self.data.deleted_forms.add((int(pid), fid))
+            self.data.audit("form.delete", form)
+            return 200, {"success": True}
+        return 200, form
+
+    def form_xlsx(self, method, environ, params, pid, fid):
+        self.data.form(int(pid), fid)
+        # Not a real workbook: the bytes are only proxied to the client
+        return (
+            200,
+            b"PK\x03\x04" + f"fake xlsform {pid}/{fid}".encode(),
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+
+    def draft(self, method, environ, params, pid, fid):
+        project_id = int(pid)
+        self.data.form(project_id, fid)
+        key = (project_id, fid)
+        if method == "POST":
+            self._read_body(environ)
+            self.data.drafts[key] = {
+                **self.data.form(project_id, fid),
+                "version": f"draft-{self.data.new_id()}",
+                "draftToken": uuid.uuid4().hex,
+            }
+            return 200, {"success": True}
+        if key not in self.data.drafts:
+            raise HTTPError(404, "Could not find the resource you were looking for.")
+        if method == "DELETE":
+            del self.data.drafts[key]
+            return 200, {"success": True}
+        return 200, self.data.drafts[key]
+
+    def draft_publish(self, method, environ, params, pid, fid):
+        key = (int(pid), fid)
+        if key not in self.data.drafts:
+            raise HTTPError(404, "Could not find the resource you were looking for.")
+        draft = self.data.drafts.pop(key)
+        version = params.get("version") or draft["version"].replace("draft-", "v")
+        self.data.created_forms.setdefault(key, {})["version"] = version
+        self.data.audit("form.update.publish", self.data.form(*key))
+        return 200, {"success": True}
+
+    def draft_submissions(self, method, environ, params, pid, fid):
+        if (int(pid), fid) not in self.data.drafts:
+            raise HTTPError(404, "Could not find the resource you were looking for.")
+        return 200, []
+
+    def versions(self, method, environ, params, pid, fid):
+        project_id = int(pid)
+        form = self.data.form(project_id, fid)
+        return 200, [
+            {**form, "version": version, "publishedAt": _iso(EPOCH + timedelta(days=n))}
+            for n, version in enumerate(reversed(self.data.versions(project_id, fid)))
+        ]
+
+    def version_xml(self, method, environ, params, pid, fid, version):
+        self.data.form(int(pid), fid)
+        xml = self.data.form_xml(int(pid), fid, version)
+        return 200, xml, "application/xml"
+
+    # Submissions ------------------------------------------------------------
+
+    def _paging(self, params, total):
+        skip = int(params.get("$skip") or params.get("offset") or 0)
+        if "$skiptoken" in params:
+            skip = int(params["$skiptoken"])
+        top = params.get("$top") or params.get("limit")
+        stop = min(total, skip + int(top)) if top else total
+        return skip, stop
+
+    def submissions(self, method, environ, params, pid, fid):
+        project_id = int(pid)
+        self.data.form(project_id, fid)
+        total = self.data.submission_count(project_id, fid)
+        start, stop = self._paging(params, total)
+
+        def stream():
+            yield b"["
+            for index in range(start, stop):
+                row = self.data.rest_submission(project_id, fid, index)
+                yield (b"," if index > start else b"") + json.dumps(row).encode()
+            yield b"]"
+
+        return 200, stream()
+
+    def submission(self, method, environ, params, pid, fid, iid):
+        project_id = int(pid)
+        self.data.form(project_id, fid)
+        # Synthetic instance ids are not indexable, scan a bounded prefix only
+        for index in range(min(self.data.submission_count(project_id, fid), 10_000)):
+            row = self.data.rest_submission(project_id, fid, index)
+            if row["instanceId"] == iid:
+                return 200, row
+        raise HTTPError(404, "Could not find the resource you were looking for.")
+
+    def submissions_csv(self, method, environ, params, pid, fid):
+        project_id = int(pid)
+        self.data.form(project_id, fid)
+        total = self.data.submission_count(project_id, fid)
+        # Central accepts the same submissionDate filters on CSV exports
+        low, high = _filter_range(self.data, total, params.get("$filter", ""))
+
+        def stream():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(CSV_HEADER)
+            for index in range(low, high):
+                writer.writerow(self.data.csv_row(project_id, fid, index))
+                if index % STREAM_CHUNK == 0:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue().encode("utf-8")
+
+        return (
+            200,
+            stream(),
+            "text/csv; charset=utf-8",
+            [("Content-Disposition", f'attachment; filename="{fid}.csv"')],
+        )
+
+    def odata_service(self, method, environ, params, pid, fid):
+        self.data.form(int(pid), fid)
+        return 200, {
+            "@odata.context": f"{self._base(environ)}/v1/projects/{pid}/forms/{fid}.svc/$metadata",
+            "value": [
+                {"kind": "EntitySet", "name": "Submissions", "url": "Submissions"},
+                {
+                    "kind": "EntitySet",
+                    "name": "Submissions.household",
+                    "url": "Submissions.household",
+                },
+            ],
+        }
+
+    def odata_submissions(self, method, environ, params, pid, fid, table=None):
+        project_id = int(pid)
+        self.data.form(project_id, fid)
+        if table not in (None, ".household"):
+            raise HTTPError(404, "Could not find the resource you were looking for.")
+        total = self.data.submission_count(project_id, fid)
+        low, high = _filter_range(self.data, total, params.get("$filter", ""))
+        skip, stop = self._paging(params, high - low)
+        start, stop = low + skip, low + stop
+        count = high - low if params.get("$count") == "true" else None
+        url = f"{self._base(environ)}/v1/projects/{pid}/forms/{fid}.svc"
+
+        def stream():
+            table_name = f"Submissions{table or ''}"
+            head = {"@odata.context": f"{url}/$metadata#{table_name}"}
+            if count is not None:
+                head["@odata.count"] = count
+            yield json.dumps(head)[:-1].encode() + b', "value": ['
+            first = True
+            for index in range(start, stop):
+                if table:
+                    rows = self.data.odata_repeat_rows(project_id, fid, index)
+                else:
+                    rows = [self.data.odata_submission(project_id, fid, index)]
+                for row in rows:
+                    yield (b"" if first else b",") + json.dumps(row).encode()
+                    first = False
+            yield b"]"
+            if params.get("$top") and stop < high:
+                query = {
+                    k: v for k, v in params.items() if k not in ("$skip", "$skiptoken")
+                }
+                query["$skiptoken"] = str(stop - low)
+                next_link = f"{url}/{table_name}?" + "&".join(
+                    f"{k}={quote(str(v))}" for k, v in query.items()
+                )
+                yield f', "@odata.nextLink": {json.dumps(next_link)}'.encode()
+            yield b"}"
+
+        return 200, stream()
+
+    @staticmethod
+    def _base(environ) -> str:
+        return f"{environ['wsgi.url_scheme']}://{environ.get('HTTP_HOST', 'localhost')}"
+
+    # App users, assignments and public links --------------------------------
+
+    def app_users(self, method, environ, params, pid):
+        project_id = int(pid)
+        self.data.project(project_id)
+        users = self.data.app_users.setdefault(project_id, {})
+        if method == "POST":
+            payload = self._read_json(environ)
+            user_id = self.data.new_id()
+            users[user_id] = {
+                "id": user_id,
+                "type": "field_key",
+                "displayName": payload.get("displayName", f"app user {user_id}"),
+                "token": uuid.uuid4().hex,
+                "projectId": project_id,
+                "createdAt": _iso(datetime.now(timezone.utc)),
+                "updatedAt": None,
+                "deletedAt": None,
+            }
+            self.data.audit("field_key.create", users[user_id])
+            return 200, users[user_id]
+        return 200, list(users.values())
+
+    def app_user(self, method, environ, params, pid, uid):
+        users = self.data.app_users.get(int(pid), {})
+        if int(uid) not in users:
+            raise HTTPError(404, "Could not find the resource you were looking for.")
+        if method == "DELETE":
+            self.data.audit("field_key.delete", users.pop(int(uid)))
+            return 200, {"success": True}
+        return 200, users[int(uid)]
+
+    def assignments(self, method, environ, params, pid, fid):
+        self.data.form(int(pid), fid)
+        assigned = self.data.assignments.get((int(pid), fid), set())
+        users = self.data.app_users.get(int(pid), {})
+        return 200, [users[uid] for uid in assigned if uid in users]
+
+    def assignment(self, method, environ, params, pid, fid, uid):
+        self.data.form(int(pid), fid)
+        assigned = self.data.assignments.setdefault((int(pid), fid), set())
+        if method == "POST":
+            assigned.add(int(uid))
+        elif method == "DELETE":
+            assigned.discard(int(uid))
+        else:
+            self._not_allowed(method)
+        return 200, {"success": True}
+
+    def public_links(self, method, environ, params, pid, fid):
+        self.data.form(int(pid), fid)
+        links = self.data.public_links.setdefault((int(pid), fid), [])
+        if method == "POST":
+            payload = self._read_json(environ)
+            link = {
+                "id": self.data.new_id(),
+                "displayName": payload.get("displayName", "public link"),
+                "once": bool(payload.get("once", False)),
+                "token": uuid.uuid4().hex,
+                "createdAt": _iso(datetime.now(timezone.utc)),
+                "deletedAt": None,
+            }
+            links.append(link)
+            return 200, link
+        return 200, links
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def make_fake_central(host="127.0.0.1", port=8383, config=None, quiet=True):
+    """Create the fake server; port 0 picks a free port"""
+    app = FakeCentral(config)
+    server = make_server(
+        host,
+        port,
+        app,
+        server_class=ThreadingWSGIServer,
+        handler_class=QuietHandler if quiet else WSGIRequestHandler,
+    )
+    server.app = app
+    return server
+
+
+def start_in_thread(config=None, host="127.0.0.1", port=0):
+    """Start the fake server in a background thread, returns (server, base_url)"""
+    server = make_fake_central(host, port, config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8383)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    defaults = FakeCentralConfig()
+    for name, value in asdict(defaults).items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            parser.add_argument(
+                f"--{name.replace('_', '-')}", type=type(value), default=value
+            )
+    args = parser.parse_args(argv)
+
+    config = FakeCentralConfig(
+        **{
+            name: getattr(args, name)
+            for name in asdict(defaults)
+            if hasattr(args, name)
+        }
+    )
+    server = make_fake_central(args.host, args.port, config, quiet=not args.verbose)
+    print(f"Fake ODK Central listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Database fixtures shared by the benchmark and load-test tools.
+
+Models are imported inside the functions so that the module can be run with
+`python -m benchmarks.fixtures` before Django is set up.
+"""
+
+import os
+
+BENCH_PASSWORD = "bench-password"
+
+
+def get_or_create_user(email: str, odk_role: str = "insuco_user"):
+    from django.contrib.auth import get_user_model
+
+    from core_apps.profiles.models import Profile
+
+    User = get_user_model()
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        user = User.objects.create_user(
+            email=email,
+            password=BENCH_PASSWORD,
+            username=email.split("@")[0],
+            first_name="Bench",
+            last_name=email.split("@")[0],
+        )
+    profile, _ = Profile.objects.get_or_create(user=user)
+    if profile.odk_role != odk_role:
+        profile.odk_role = odk_role
+        profile.save(update_fields=["odk_role"])
+    return user
+
+
+def ensure_fixtures(odk_projects: int = 3, extra_projects: int = 50, members: int = 30):
+    """
+    Create the benchmark user, one Django project per fake ODK project, extra
+    projects without ODK link, and members with access to the first project.
+    Idempotent, returns (user, first ODK-linked project).
+    """
+    from guardian.shortcuts import assign_perm
+
+    from core_apps.projects.models import Projects
+
+    user = get_or_create_user("bench@example.com")
+    get_or_create_user("bench-admin@example.com", odk_role="administrator")
+
+    projects = []
+    for odk_id in range(1, odk_projects + 1):
+        project, _ = Projects.objects.get_or_create(
+            odk_id=odk_id,
+            defaults={"name": f"Bench ODK {odk_id}", "created_by": user},
+        )
+        projects.append(project)
+    for n in range(extra_projects):
+        project, _ = Projects.objects.get_or_create(
+            name=f"Bench {n}",
+            defaults={"description": "Benchmark project", "created_by": user},
+        )
+        projects.append(project)
+    # Projects created by earlier versions of these fixtures had no creator
+    Projects.objects.filter(
+        pkid__in=[project.pkid for project in projects], created_by__isnull=True
+    ).update(created_by=user)
+
+    for project in projects:
+        assign_perm("projects.access_project", user, project)
+
+    for n in range(members):
+        member = get_or_create_user(f"bench-member-{n}@example.com")
+        assign_perm("projects.access_project", member, projects[0])
+        if n % 3 == 0:
+            assign_perm("projects.view_submission", member, projects[0])
+
+    return user, projects[0]
+
+
+def main():
+    """Prepare the database of a server started for load tests"""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+    django.setup()
+
+    from django.core.management import call_command
+
+    call_command("migrate", verbosity=0)
+    _, project = ensure_fixtures()
+    print(f"Fixtures ready, project linked to ODK project 1: pkid={project.pkid}")
+
+
+def seed_app_users(fake_central, odk_project_id: int = 1, count: int = 20) -> None:
+    """Create app users on the fake ODK Central, for the QR code paths"""
+    users = fake_central.data.app_users.setdefault(odk_project_id, {})
+    while len(users) < count:
+        user_id = fake_central.data.new_id()
+        users[user_id] = {
+            "id": user_id,
+            "type": "field_key",
+            "displayName": f"collecteur {user_id}",
+            "token": f"{user_id:040x}",
+            "projectId": odk_project_id,
+            "createdAt": "2024-01-01T00:00:00.000Z",
+            "updatedAt": None,
+            "deletedAt": None,
+        }
+
+
+if __name__ == "__main__":
+    main()
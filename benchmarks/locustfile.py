@@ -0,0 +1,375 @@
+"""
+Load test of the API against the fake ODK Central, with realistic user mixes.
+
+The number of users grows step by step (LOADTEST_STEP_USERS every
+LOADTEST_STEP_SECONDS, up to LOADTEST_MAX_USERS). For every step the harness
+reports the request rate, error rate, ODK account pool wait time (read from
+the Server-Timing header) and pool timeouts, which shows where the account
+pool saturates. See benchmarks/README.md to start the server under test.
+
+    locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000 --headless
+"""
+
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from locust import HttpUser, LoadTestShape, between, events, task
+
+# Same password as benchmarks.fixtures.BENCH_PASSWORD (not importable without Django)
+PASSWORD = os.environ.get("LOADTEST_PASSWORD", "bench-password")
+USERS_EMAIL = "bench@example.com"
+ADMIN_EMAIL = "bench-admin@example.com"
+
+STEP_USERS = int(os.environ.get("LOADTEST_STEP_USERS", "5"))
+STEP_SECONDS = int(os.environ.get("LOADTEST_STEP_SECONDS", "60"))
+MAX_USERS = int(os.environ.get("LOADTEST_MAX_USERS", "50"))
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+SERVER_TIMING = re.compile(r"(\w+);dur=([\d.]+)")
+POOL_TIMEOUT_MARKER = "No ODK account available"
+
+FORM_XML = """<?xml version="1.0"?>
+<h:html xmlns="http://www.w3.org/2002/xforms" xmlns:h="http://www.w3.org/1999/xhtml">
+  <h:head>
+    <h:title>{form_id}</h:title>
+    <model>
+      <instance><data id="{form_id}"><name/><meta><instanceID/></meta></data></instance>
+      <bind nodeset="/data/name" type="string"/>
+    </model>
+  </h:head>
+  <h:body><input ref="/data/name"><label>Nom</label></input></h:body>
+</h:html>
+"""
+
+
+class StepStats:
+    """Aggregates of the requests made at each concurrency level"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.steps = {}
+        self.users = 0
+
+    def _current(self) -> dict:
+        return self.steps.setdefault(
+            self.users,
+            {
+                "requests": 0,
+                "failures": 0,
+                "pool_timeouts": 0,
+                "odk_unavailable": 0,
+                "latencies": [],
+                "pool_waits": [],
+            },
+        )
+
+    def record(self, response_time, failure=None, pool_wait=None) -> None:
+        with self.lock:
+            step = self._current()
+            step["requests"] += 1
+            step["latencies"].append(response_time)
+            if pool_wait is not None:
+                step["pool_waits"].append(pool_wait)
+            if failure:
+                step["failures"] += 1
+                if failure == "pool timeout":
+                    step["pool_timeouts"] += 1
+                elif failure == "odk unavailable":
+                    step["odk_unavailable"] += 1
+
+    def summary(self) -> list:
+        rows = []
+        with self.lock:
+            for users, step in sorted(self.steps.items()):
+                latencies = sorted(step["latencies"]) or [0]
+                waits = step["pool_waits"] or [0]
+                rows.append(
+                    {
+                        "users": users,
+                        "requests": step["requests"],
+                        "error_rate": round(
+                            step["failures"] / max(1, step["requests"]), 4
+                        ),
+                        "pool_timeouts": step["pool_timeouts"],
+                        "odk_unavailable": step["odk_unavailable"],
+                        "latency_p50_ms": round(latencies[len(latencies) // 2], 1),
+                        "latency_p95_ms": round(
+                            latencies[int(len(latencies) * 0.95) - 1 or 0], 1
+                        ),
+                        "pool_wait_mean_ms": round(statistics.fmean(waits), 1),
+                        "pool_wait_max_ms": round(max(waits), 1),
+                    }
+                )
+        return rows
+
+    def print_summary(self) -> None:
+        print(
+            f"\n{'users':>6} {'requests':>9} {'errors':>8} {'pool t/o':>9} "
+            f"{'odk 503':>8} {'p50 ms':>9} {'p95 ms':>9} {'pool wait':>10} {'max':>9}"
+        )
+        for row in self.summary():
+            print(
+                f"{row['users']:>6} {row['requests']:>9} {row['error_rate']:>8.1%} "
+                f"{row['pool_timeouts']:>9} {row['odk_unavailable']:>8} "
+                f"{row['latency_p50_ms']:>9.0f} {row['latency_p95_ms']:>9.0f} "
+                f"{row['pool_wait_mean_ms']:>10.0f} {row['pool_wait_max_ms']:>9.0f}"
+            )
+
+
+STATS = StepStats()
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    STATS.print_summary()
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    output = RESULTS_DIR / f"loadtest-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.json"
+    output.write_text(
+        json.dumps(
+            {
+                "host": environment.host,
+                "step_users": STEP_USERS,
+                "step_seconds": STEP_SECONDS,
+                "steps": STATS.summary(),
+            },
+            indent=2,
+        )
+    )
+    print(f"Results written to {output}")
+
+
+class StepLoadShape(LoadTestShape):
+    """Add STEP_USERS users every STEP_SECONDS until MAX_USERS"""
+
+    def tick(self):
+        step = int(self.get_run_time() // STEP_SECONDS) + 1
+        users = step * STEP_USERS
+        if users > MAX_USERS:
+            return None
+        if users != STATS.users:
+            if STATS.users:
+                STATS.print_summary()
+            STATS.users = users
+        return users, STEP_USERS
+
+
+class APIUser(HttpUser):
+    abstract = True
+    email = USERS_EMAIL
+    wait_time = between(1, 5)
+    # Django pkid of the project linked to the fake ODK project 1
+    project = None
+
+    def on_start(self):
+        with self.client.post(
+            "/api/v1/auth/login/",
+            json={"email": self.email, "password": PASSWORD},
+            name="login",
+            catch_response=True,
+        ) as response:
+            access = response.cookies.get("access")
+            if response.status_code != 200 or not access:
+                response.failure(f"login failed ({response.status_code})")
+                self.stop()
+                return
+        self.client.headers["Authorization"] = f"Bearer {access}"
+        if APIUser.project is None:
+            APIUser.project = self._find_project()
+
+    def _find_project(self):
+        env_project = os.environ.get("LOADTEST_PROJECT_ID")
+        if env_project:
+            return int(env_project)
+        for page in range(1, 50):
+            response = self.client.get(
+                f"/api/v1/projects/?page={page}", name="/api/v1/projects/ (setup)"
+            )
+            if response.status_code != 200:
+                raise RuntimeError(
+                    f"Project list returned {response.status_code}, "
+                    "unable to find the load test project"
+                )
+            listing = response.json()["projects"]
+            for project in listing["results"]:
+                if project.get("odk_id") == 1:
+                    return project["pkid"]
+            if not listing.get("next"):
+                break
+        raise RuntimeError(
+            "No project linked to ODK project 1, run benchmarks.fixtures"
+        )
+
+    def api(self, method, path, name=None, **kwargs):
+        """Call the API, classify failures and record the ODK account pool wait"""
+        with self.client.request(
+            method, path, name=name or path, catch_response=True, **kwargs
+        ) as response:
+            timings = dict(
+                SERVER_TIMING.findall(response.headers.get("Server-Timing", ""))
+            )
+            pool_wait = float(timings["pool"]) if "pool" in timings else None
+
+            failure = None
+            if POOL_TIMEOUT_MARKER in response.text:
+                failure = "pool timeout"
+            elif response.status_code == 503:
+                failure = "odk unavailable"
+            elif response.status_code >= 400:
+                failure = f"HTTP {response.status_code}"
+
+            if failure:
+                response.failure(failure)
+            else:
+                response.success()
+            STATS.record(response.elapsed.total_seconds() * 1000, failure, pool_wait)
+            return response
+
+
+class DashboardUser(APIUser):
+    """Browses projects, forms and submissions"""
+
+    weight = 6
+
+    @task(3)
+    def projects(self):
+        self.api("GET", "/api/v1/projects/")
+
+    @task(3)
+    def odk_projects(self):
+        self.api("GET", "/api/v1/odk/projects")
+
+    @task(2)
+    def forms(self):
+        self.api(
+            "GET",
+            f"/api/v1/odk/projects/{self.project}/forms",
+            name="/api/v1/odk/projects/[id]/forms",
+        )
+
+    @task(2)
+    def submissions(self):
+        form_id = f"form_{random.randint(1, 4)}"
+        self.api(
+            "GET",
+            f"/api/v1/odk/projects/{self.project}/forms/{form_id}/submissions/",
+            name="/api/v1/odk/projects/[id]/forms/[form]/submissions/",
+        )
+
+    @task(1)
+    def form_detail(self):
+        form_id = f"form_{random.randint(1, 4)}"
+        self.api(
+            "GET",
+            f"/api/v1/odk/projects/{self.project}/forms/{form_id}/",
+            name="/api/v1/odk/projects/[id]/forms/[form]/",
+        )
+
+    @task(1)
+    def app_users(self):
+        self.api(
+            "GET",
+            f"/api/v1/odk/projects/{self.project}/app-users",
+            name="/api/v1/odk/projects/[id]/app-users",
+        )
+
+
+class ExportUser(APIUser):
+    """Downloads submission exports, the longest ODK-bound requests"""
+
+    weight = 1
+    wait_time = between(10, 30)
+
+    @task(3)
+    def export_csv(self):
+        self.api(
+            "POST",
+            f"/api/v1/odk/projects/{self.project}/forms/form_1/submissions.csv",
+            name="export csv",
+            headers={"to": "csv"},
+        )
+
+    @task(1)
+    def export_xlsx(self):
+        self.api(
+            "POST",
+            f"/api/v1/odk/projects/{self.project}/forms/form_1/submissions.csv",
+            name="export xlsx",
+            headers={"to": "xlsx"},
+        )
+
+
+class FormDesignerUser(APIUser):
+    """Uploads new forms and deletes them"""
+
+    weight = 1
+    email = ADMIN_EMAIL
+    wait_time = between(5, 15)
+
+    @task
+    def upload_form(self):
+        form_id = f"load_{uuid.uuid4().hex[:12]}"
+        response = self.api(
+            "POST",
+            f"/api/v1/odk/projects/{self.project}/forms/?publish=true",
+            name="upload form",
+            files={"form": (f"{form_id}.xml", FORM_XML.format(form_id=form_id))},
+        )
+        if response.status_code == 201:
+            self.api(
+                "DELETE",
+                f"/api/v1/odk/projects/{self.project}/forms/{form_id}/delete/",
+                name="delete form",
+            )
+
+
+class PermissionAdminUser(APIUser):
+    """Reviews and changes project permissions"""
+
+    weight = 1
+    email = ADMIN_EMAIL
+    wait_time = between(3, 10)
+
+    @task(3)
+    def list_permissions(self):
+        self.api(
+            "GET",
+            f"/api/v1/projects/{self.project}/permissions/",
+            name="/api/v1/projects/[id]/permissions/",
+        )
+
+    @task(1)
+    def reassign_permission(self):
+        response = self.api(
+            "GET",
+            f"/api/v1/projects/{self.project}/permissions/",
+            name="/api/v1/projects/[id]/permissions/",
+        )
+        if response.status_code != 200:
+            return
+        # Only the fixture members, never the accounts used by the other users
+        members = [
+            user
+            for user in response.json().get("users", [])
+            if user.get("email", "").startswith("bench-member-")
+        ]
+        if not members:
+            return
+        user_id = random.choice(members)["id"]
+        self.api(
+            "DELETE",
+            f"/api/v1/projects/{self.project}/permissions/{user_id}/revoke/",
+            name="/api/v1/projects/[id]/permissions/[user]/revoke/",
+        )
+        self.api(
+            "POST",
+            f"/api/v1/projects/{self.project}/permissions/assign/",
+            name="/api/v1/projects/[id]/permissions/assign/",
+            json={"user_id": user_id, "permission_level": "read"},
+        )
@@ -0,0 +1,303 @@
+"""
+Benchmark the hot API paths against the fake ODK Central.
+
+Runs each scenario in-process through the DRF test client, for every dataset
+size, and reports throughput, latency percentiles and peak Python memory.
+Results are written as JSON so that runs can be compared over time:
+
+    python -m benchmarks.run --sizes 1000,10000,100000
+    python -m benchmarks.run --compare benchmarks/results/<previous>.json
+
+Uses benchmarks.settings (local Postgres and Redis, see benchmarks/README.md).
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+@dataclass
+class Scenario:
+    name: str
+    view: str
+    method: str
+    path: str
+    # Scenarios reading submissions are run once per dataset size
+    sized: bool = False
+    headers: dict = field(default_factory=dict)
+    max_size: int | None = None
+
+
+SCENARIOS = [
+    Scenario("odk_projects", "ODKProjectListView", "get", "/api/v1/odk/projects"),
+    Scenario(
+        "odk_forms",
+        "ProjectFormsListView",
+        "get",
+        "/api/v1/odk/projects/{project}/forms",
+    ),
+    Scenario(
+        "submissions_list",
+        "FormSubmissionsListView",
+        "get",
+        "/api/v1/odk/projects/{project}/forms/form_1/submissions/",
+        sized=True,
+    ),
+    Scenario(
+        "export_csv",
+        "FormSubmissionsExportView",
+        "post",
+        "/api/v1/odk/projects/{project}/forms/form_1/submissions.csv",
+        sized=True,
+        headers={"to": "csv"},
+    ),
+    Scenario(
+        "export_xlsx",
+        "FormSubmissionsExportView",
+        "post",
+        "/api/v1/odk/projects/{project}/forms/form_1/submissions.csv",
+        sized=True,
+        headers={"to": "xlsx"},
+        # Beyond this, XLSX export takes minutes and Excel caps rows at 1,048,576
+        max_size=100_000,
+    ),
+    Scenario(
+        "app_users_qr",
+        "AppUserListView",
+        "get",
+        "/api/v1/odk/projects/{project}/app-users",
+    ),
+    Scenario("projects", "ProjectListCreateView", "get", "/api/v1/projects/"),
+    Scenario(
+        "project_permissions",
+        "ProjectPermissionListView",
+        "get",
+        "/api/v1/projects/{project}/permissions/",
+    ),
+]
+
+
+def percentile(samples: list, percent: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(len(ordered) * percent / 100) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: list) -> dict:
+    ms = [seconds * 1000 for seconds in latencies]
+    return {
+        "mean": round(statistics.fmean(ms), 2),
+        "p50": round(percentile(ms, 50), 2),
+        "p90": round(percentile(ms, 90), 2),
+        "p95": round(percentile(ms, 95), 2),
+        "p99": round(percentile(ms, 99), 2),
+        "max": round(max(ms), 2),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(client, scenario, path, iterations, warmup, cold):
+    from django.core.cache import cache
+
+    def call():
+        if cold:
+            cache.clear()
+        request = getattr(client, scenario.method)
+        extra = {
+            f"HTTP_{k.upper().replace('-', '_')}": v
+            for k, v in scenario.headers.items()
+        }
+        response = request(path, **extra)
+        # Consume streamed bodies, as a real client would
+        if getattr(response, "streaming", False):
+            for _ in response.streaming_content:
+                pass
+        return response.status_code
+
+    for _ in range(warmup):
+        call()
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        begin = time.perf_counter()
+        status = call()
+        latencies.append(time.perf_counter() - begin)
+        if status >= 400:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    # Peak memory is measured on a separate call: tracing skews the timings
+    gc.collect()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "errors": errors,
+        "throughput_rps": round(iterations / elapsed, 2),
+        "latency_ms": summarize(latencies),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(results: list, baseline_file: str) -> None:
+    baseline = json.loads(Path(baseline_file).read_text())
+    previous = {(r["scenario"], r["size"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline_file} ({baseline['meta'].get('git_revision')}):")
+    for result in results:
+        before = previous.get((result["scenario"], result["size"]))
+        if not before or "error" in result or "error" in before:
+            continue
+        p50 = result["latency_ms"]["p50"]
+        old = before["latency_ms"]["p50"]
+        change = (p50 - old) / old * 100 if old else 0.0
+        print(
+            f"  {result['scenario']:<22} {str(result['size']):>8}  "
+            f"p50 {old:>9.1f} -> {p50:>9.1f} ms ({change:+.1f}%)"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument(
+        "--scenarios", default="", help="comma separated scenario names, all by default"
+    )
+    parser.add_argument(
+        "--warm-cache",
+        action="store_true",
+        help="keep the cache between iterations instead of measuring cold requests",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="result file, benchmarks/results/ by default")
+    parser.add_argument("--compare", help="previous result file to compare with")
+    parser.add_argument("--no-migrate", action="store_true")
+    args = parser.parse_args(argv)
+
+    from benchmarks.fake_central import FakeCentralConfig, start_in_thread
+
+    server, central_url = start_in_thread(FakeCentralConfig(latency_ms=args.latency_ms))
+    os.environ["ODK_CENTRAL_URL"] = central_url
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+    import django
+
+    django.setup()
+
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+
+    from rest_framework.test import APIClient
+
+    from benchmarks.fixtures import ensure_fixtures, seed_app_users
+
+    if not args.no_migrate:
+        call_command("migrate", verbosity=0)
+    user, project = ensure_fixtures()
+    seed_app_users(server.app)
+
+    client = APIClient()
+    client.force_authenticate(user)
+
+    selected = set(filter(None, args.scenarios.split(",")))
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = []
+    for scenario in SCENARIOS:
+        if selected and scenario.name not in selected:
+            continue
+        for size in sizes if scenario.sized else [None]:
+            if size and scenario.max_size and size > scenario.max_size:
+                continue
+            server.app.config.submissions = size or sizes[0]
+            path = scenario.path.format(project=project.pkid)
+            try:
+                result = run_scenario(
+                    client,
+                    scenario,
+                    path,
+                    args.iterations,
+                    args.warmup,
+                    cold=not args.warm_cache,
+                )
+            except Exception as e:
+                # One broken scenario must not cost the results of the others
+                print(f"{scenario.name:<22} {str(size or '-'):>8}  failed: {e!r}")
+                results.append(
+                    {
+                        "scenario": scenario.name,
+                        "view": scenario.view,
+                        "size": size,
+                        "error": repr(e),
+                    }
+                )
+                continue
+            result.update(
+                {"scenario": scenario.name, "view": scenario.view, "size": size}
+            )
+            results.append(result)
+            latency = result["latency_ms"]
+            print(
+                f"{scenario.name:<22} {str(size or '-'):>8}  "
+                f"{result['throughput_rps']:>8.1f} req/s  p50 {latency['p50']:>9.1f} ms  "
+                f"p95 {latency['p95']:>9.1f} ms  peak {result['peak_memory_kb']:>10.0f} KB"
+                + (f"  errors {result['errors']}" if result["errors"] else "")
+            )
+
+    now = datetime.now(timezone.utc)
+    report = {
+        "meta": {
+            "timestamp": now.isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": connection.vendor,
+            "cache": settings.CACHES["default"]["BACKEND"],
+            "iterations": args.iterations,
+            "cold_cache": not args.warm_cache,
+            "fake_central_latency_ms": args.latency_ms,
+        },
+        "results": results,
+    }
+    output = (
+        Path(args.output) if args.output else RESULTS_DIR / f"{now:%Y%m%dT%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
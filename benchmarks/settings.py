@@ -0,0 +1,60 @@
+"""
+Settings used by the benchmark and load-test tools: the application settings,
+pointed at the fake ODK Central and at a local Postgres and Redis.
+"""
+
+from os import getenv
+
+from config.settings.common import *  # noqa: F401,F403
+
+DEBUG = False
+SECRET_KEY = getenv("DJANGO_SECRET_KEY", "benchmark-only-secret-key")
+ADMIN_URL = "admin/"
+SIMPLE_JWT = {  # noqa: F405
+    **SIMPLE_JWT,  # noqa: F405
+    "SIGNING_KEY": getenv("SIGNING_KEY", SECRET_KEY),
+}
+ALLOWED_HOSTS = ["*"]
+
+DATABASES["default"].update(  # noqa: F405
+    {
+        "NAME": getenv("POSTGRES_DB", "sycosur_bench"),
+        "USER": getenv("POSTGRES_USER", "postgres"),
+        "PASSWORD": getenv("POSTGRES_PASSWORD", "postgres"),
+        "HOST": getenv("POSTGRES_HOST", "localhost"),
+        "PORT": getenv("POSTGRES_PORT", "5432"),
+    }
+)
+
+# A dedicated Redis database: the benchmarks flush it between scenarios
+CACHES["default"]["LOCATION"] = getenv(  # noqa: F405
+    "BENCHMARK_REDIS_URL", "redis://localhost:6379/15"
+)
+if getenv("BENCHMARK_CACHE") == "locmem":
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+ODK_CENTRAL_URL = getenv("ODK_CENTRAL_URL", "http://127.0.0.1:8383/v1")
+ODK_VERIFY_SSL = False
+ODK_ADMIN_EMAIL = "bench-1@example.com"
+ODK_ADMIN_PASSWORD = "bench"
+# Size of the ODK account pool, the fake server accepts any credentials
+if int(getenv("BENCHMARK_ODK_ACCOUNTS", "1")) > 1:
+    ODK_ADMIN_EMAIL_2 = "bench-2@example.com"
+    ODK_ADMIN_PASSWORD_2 = "bench"
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+SLOW_REQUEST_THRESHOLD_MS = 10**9
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "root": {"level": "ERROR"},
+}
+
+# Load tests log many virtual users in from a single address, and measure the
+# server rather than the cost budgets: no "cost" rate, no CostBasedThrottle
+REST_FRAMEWORK = {  # noqa: F405
+    **REST_FRAMEWORK,  # noqa: F405
+    "DEFAULT_THROTTLE_RATES": {"anon": "1000000/day"},
+}
@@ -0,0 +1,18 @@
+# Gunicorn configuration: gunicorn config.wsgi -c config/gunicorn.py
+#
+# Prometheus metrics are collected per worker process. Set
+# PROMETHEUS_MULTIPROC_DIR to an empty directory before starting gunicorn so
+# that /metrics can merge the values of every worker.
+import os
+
+from prometheus_client import multiprocess
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 330))
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
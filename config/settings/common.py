@@ -66,6 +66,7 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    "core_apps.common.middleware.RequestProfileMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     # "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -76,6 +77,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core_apps.odk.middleware.ODKDeadlineMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -213,11 +215,73 @@ CELERY_TASK_SOFT_TIME_LIMIT = 60
 
 CELERY_WORKER_SEND_TASK_EVENTS = True
 
-# CELERY_BEAT_SCHEDULE = {
-#     # "update-reputations-every-day": {
-#     #     "task": "update_all_reputations",
-#     # }
-# }
+# ODK Central audit log poller: bumps the cache versions of the projects and
+# forms changed in Central, so cached ODK data can be kept ODK_AUDIT_CACHE_TIMEOUT
+# seconds instead of the short default timeouts of ODKCacheManager
+ODK_AUDIT_POLL_ENABLED = getenv("ODK_AUDIT_POLL_ENABLED", "False") == "True"
+ODK_AUDIT_POLL_INTERVAL = int(getenv("ODK_AUDIT_POLL_INTERVAL", "10"))
+ODK_AUDIT_PAGE_SIZE = int(getenv("ODK_AUDIT_PAGE_SIZE", "500"))
+ODK_AUDIT_CACHE_TIMEOUT = int(getenv("ODK_AUDIT_CACHE_TIMEOUT", "3600"))
+
+# Outbound rate limit toward ODK Central, shared by all workers through Redis:
+# token buckets per server and per pooled account (requests per second and
+# burst). Requests over the rate wait up to ODK_RATE_LIMIT_MAX_WAIT seconds, and
+# a 429 from ODK Central pauses the buckets for its Retry-After.
+ODK_RATE_LIMIT_ENABLED = getenv("ODK_RATE_LIMIT_ENABLED", "False") == "True"
+ODK_RATE_LIMIT_SERVER_RATE = float(getenv("ODK_RATE_LIMIT_SERVER_RATE", "20"))
+ODK_RATE_LIMIT_SERVER_BURST = float(getenv("ODK_RATE_LIMIT_SERVER_BURST", "40"))
+ODK_RATE_LIMIT_ACCOUNT_RATE = float(getenv("ODK_RATE_LIMIT_ACCOUNT_RATE", "10"))
+ODK_RATE_LIMIT_ACCOUNT_BURST = float(getenv("ODK_RATE_LIMIT_ACCOUNT_BURST", "20"))
+ODK_RATE_LIMIT_MAX_WAIT = float(getenv("ODK_RATE_LIMIT_MAX_WAIT", "10"))
+
+# ODK account pool priorities: ODK_POOL_RESERVED_INTERACTIVE accounts are kept
+# for interactive requests, background leases (Celery tasks, exports) are capped
+# at ODK_POOL_MAX_BACKGROUND accounts (no cap when empty), and a waiting lease
+# moves up one priority class every ODK_POOL_AGING_SECONDS
+ODK_POOL_RESERVED_INTERACTIVE = int(getenv("ODK_POOL_RESERVED_INTERACTIVE", "1"))
+ODK_POOL_AGING_SECONDS = float(getenv("ODK_POOL_AGING_SECONDS", "10"))
+ODK_POOL_CLASS_LIMITS = {
+    "background": (
+        int(getenv("ODK_POOL_MAX_BACKGROUND"))
+        if getenv("ODK_POOL_MAX_BACKGROUND")
+        else None
+    ),
+}
+
+# Cache warming: the most read projects, forms and submission lists (Redis
+# sorted set of access counters) are reloaded before their cache expires and
+# right after the audit poller invalidates them. The tasks go to their own
+# queue: run a worker with -Q celery,odk_warming (or a dedicated one). The
+# form and submission list views only serve these caches when warming is on.
+ODK_WARMING_ENABLED = getenv("ODK_WARMING_ENABLED", "False") == "True"
+ODK_WARMING_QUEUE = getenv("ODK_WARMING_QUEUE", "odk_warming")
+ODK_WARMING_INTERVAL = int(getenv("ODK_WARMING_INTERVAL", "60"))
+ODK_WARMING_TOP_N = int(getenv("ODK_WARMING_TOP_N", "50"))
+ODK_WARMING_REFRESH_AHEAD = int(getenv("ODK_WARMING_REFRESH_AHEAD", "120"))
+ODK_WARMING_DECAY = float(getenv("ODK_WARMING_DECAY", "0.5"))
+ODK_WARMING_DECAY_INTERVAL = int(getenv("ODK_WARMING_DECAY_INTERVAL", "3600"))
+
+CELERY_TASK_ROUTES = {
+    "core_apps.odk.tasks.warm_odk_caches": {"queue": ODK_WARMING_QUEUE},
+    "core_apps.odk.tasks.decay_odk_warming_hits": {"queue": ODK_WARMING_QUEUE},
+}
+
+CELERY_BEAT_SCHEDULE = {
+    "poll-odk-audits": {
+        "task": "core_apps.odk.tasks.poll_odk_audits",
+        "schedule": ODK_AUDIT_POLL_INTERVAL,
+        "options": {"expires": ODK_AUDIT_POLL_INTERVAL},
+    },
+    "warm-odk-caches": {
+        "task": "core_apps.odk.tasks.warm_odk_caches",
+        "schedule": ODK_WARMING_INTERVAL,
+        "options": {"expires": ODK_WARMING_INTERVAL},
+    },
+    "decay-odk-warming-hits": {
+        "task": "core_apps.odk.tasks.decay_odk_warming_hits",
+        "schedule": ODK_WARMING_DECAY_INTERVAL,
+    },
+}
 
 COOKIE_NAME = "access"
 COOKIE_SAMESITE = "Lax"
@@ -239,11 +303,19 @@ REST_FRAMEWORK = {
     "MAX_PAGE_SIZE": 100,  # Limite maximum
     "DEFAULT_THROTTLE_CLASSES": (
         "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "core_apps.common.throttling.CostBasedThrottle",
     ),
+    # Cost budgets (see CostBasedThrottle): "cost" per user by default,
+    # "cost_<odk role>" per user of a role, "cost_role_<odk role>" shared by
+    # all the users of a role
     "DEFAULT_THROTTLE_RATES": {
         "anon": "200/day",
-        "user": "1000000/day",
+        "cost": getenv("THROTTLE_COST_RATE", "5000/hour"),
+        "cost_manager": getenv("THROTTLE_COST_MANAGER_RATE", "10000/hour"),
+        "cost_administrator": getenv("THROTTLE_COST_ADMINISTRATOR_RATE", "20000/hour"),
+        "cost_role_data_collector": getenv(
+            "THROTTLE_COST_DATA_COLLECTORS_RATE", "50000/hour"
+        ),
     },
     # 'DEFAULT_RENDERER_CLASSES': [
     #     'core_apps.common.renderers.GenericJSONRenderer',
@@ -322,6 +394,106 @@ ODK_ADMIN_PASSWORD = "INSUCO2520"
 ODK_ADMIN_EMAIL2 = getenv("ODK_ADMIN_EMAIL2")
 ODK_ADMIN_PASSWORD2 = getenv("ODK_ADMIN_PASSWORD2")
 
+# ODK HTTP transport
+ODK_VERIFY_SSL = getenv("ODK_VERIFY_SSL", "True").lower() in ("true", "1", "t")
+ODK_CONNECT_TIMEOUT = float(getenv("ODK_CONNECT_TIMEOUT", "5"))
+ODK_READ_TIMEOUT = float(getenv("ODK_READ_TIMEOUT", "120"))
+# Connection pool per account session: hosts kept, connections kept per host
+ODK_POOL_CONNECTIONS = int(getenv("ODK_POOL_CONNECTIONS", "4"))
+ODK_POOL_MAXSIZE = int(getenv("ODK_POOL_MAXSIZE", "10"))
+# urllib3-level retries of failed connections (read errors are retried by the
+# ODK client itself, within the request deadline)
+ODK_TRANSPORT_RETRIES = int(getenv("ODK_TRANSPORT_RETRIES", "2"))
+
+# Hedged ODK GETs: after the endpoint's p95 latency (ODK_HEDGE_DELAY until enough
+# samples), a duplicate is sent on another free account. Hedges are capped to
+# ODK_HEDGE_BUDGET_RATIO of the hedgeable requests.
+ODK_HEDGING_ENABLED = getenv("ODK_HEDGING_ENABLED", "False") == "True"
+ODK_HEDGE_DELAY = float(getenv("ODK_HEDGE_DELAY", "1.0"))
+ODK_HEDGE_PERCENTILE = 95
+ODK_HEDGE_BUDGET_RATIO = float(getenv("ODK_HEDGE_BUDGET_RATIO", "0.05"))
+
+# ODK circuit breaker (state shared between workers through the Redis cache)
+ODK_CIRCUIT_FAILURE_THRESHOLD = int(getenv("ODK_CIRCUIT_FAILURE_THRESHOLD", "5"))
+ODK_CIRCUIT_FAILURE_WINDOW = int(getenv("ODK_CIRCUIT_FAILURE_WINDOW", "60"))
+ODK_CIRCUIT_RECOVERY_TIMEOUT = int(getenv("ODK_CIRCUIT_RECOVERY_TIMEOUT", "30"))
+# Last known ODK payloads served while the circuit is open: refreshed at most
+# every ODK_LAST_KNOWN_REFRESH seconds, not kept above ODK_LAST_KNOWN_MAX_BYTES
+ODK_LAST_KNOWN_REFRESH = int(getenv("ODK_LAST_KNOWN_REFRESH", "600"))
+ODK_LAST_KNOWN_MAX_BYTES = int(getenv("ODK_LAST_KNOWN_MAX_BYTES", str(1024 * 1024)))
+
+# Time budget (seconds) shared by all the ODK calls of one API request.
+# Views can override it with an `odk_deadline` class attribute.
+ODK_REQUEST_DEADLINE = int(getenv("ODK_REQUEST_DEADLINE", "60"))
+
+# XLSForm conversions (pyxform) run in a warm process pool, cached by file hash
+ODK_XLSFORM_WORKERS = int(getenv("ODK_XLSFORM_WORKERS", "2"))
+ODK_XLSFORM_CONVERSION_TIMEOUT = int(getenv("ODK_XLSFORM_CONVERSION_TIMEOUT", "60"))
+
+# Submission analytics: OData page size, age (seconds) under which cached
+# aggregates are served as is, and interval between full recomputations. Full
+# recomputations run in the refresh_form_analytics Celery task, within
+# ODK_ANALYTICS_REFRESH_DEADLINE seconds.
+ODK_ANALYTICS_PAGE_SIZE = int(getenv("ODK_ANALYTICS_PAGE_SIZE", "5000"))
+ODK_ANALYTICS_MAX_AGE = int(getenv("ODK_ANALYTICS_MAX_AGE", "60"))
+ODK_ANALYTICS_FULL_REFRESH = int(getenv("ODK_ANALYTICS_FULL_REFRESH", "3600"))
+ODK_ANALYTICS_REFRESH_DEADLINE = int(getenv("ODK_ANALYTICS_REFRESH_DEADLINE", "480"))
+
+# Parquet snapshots of form submissions on local disk, used by exports and
+# analytics. Refreshed incrementally when older than ODK_SNAPSHOT_MAX_AGE
+# seconds, rebuilt every ODK_SNAPSHOT_FULL_REFRESH seconds in a background
+# thread (within ODK_SNAPSHOT_REBUILD_DEADLINE seconds). A first snapshot being
+# built by another process is awaited at most ODK_SNAPSHOT_LOCK_TIMEOUT seconds.
+ODK_SNAPSHOTS_ENABLED = getenv("ODK_SNAPSHOTS_ENABLED", "False") == "True"
+ODK_SNAPSHOT_DIR = getenv("ODK_SNAPSHOT_DIR", str(BASE_DIR / "snapshots"))
+ODK_SNAPSHOT_MAX_AGE = int(getenv("ODK_SNAPSHOT_MAX_AGE", "60"))
+ODK_SNAPSHOT_FULL_REFRESH = int(getenv("ODK_SNAPSHOT_FULL_REFRESH", "3600"))
+ODK_SNAPSHOT_MAX_PARTS = int(getenv("ODK_SNAPSHOT_MAX_PARTS", "20"))
+ODK_SNAPSHOT_REBUILD_DEADLINE = int(getenv("ODK_SNAPSHOT_REBUILD_DEADLINE", "600"))
+ODK_SNAPSHOT_LOCK_TIMEOUT = int(getenv("ODK_SNAPSHOT_LOCK_TIMEOUT", "30"))
+
+# Submissions map: spatial index refresh (as for analytics, full rebuilds in
+# the refresh_geo_index Celery task within ODK_GEO_REFRESH_DEADLINE seconds),
+# features per GeoJSON response, clustering grid (cells per tile side) and
+# indexes kept unpickled in each process
+ODK_GEO_MAX_AGE = int(getenv("ODK_GEO_MAX_AGE", "60"))
+ODK_GEO_FULL_REFRESH = int(getenv("ODK_GEO_FULL_REFRESH", "3600"))
+ODK_GEO_REFRESH_DEADLINE = int(getenv("ODK_GEO_REFRESH_DEADLINE", "480"))
+ODK_GEO_MAX_FEATURES = int(getenv("ODK_GEO_MAX_FEATURES", "10000"))
+ODK_GEO_TILE_GRID = int(getenv("ODK_GEO_TILE_GRID", "64"))
+ODK_GEO_LOCAL_INDEXES = int(getenv("ODK_GEO_LOCAL_INDEXES", "4"))
+
+# Project dashboard summary: most accounts (and threads) leased by one round
+# of concurrent ODK reads, among those free, accounts used for the per-form
+# public links, and summary cache lifetime (seconds)
+ODK_FANOUT_MAX_WORKERS = int(getenv("ODK_FANOUT_MAX_WORKERS", "8"))
+ODK_DASHBOARD_LINK_WORKERS = int(getenv("ODK_DASHBOARD_LINK_WORKERS", "4"))
+ODK_DASHBOARD_CACHE_TIMEOUT = int(getenv("ODK_DASHBOARD_CACHE_TIMEOUT", "60"))
+
+# Batch endpoint (/api/v1/batch): sub-requests per batch, workers (each on one
+# leased ODK account) per batch, threads per process and allowed path prefixes
+ODK_BATCH_MAX_REQUESTS = int(getenv("ODK_BATCH_MAX_REQUESTS", "20"))
+ODK_BATCH_MAX_PARALLEL = int(getenv("ODK_BATCH_MAX_PARALLEL", "4"))
+ODK_BATCH_MAX_WORKERS = int(getenv("ODK_BATCH_MAX_WORKERS", "8"))
+ODK_BATCH_ALLOWED_PREFIXES = ("/api/v1/odk/",)
+
+# Request profiling: Server-Timing header and slow-request log
+SERVER_TIMING_ENABLED = getenv("SERVER_TIMING_ENABLED", "True") == "True"
+SLOW_REQUEST_THRESHOLD_MS = int(getenv("SLOW_REQUEST_THRESHOLD_MS", "2000"))
+
+# OpenTelemetry tracing (views, ODK calls, ORM, cache and Celery tasks)
+OTEL_ENABLED = getenv("OTEL_ENABLED", "False") == "True"
+OTEL_SERVICE_NAME = getenv("OTEL_SERVICE_NAME", "sycosur-api")
+# "otlp" (OTLP over HTTP) or "console"
+OTEL_TRACES_EXPORTER = getenv("OTEL_TRACES_EXPORTER", "otlp")
+OTEL_EXPORTER_OTLP_ENDPOINT = getenv(
+    "OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"
+)
+
+# Prometheus /metrics endpoint, protected by this bearer token. Without it the
+# endpoint answers 404, except in DEBUG
+PROMETHEUS_METRICS_TOKEN = getenv("PROMETHEUS_METRICS_TOKEN")
+
 # Guardian settings
 ANONYMOUS_USER_NAME = 'AnonymousUser'
 GUARDIAN_RENDER_403 = True  # Page d'erreur personnalisable
@@ -7,6 +7,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
+from core_apps.odk.views import BatchView, MetricsView
+
 schema_view = get_schema_view(
     openapi.Info(
         title=" SYCOSUR API",
@@ -31,6 +33,8 @@ urlpatterns = [
     path("api/v1/profiles/", include("core_apps.profiles.urls")),
     path("api/v1/projects/", include("core_apps.projects.urls")),
     path("api/v1/odk/", include("core_apps.odk.urls")),
+    path("api/v1/batch", BatchView.as_view(), name="batch"),
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ]
 
 admin.site.site_header = "Sycosur2.0"
@@ -0,0 +1,50 @@
+import json
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+from core_apps.common.profiling import get_profile, start_profile, stop_profile
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfileMiddleware:
+    """
+    Profile every request: SQL queries, ODK Central calls, pool wait, cache
+    lookups and rendering time. The summary is returned in a Server-Timing
+    header and requests slower than SLOW_REQUEST_THRESHOLD_MS are logged.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = start_profile()
+        profile = get_profile()
+        try:
+            with connection.execute_wrapper(profile.sql_wrapper):
+                response = self.get_response(request)
+
+            if getattr(settings, "SERVER_TIMING_ENABLED", True):
+                response["Server-Timing"] = profile.server_timing()
+
+            threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 2000)
+            if profile.total_time * 1000 >= threshold:
+                entry = {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "user": (
+                        getattr(request.user, "id", None)
+                        if hasattr(request, "user")
+                        else None
+                    ),
+                    **profile.as_dict(),
+                }
+                logger.warning(
+                    f"Slow request: {json.dumps(entry, default=str)}", extra=entry
+                )
+            return response
+        finally:
+            stop_profile(token)
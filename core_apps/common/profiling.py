@@ -0,0 +1,104 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Profile of the request being served, set by RequestProfileMiddleware
+_profile: ContextVar["RequestProfile | None"] = ContextVar(
+    "request_profile", default=None
+)
+
+
+class RequestProfile:
+    """Counters and timings collected while serving a single request"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.odk_count = 0
+        self.odk_time = 0.0
+        self.pool_wait = 0.0
+        self.render_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def total_time(self) -> float:
+        return time.monotonic() - self.started
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook timing every SQL query"""
+        started = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.monotonic() - started
+
+    def as_dict(self) -> dict:
+        return {
+            "total_ms": round(self.total_time * 1000, 1),
+            "sql_count": self.sql_count,
+            "sql_ms": round(self.sql_time * 1000, 1),
+            "odk_count": self.odk_count,
+            "odk_ms": round(self.odk_time * 1000, 1),
+            "pool_wait_ms": round(self.pool_wait * 1000, 1),
+            "render_ms": round(self.render_time * 1000, 1),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+    def server_timing(self) -> str:
+        """Value of the Server-Timing response header"""
+        metrics = [
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"',
+            f'odk;dur={self.odk_time * 1000:.1f};desc="{self.odk_count} calls"',
+            f"pool;dur={self.pool_wait * 1000:.1f}",
+            f"render;dur={self.render_time * 1000:.1f}",
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f"total;dur={self.total_time * 1000:.1f}",
+        ]
+        return ", ".join(metrics)
+
+
+def start_profile():
+    """Start profiling the current request, returns the token for stop_profile"""
+    return _profile.set(RequestProfile())
+
+
+def stop_profile(token) -> None:
+    _profile.reset(token)
+
+
+def get_profile() -> RequestProfile | None:
+    return _profile.get()
+
+
+def record_odk_call(seconds: float) -> None:
+    if profile := _profile.get():
+        profile.odk_count += 1
+        profile.odk_time += seconds
+
+
+def record_pool_wait(seconds: float) -> None:
+    if profile := _profile.get():
+        profile.pool_wait += seconds
+
+
+def record_cache_lookup(hit: bool) -> None:
+    if profile := _profile.get():
+        if hit:
+            profile.cache_hits += 1
+        else:
+            profile.cache_misses += 1
+
+
+@contextmanager
+def profile_render():
+    """Time the rendering of the response body"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        if profile := _profile.get():
+            profile.render_time += time.monotonic() - started
@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Token buckets stored as Redis hashes {tokens, stamp, blocked_until}. Every
+# bucket is refilled from the Redis clock, then the request reserves its
+# tokens in all the buckets at once: a bucket may go negative, the caller
+# waiting until it is paid back. Reserving (instead of failing and retrying)
+# queues concurrent callers in arrival order. Nothing is reserved when the
+# wait would exceed max_wait.
+#
+# KEYS: bucket keys. ARGV: cost, max_wait, then rate and capacity per key.
+# Returns {granted (0/1), wait in microseconds}.
+TAKE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local max_wait = tonumber(ARGV[2])
+local states = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + 2 * i])
+    local capacity = tonumber(ARGV[2 + 2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'stamp', 'blocked_until')
+    local tokens = tonumber(state[1]) or capacity
+    local stamp = tonumber(state[2]) or now
+    local blocked_until = tonumber(state[3]) or 0
+    tokens = math.min(capacity, tokens + math.max(0, now - stamp) * rate)
+    local key_wait = math.max(0, blocked_until - now)
+    if tokens < cost then
+        key_wait = math.max(key_wait, (cost - tokens) / rate)
+    end
+    wait = math.max(wait, key_wait)
+    states[i] = {tokens, rate, capacity, blocked_until}
+end
+local granted = 0
+if wait <= max_wait then
+    granted = 1
+end
+for i, key in ipairs(KEYS) do
+    local tokens = states[i][1]
+    if granted == 1 then
+        tokens = tokens - cost
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'stamp', now)
+    -- Keep the key until it is refilled and any pause (BLOCK_SCRIPT) is over
+    local refill = math.ceil((states[i][3] - tokens) / states[i][2])
+    local blocked = math.ceil(math.max(0, states[i][4] - now))
+    redis.call('EXPIRE', key, math.max(refill, blocked) + 60)
+end
+return {granted, math.floor(wait * 1000000)}
+"""
+
+# KEYS: bucket keys. ARGV: seconds during which the buckets grant nothing.
+BLOCK_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local until_ = now + tonumber(ARGV[1])
+for _, key in ipairs(KEYS) do
+    local current = tonumber(redis.call('HGET', key, 'blocked_until')) or 0
+    if until_ > current then
+        redis.call('HSET', key, 'blocked_until', until_)
+    end
+    -- Never shorten the TTL set by TAKE_SCRIPT for a bucket still in debt
+    local ttl = math.max(redis.call('TTL', key), math.ceil(tonumber(ARGV[1])) + 60)
+    redis.call('EXPIRE', key, ttl)
+end
+return 1
+"""
+
+
+class Bucket:
+    """A token bucket: `rate` tokens per second, at most `capacity` in stock"""
+
+    def __init__(self, key: str, rate: float, capacity: float):
+        self.key = key
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+
+
+class LocalBucketStore:
+    """Same algorithm as TAKE_SCRIPT, in process memory, for non-Redis caches"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.states = {}
+
+    def take(self, buckets: list, cost: float, max_wait: float) -> tuple[bool, float]:
+        with self.lock:
+            now = time.monotonic()
+            wait, states = 0.0, []
+            for bucket in buckets:
+                tokens, stamp, blocked_until = self.states.get(
+                    bucket.key, (bucket.capacity, now, 0.0)
+                )
+                tokens = min(bucket.capacity, tokens + (now - stamp) * bucket.rate)
+                key_wait = max(0.0, blocked_until - now)
+                if tokens < cost:
+                    key_wait = max(key_wait, (cost - tokens) / bucket.rate)
+                wait = max(wait, key_wait)
+                states.append((tokens, blocked_until))
+            granted = wait <= max_wait
+            for bucket, (tokens, blocked_until) in zip(buckets, states):
+                if granted:
+                    tokens -= cost
+                self.states[bucket.key] = (tokens, now, blocked_until)
+            return granted, wait
+
+    def block(self, buckets: list, seconds: float) -> None:
+        with self.lock:
+            now = time.monotonic()
+            for bucket in buckets:
+                tokens, stamp, blocked_until = self.states.get(
+                    bucket.key, (bucket.capacity, now, 0.0)
+                )
+                self.states[bucket.key] = (
+                    tokens,
+                    stamp,
+                    max(blocked_until, now + seconds),
+                )
+
+
+_local_store = LocalBucketStore()
+
+
+class RedisBucketStore:
+    """Token buckets shared by every worker through the Redis cache"""
+
+    def __init__(self, client):
+        self.take_script = client.register_script(TAKE_SCRIPT)
+        self.block_script = client.register_script(BLOCK_SCRIPT)
+
+    def take(self, buckets: list, cost: float, max_wait: float) -> tuple[bool, float]:
+        args = [cost, max_wait]
+        for bucket in buckets:
+            args += [bucket.rate, bucket.capacity]
+        granted, wait = self.take_script(
+            keys=[bucket.key for bucket in buckets], args=args
+        )
+        return bool(granted), wait / 1_000_000
+
+    def block(self, buckets: list, seconds: float) -> None:
+        self.block_script(keys=[bucket.key for bucket in buckets], args=[seconds])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """Redis store when the default cache is django-redis, process-local otherwise"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                from django_redis import get_redis_connection
+
+                _store = RedisBucketStore(get_redis_connection("default"))
+            except (ImportError, NotImplementedError):
+                logger.warning(
+                    "Default cache is not Redis, rate limits apply per process"
+                )
+                _store = _local_store
+        return _store
+
+
+def take_tokens(
+    buckets: list, cost: float = 1, max_wait: float = 0
+) -> tuple[bool, float]:
+    """
+    Reserve `cost` tokens in every bucket, atomically. Returns (granted, wait):
+    when granted, the caller must wait `wait` seconds before going ahead; when
+    not, nothing was reserved and `wait` is the time the reservation needed.
+    """
+    return get_bucket_store().take(buckets, cost, max_wait)
+
+
+def block_buckets(buckets: list, seconds: float) -> None:
+    """Grant nothing from these buckets for `seconds` (e.g. after a 429)"""
+    if seconds > 0:
+        get_bucket_store().block(buckets, seconds)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds asked by a Retry-After header (delay or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
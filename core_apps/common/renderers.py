@@ -5,6 +5,8 @@ from django.utils.translation import gettext_lazy as _
 
 from rest_framework.renderers import JSONRenderer
 
+from core_apps.common.profiling import profile_render
+
 
 class GenericJSONRenderer(JSONRenderer):
     """
@@ -29,6 +31,15 @@ class GenericJSONRenderer(JSONRenderer):
         data: Any,
         accepted_media_type: Optional[str] = None,
         renderer_context: Optional[Dict] = None,
+    ) -> Union[bytes, str]:
+        with profile_render():
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(
+        self,
+        data: Any,
+        accepted_media_type: Optional[str] = None,
+        renderer_context: Optional[Dict] = None,
     ) -> Union[bytes, str]:
         """
         Render the data into a standardized format.
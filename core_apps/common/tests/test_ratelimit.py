@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core_apps.common import ratelimit
+from core_apps.common.ratelimit import (
+    Bucket,
+    LocalBucketStore,
+    block_buckets,
+    parse_retry_after,
+    take_tokens,
+)
+
+
+class LocalBucketStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(
+            ratelimit.time, "monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = LocalBucketStore()
+        # 2 tokens per second, 10 at most
+        self.bucket = Bucket("test_bucket", rate=2, capacity=10)
+
+    def test_grants_the_whole_capacity_at_once(self):
+        self.assertEqual(self.store.take([self.bucket], 10, 0), (True, 0.0))
+
+    def test_denies_without_reserving_when_over_max_wait(self):
+        self.store.take([self.bucket], 10, 0)
+        granted, wait = self.store.take([self.bucket], 4, 0)
+        self.assertFalse(granted)
+        self.assertEqual(wait, 2.0)
+        # The denied request did not spend anything
+        self.now += 2
+        self.assertEqual(self.store.take([self.bucket], 4, 0), (True, 0.0))
+
+    def test_refills_at_the_rate_up_to_the_capacity(self):
+        self.store.take([self.bucket], 10, 0)
+        self.now += 1
+        self.assertEqual(self.store.take([self.bucket], 2, 0), (True, 0.0))
+        self.now += 3600
+        self.assertEqual(self.store.take([self.bucket], 10, 0), (True, 0.0))
+        self.assertFalse(self.store.take([self.bucket], 1, 0)[0])
+
+    def test_reservations_within_max_wait_queue_callers(self):
+        self.store.take([self.bucket], 10, 0)
+        self.assertEqual(self.store.take([self.bucket], 2, 5), (True, 1.0))
+        # The next caller waits behind the first reservation
+        self.assertEqual(self.store.take([self.bucket], 2, 5), (True, 2.0))
+
+    def test_takes_from_every_bucket_or_none(self):
+        small = Bucket("test_small", rate=1, capacity=1)
+        self.assertTrue(self.store.take([self.bucket, small], 1, 0)[0])
+        granted, wait = self.store.take([self.bucket, small], 1, 0)
+        self.assertFalse(granted)
+        self.assertEqual(wait, 1.0)
+        # The large bucket was left untouched by the denial
+        self.assertEqual(self.store.take([self.bucket], 9, 0), (True, 0.0))
+
+    def test_block_pauses_the_buckets(self):
+        self.store.block([self.bucket], 30)
+        self.assertEqual(self.store.take([self.bucket], 1, 0), (False, 30.0))
+        self.now += 30
+        self.assertEqual(self.store.take([self.bucket], 1, 0), (True, 0.0))
+
+    def test_block_never_shortens_a_pause(self):
+        self.store.block([self.bucket], 30)
+        self.store.block([self.bucket], 5)
+        self.assertEqual(self.store.take([self.bucket], 1, 0)[1], 30.0)
+
+
+class TakeTokensTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ratelimit, "_store", LocalBucketStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_uses_the_bucket_store(self):
+        bucket = Bucket("test_take", rate=1, capacity=3)
+        self.assertEqual(take_tokens([bucket], 3), (True, 0.0))
+        granted, wait = take_tokens([bucket], 1)
+        self.assertFalse(granted)
+        self.assertGreater(wait, 0)
+
+    def test_block_buckets_ignores_empty_pauses(self):
+        bucket = Bucket("test_block", rate=1, capacity=3)
+        block_buckets([bucket], 0)
+        self.assertEqual(take_tokens([bucket], 1), (True, 0.0))
+        block_buckets([bucket], 60)
+        self.assertFalse(take_tokens([bucket], 1)[0])
+
+
+class ParseRetryAfterTests(SimpleTestCase):
+    def test_delay_in_seconds(self):
+        self.assertEqual(parse_retry_after("120"), 120.0)
+        self.assertEqual(parse_retry_after("-5"), 0.0)
+
+    def test_http_date(self):
+        date = datetime.now(timezone.utc) + timedelta(seconds=60)
+        self.assertAlmostEqual(
+            parse_retry_after(format_datetime(date, usegmt=True)), 60, delta=2
+        )
+
+    def test_missing_or_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after(""))
+        self.assertIsNone(parse_retry_after("soon"))
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from core_apps.common import ratelimit
+from core_apps.common.ratelimit import LocalBucketStore
+from core_apps.common.throttling import CostBasedThrottle
+
+RATES = {
+    "cost": "10/hour",
+    "cost_manager": "30/hour",
+    "cost_role_data_collector": "15/hour",
+}
+
+
+class ExportView(APIView):
+    permission_classes = [AllowAny]
+    throttle_classes = [CostBasedThrottle]
+    throttle_cost = {"GET": 1, "POST": 4}
+
+    def get(self, request):
+        return Response({})
+
+    def post(self, request):
+        return Response({})
+
+
+def make_user(pk, role=None):
+    profile = SimpleNamespace(odk_role=role) if role else None
+    return SimpleNamespace(pk=pk, is_authenticated=True, profile=profile)
+
+
+class CostBasedThrottleTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        for patcher in (
+            mock.patch.object(ratelimit, "_store", LocalBucketStore()),
+            mock.patch.object(CostBasedThrottle, "THROTTLE_RATES", RATES),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def call(self, user, method="get"):
+        request = getattr(self.factory, method)("/export/")
+        if user is not None:
+            force_authenticate(request, user=user)
+        return ExportView.as_view()(request)
+
+    def test_spends_the_cost_of_the_method(self):
+        user = make_user(1)
+        for _ in range(2):
+            self.assertEqual(self.call(user, "post").status_code, 200)
+        self.assertEqual(self.call(user).status_code, 200)
+        self.assertEqual(self.call(user).status_code, 200)
+        response = self.call(user, "post")
+        self.assertEqual(response.status_code, 429)
+        # 4 tokens short at 10 per hour
+        self.assertEqual(response["Retry-After"], "1440")
+
+    def test_costlier_requests_spend_the_whole_budget(self):
+        user = make_user(1)
+        with mock.patch.object(ExportView, "throttle_cost", 1000):
+            self.assertEqual(self.call(user).status_code, 200)
+            self.assertEqual(self.call(user).status_code, 429)
+
+    def test_budgets_are_per_user(self):
+        for _ in range(10):
+            self.call(make_user(1))
+        self.assertEqual(self.call(make_user(1)).status_code, 429)
+        self.assertEqual(self.call(make_user(2)).status_code, 200)
+
+    def test_role_rate_replaces_the_default_rate(self):
+        manager = make_user(1, "manager")
+        for _ in range(30):
+            self.assertEqual(self.call(manager).status_code, 200)
+        self.assertEqual(self.call(manager).status_code, 429)
+
+    def test_role_budget_is_shared_by_its_users(self):
+        # Each collector has the default budget of 10, the role shares 15
+        for pk in (1, 2):
+            for _ in range(7):
+                self.call(make_user(pk, "data_collector"))
+        self.assertEqual(self.call(make_user(3, "data_collector")).status_code, 200)
+        response = self.call(make_user(4, "data_collector"))
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        # Other roles are not affected
+        self.assertEqual(self.call(make_user(5, "manager")).status_code, 200)
+
+    def test_anonymous_requests_are_not_throttled(self):
+        for _ in range(20):
+            self.assertEqual(self.call(None).status_code, 200)
@@ -0,0 +1,75 @@
+from django.core.exceptions import ObjectDoesNotExist
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from core_apps.common.ratelimit import Bucket, take_tokens
+
+
+class CostBasedThrottle(SimpleRateThrottle):
+    """
+    Throttle spending a budget of cost units rather than counting requests:
+    views declare what a request costs with `throttle_cost` (an int, or a
+    dict by HTTP method; 1 by default), so that an export weighs as much as
+    hundreds of lookups.
+
+    Budgets are token buckets (core_apps.common.ratelimit) refilled at the
+    DEFAULT_THROTTLE_RATES rate of the user's ODK role, "cost_<role>", or
+    "cost" for everyone else; the whole budget can be spent at once. When a
+    "cost_role_<role>" rate is set, all the users of the role also share that
+    budget. Anonymous requests are left to AnonRateThrottle.
+    """
+
+    scope = "cost"
+    cache_format = "throttle_cost_%(scope)s_%(ident)s"
+
+    def __init__(self):
+        # Rates depend on the user, they are looked up in allow_request
+        self.wait_seconds = None
+
+    def get_cost(self, request, view) -> int:
+        cost = getattr(view, "throttle_cost", 1)
+        if isinstance(cost, dict):
+            cost = cost.get(request.method, 1)
+        return cost
+
+    def get_role(self, request) -> str | None:
+        try:
+            return request.user.profile.odk_role
+        except (AttributeError, ObjectDoesNotExist):
+            return None
+
+    def get_bucket(self, scope: str, ident) -> Bucket | None:
+        rate = self.THROTTLE_RATES.get(scope)
+        if rate is None:
+            return None
+        num_requests, duration = self.parse_rate(rate)
+        key = self.cache_format % {"scope": scope, "ident": ident}
+        return Bucket(key, num_requests / duration, num_requests)
+
+    def get_buckets(self, request) -> list:
+        role = self.get_role(request)
+        user_bucket = None
+        if role is not None:
+            user_bucket = self.get_bucket(f"cost_{role}", request.user.pk)
+        buckets = [user_bucket or self.get_bucket(self.scope, request.user.pk)]
+        if role is not None:
+            buckets.append(self.get_bucket(f"cost_role_{role}", "all"))
+        return [bucket for bucket in buckets if bucket is not None]
+
+    def allow_request(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return True
+        buckets = self.get_buckets(request)
+        if not buckets:
+            return True
+        # A request costlier than a whole budget spends all of it
+        cost = min(
+            self.get_cost(request, view), *(bucket.capacity for bucket in buckets)
+        )
+        granted, wait = take_tokens(buckets, cost, max_wait=0)
+        if not granted:
+            self.wait_seconds = wait
+        return granted
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,103 @@
+import logging
+from contextlib import contextmanager
+from importlib import import_module
+
+from django.conf import settings
+
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("core_apps")
+
+# Libraries instrumented when tracing is enabled: (module, instrumentor, options)
+INSTRUMENTATIONS = [
+    ("opentelemetry.instrumentation.psycopg2", "Psycopg2Instrumentor", {}),
+    ("opentelemetry.instrumentation.redis", "RedisInstrumentor", {}),
+    ("opentelemetry.instrumentation.celery", "CeleryInstrumentor", {}),
+]
+
+_configured = False
+
+
+def _get_exporter():
+    exporter = getattr(settings, "OTEL_TRACES_EXPORTER", "otlp")
+    if exporter == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter()
+
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    return OTLPSpanExporter(endpoint=settings.OTEL_EXPORTER_OTLP_ENDPOINT)
+
+
+def _response_hook(span, request, response):
+    """Name the DRF view handling the request on the Django server span"""
+    match = getattr(request, "resolver_match", None)
+    view_class = getattr(getattr(match, "func", None), "view_class", None)
+    if view_class is not None and span.is_recording():
+        span.set_attribute("drf.view", view_class.__name__)
+
+
+def configure_tracing() -> None:
+    """
+    Set up the tracer provider and the instrumentations (Django views, ORM
+    queries through psycopg2, django-redis, Celery tasks) when OTEL_ENABLED.
+    Called once per process from CommonConfig.ready(), in the web and the
+    Celery worker processes.
+    """
+    global _configured
+    if _configured or not getattr(settings, "OTEL_ENABLED", False):
+        return
+    _configured = True
+
+    from opentelemetry.instrumentation.django import DjangoInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME})
+    )
+    provider.add_span_processor(BatchSpanProcessor(_get_exporter()))
+    trace.set_tracer_provider(provider)
+
+    DjangoInstrumentor().instrument(response_hook=_response_hook)
+    for module_name, class_name, options in INSTRUMENTATIONS:
+        try:
+            instrumentor = getattr(import_module(module_name), class_name)
+            instrumentor().instrument(**options)
+        except Exception as e:
+            logger.warning(f"Tracing: unable to enable {class_name}: {e}")
+
+    logger.info(
+        f"Tracing enabled for {settings.OTEL_SERVICE_NAME} "
+        f"({getattr(settings, 'OTEL_TRACES_EXPORTER', 'otlp')} exporter)"
+    )
+
+
+@contextmanager
+def odk_request_span(method: str, endpoint: str, attempt: int, account_id):
+    """Client span around one attempt of an ODK Central request"""
+    from core_apps.odk.utils import get_endpoint_template
+
+    with tracer.start_as_current_span(
+        f"ODK {method} {get_endpoint_template(endpoint)}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "http.request.method": method,
+            "odk.endpoint": get_endpoint_template(endpoint),
+            "odk.attempt": attempt + 1,
+            "odk.retry": attempt > 0,
+            "odk.account_id": str(account_id),
+        },
+    ) as span:
+        yield span
+
+
+def record_response_status(span, status_code: int) -> None:
+    span.set_attribute("http.response.status_code", status_code)
+    if status_code >= 500:
+        span.set_status(Status(StatusCode.ERROR))
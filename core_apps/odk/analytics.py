@@ -0,0 +1,355 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core_apps.odk.cache import ODKCacheManager
+from core_apps.odk.flatten import get_repeat_tables, iter_flat_tables
+from core_apps.odk.snapshots import get_submissions_snapshot, snapshots_enabled
+
+logger = logging.getLogger(__name__)
+
+# Aggregates are shared by all the users allowed on the project
+CACHE_PREFIX = f"{ODKCacheManager.CACHE_PREFIX}analytics_"
+CACHE_TIMEOUT = 30 * 24 * 3600
+LOCK_TIMEOUT = 600
+
+# OData names of the columns used, renamed as in the submissions CSV so that
+# OData pages and Parquet snapshots go through the same aggregation
+ODATA_COLUMNS = {
+    "__id": "KEY",
+    "__system/submissionDate": "SubmissionDate",
+    "__system/submitterId": "SubmitterID",
+    "__system/submitterName": "SubmitterName",
+    "__system/reviewState": "ReviewState",
+}
+
+
+def _cache_key(project_id: int | str, form_id: str) -> str:
+    return f"{CACHE_PREFIX}{project_id}_{form_id}"
+
+
+def _empty_state(schema: dict | None) -> dict:
+    select_fields = {}
+    for column in (schema or {}).get("columns", []):
+        if column["type"] in ("select1", "select"):
+            select_fields[column["name"]] = {
+                "name": column["name"],
+                "label": column["label"],
+                "type": column["type"],
+                # OData nests fields by group: /data/group/q becomes "group/q"
+                "odata_name": column["path"].split("/", 2)[2],
+            }
+    return {
+        "total": 0,
+        "cursor": None,
+        "cursor_ids": [],
+        "per_day": {},
+        "per_enumerator": {},
+        "per_review_state": {},
+        "choices": {name: {} for name in select_fields},
+        "select_fields": select_fields,
+        "snapshot_generation": None,
+        # Repeat tables are not filtered by date: their statistics are only
+        # recomputed with full refreshes
+        "repeats": None,
+        "repeats_at": None,
+        "refreshed_at": None,
+        "full_refresh_at": timezone.now().isoformat(),
+    }
+
+
+def _add_counts(target: dict, counts) -> None:
+    for key, count in counts.items():
+        target[key] = target.get(key, 0) + int(count)
+
+
+def aggregate_frame(state: dict, df) -> None:
+    """Add submissions (columns named as in the CSV export) to the aggregates"""
+    if state["cursor_ids"] and "KEY" in df:
+        # Submissions at the previous cursor date were already counted
+        df = df[~df["KEY"].isin(state["cursor_ids"])]
+    if df.empty:
+        return
+
+    dates = df["SubmissionDate"].astype("string")
+    # Dates are ISO 8601 in UTC: the day is the first ten characters
+    _add_counts(state["per_day"], dates.str[:10].value_counts())
+
+    submitters = (
+        df.reindex(columns=["SubmitterID", "SubmitterName"]).astype("string").fillna("")
+    )
+    per_enumerator = submitters.groupby(["SubmitterID", "SubmitterName"]).size()
+    for (submitter_id, name), count in per_enumerator.items():
+        entry = state["per_enumerator"].setdefault(
+            str(submitter_id), {"name": name, "count": 0}
+        )
+        entry["name"] = name or entry["name"]
+        entry["count"] += int(count)
+
+    review_states = df.reindex(columns=["ReviewState"])["ReviewState"]
+    _add_counts(
+        state["per_review_state"],
+        review_states.astype("string").fillna("received").value_counts(),
+    )
+
+    for name, field in state["select_fields"].items():
+        if name not in df:
+            continue
+        values = df[name].dropna().astype("string")
+        if field["type"] == "select":
+            # select_multiple answers are space separated
+            values = values.str.split().explode().dropna()
+        _add_counts(state["choices"][name], values.value_counts())
+
+    state["total"] += len(df)
+    cursor = dates.max()
+    if cursor == state["cursor"]:
+        state["cursor_ids"] += df.loc[dates == cursor, "KEY"].tolist()
+    elif state["cursor"] is None or cursor > state["cursor"]:
+        state["cursor"] = cursor
+        state["cursor_ids"] = df.loc[dates == cursor, "KEY"].tolist()
+
+
+def aggregate_rows(state: dict, rows: list) -> None:
+    """Add one page of OData submissions to the aggregates, with pandas"""
+    import pandas as pd
+
+    renames = dict(ODATA_COLUMNS)
+    renames.update(
+        {field["odata_name"]: name for name, field in state["select_fields"].items()}
+    )
+    aggregate_frame(state, pd.json_normalize(rows, sep="/").rename(columns=renames))
+
+
+def get_cached_analytics(project_id: int | str, form_id: str) -> dict | None:
+    return ODKCacheManager.get(_cache_key(project_id, form_id))
+
+
+def is_fresh(state: dict | None) -> bool:
+    """True when the aggregates were refreshed less than ODK_ANALYTICS_MAX_AGE ago"""
+    if not state or not state["refreshed_at"]:
+        return False
+    age = timezone.now() - parse_datetime(state["refreshed_at"])
+    return age.total_seconds() < getattr(settings, "ODK_ANALYTICS_MAX_AGE", 60)
+
+
+def _needs_full_refresh(state: dict) -> bool:
+    # Review state changes and deletions do not move the cursor
+    age = timezone.now() - parse_datetime(state["full_refresh_at"])
+    return age.total_seconds() > getattr(settings, "ODK_ANALYTICS_FULL_REFRESH", 3600)
+
+
+def _get_schema(odk_service, project_id: int, form_id: str) -> dict | None:
+    try:
+        return odk_service.get_form_schema(project_id, form_id)
+    except Exception as e:
+        # Without a schema, choice distributions are left out
+        logger.warning(f"No schema for form {form_id}: {e}")
+        return None
+
+
+def _repeats_due(state: dict) -> bool:
+    if not state["repeats_at"]:
+        return True
+    age = timezone.now() - parse_datetime(state["repeats_at"])
+    return age.total_seconds() > getattr(settings, "ODK_ANALYTICS_FULL_REFRESH", 3600)
+
+
+def repeat_statistics(odk_service, project_id: int, form_id: str, schema) -> dict:
+    """
+    Rows, parent submissions and choice distributions of each repeat table,
+    from the flattened OData repeat tables streamed page by page
+    """
+    select_columns = {}
+    for table, repeat in zip(
+        get_repeat_tables(schema), (schema or {}).get("repeats", [])
+    ):
+        select_columns[table] = {
+            column["name"]: column
+            for column in repeat["columns"]
+            if column["type"] in ("select1", "select")
+        }
+
+    statistics, parents = {}, {}
+    for table, df in iter_flat_tables(
+        odk_service, project_id, form_id, tables=list(select_columns)
+    ):
+        entry = statistics.setdefault(
+            table,
+            {"rows": 0, "choices": {name: {} for name in select_columns[table]}},
+        )
+        entry["rows"] += len(df)
+        if "PARENT_KEY" in df:
+            parents.setdefault(table, set()).update(df["PARENT_KEY"].dropna())
+        for name, column in select_columns[table].items():
+            if name not in df:
+                continue
+            values = df[name].dropna().astype("string")
+            if column["type"] == "select":
+                values = values.str.split().explode().dropna()
+            _add_counts(entry["choices"][name], values.value_counts())
+
+    for table, entry in statistics.items():
+        entry["parents"] = len(parents.get(table, ()))
+    return statistics
+
+
+def schedule_analytics_refresh(project_id: int, form_id: str, full: bool) -> None:
+    """
+    Queue the refresh_form_analytics task, once per form until it has run:
+    a full recomputation when `full`, otherwise only the repeat statistics
+    """
+    from core_apps.odk.tasks import refresh_form_analytics
+
+    if cache.add(_refresh_marker(project_id, form_id, full), 1, LOCK_TIMEOUT):
+        refresh_form_analytics.delay(project_id, form_id, full=full)
+
+
+def run_analytics_refresh(odk_service, project_id: int, form_id: str, full) -> dict:
+    """Body of the refresh_form_analytics task"""
+    try:
+        return update_form_analytics(
+            odk_service, project_id, form_id, full=full, background=True
+        )
+    finally:
+        cache.delete(_refresh_marker(project_id, form_id, full))
+
+
+def _refresh_marker(project_id: int | str, form_id: str, full: bool) -> str:
+    return f"{_cache_key(project_id, form_id)}_queued{'_full' if full else ''}"
+
+
+def update_form_analytics(
+    odk_service, project_id: int, form_id: str, full=False, background=False
+) -> dict:
+    """
+    Bring the aggregates of a form up to date. With Parquet snapshots
+    (ODK_SNAPSHOTS_ENABLED) they are recomputed from the snapshot whenever it
+    changes; otherwise only the submissions received since the last update are
+    read from the OData feed, unless a full refresh is requested or due.
+    Concurrent updates of the same form are skipped.
+
+    Full refreshes and repeat statistics read every submission: in requests
+    (background=False) they are left to the refresh_form_analytics task, the
+    aggregates being updated incrementally meanwhile.
+    """
+    cache_key = _cache_key(project_id, form_id)
+    lock_key = f"{cache_key}_lock"
+    state = ODKCacheManager.get(cache_key)
+    deferred = False
+    if not background and state is not None and (full or _needs_full_refresh(state)):
+        schedule_analytics_refresh(project_id, form_id, full=True)
+        full, deferred = False, True
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if state is not None and not locked:
+        return state
+
+    try:
+        schema = None
+        if snapshots_enabled():
+            schema = _get_schema(odk_service, project_id, form_id)
+            state = _update_from_snapshot(
+                odk_service, project_id, form_id, state, schema, full, background
+            )
+        else:
+            if state is None or full or (background and _needs_full_refresh(state)):
+                schema = _get_schema(odk_service, project_id, form_id)
+                state = _empty_state(schema)
+            for rows in odk_service.iter_submissions_data(
+                project_id, form_id, since=state["cursor"]
+            ):
+                aggregate_rows(state, rows)
+            state["refreshed_at"] = timezone.now().isoformat()
+
+        if not background:
+            if not deferred and _repeats_due(state):
+                schedule_analytics_refresh(project_id, form_id, full=False)
+        elif full or _repeats_due(state):
+            schema = schema or _get_schema(odk_service, project_id, form_id)
+            state["repeats"] = repeat_statistics(
+                odk_service, project_id, form_id, schema
+            )
+            state["repeats_at"] = timezone.now().isoformat()
+        cache.set(cache_key, state, CACHE_TIMEOUT)
+        return state
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def _update_from_snapshot(
+    odk_service, project_id, form_id, state, schema, full, background
+) -> dict:
+    snapshot, manifest = get_submissions_snapshot(
+        odk_service,
+        project_id,
+        form_id,
+        schema=schema,
+        full=full,
+        background=background,
+    )
+    if state is None or state["snapshot_generation"] != manifest["generation"]:
+        previous = state or {}
+        state = _empty_state(schema)
+        state["repeats"] = previous.get("repeats")
+        state["repeats_at"] = previous.get("repeats_at")
+        # Only the columns the aggregates need are read from the Parquet files
+        columns = list(ODATA_COLUMNS.values()) + list(state["select_fields"])
+        aggregate_frame(state, snapshot.read(columns=columns, manifest=manifest))
+        state["snapshot_generation"] = manifest["generation"]
+    state["refreshed_at"] = manifest["refreshed_at"]
+    return state
+
+
+def format_analytics(state: dict) -> dict:
+    """API representation of the aggregates, sorted for charts"""
+    return {
+        "total": state["total"],
+        "last_submission_at": state["cursor"],
+        "refreshed_at": state["refreshed_at"],
+        "per_day": [
+            {"date": day, "count": count}
+            for day, count in sorted(state["per_day"].items())
+        ],
+        "per_enumerator": sorted(
+            (
+                {"submitter_id": submitter_id, **entry}
+                for submitter_id, entry in state["per_enumerator"].items()
+            ),
+            key=lambda entry: entry["count"],
+            reverse=True,
+        ),
+        "per_review_state": state["per_review_state"],
+        "choices": [
+            {
+                "name": name,
+                "label": field["label"],
+                "type": field["type"],
+                "counts": dict(
+                    sorted(
+                        state["choices"][name].items(),
+                        key=lambda item: item[1],
+                        reverse=True,
+                    )
+                ),
+            }
+            for name, field in state["select_fields"].items()
+        ],
+        "repeats": [
+            {
+                "table": table,
+                "rows": entry["rows"],
+                "parents": entry["parents"],
+                "mean_per_parent": (
+                    round(entry["rows"] / entry["parents"], 2)
+                    if entry["parents"]
+                    else None
+                ),
+                "choices": entry["choices"],
+            }
+            for table, entry in (state["repeats"] or {}).items()
+        ],
+    }
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+from datetime import datetime
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from core_apps.odk.cache import ODKCacheManager
+from core_apps.odk.models import ODKAuditCursor
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = "cache_invalidation"
+
+
+def get_event_scopes(event: dict) -> set:
+    """
+    Cache scopes (see ODKCacheManager.bump_version) affected by an audit
+    event, from its extended "actee": a form (projectId and xmlFormId),
+    an app user or public link (projectId) or a project (id).
+    """
+    action = event.get("action") or ""
+    actee = event.get("actee") or {}
+    form_id = actee.get("xmlFormId")
+    project_id = actee.get("projectId")
+    if project_id is None and form_id is None and action.startswith("project."):
+        project_id = actee.get("id")
+
+    scopes = set()
+    if action.startswith("project."):
+        scopes.add("projects")
+    if project_id is not None:
+        scopes.add(f"project_{project_id}")
+        if form_id:
+            scopes.add(f"form_{project_id}_{form_id}")
+    return scopes
+
+
+def _fingerprint(event: dict) -> str:
+    # Audit events have no id of their own
+    content = [
+        event.get("loggedAt"),
+        event.get("action"),
+        event.get("acteeId"),
+        event.get("actorId"),
+        event.get("details"),
+    ]
+    return hashlib.sha1(
+        json.dumps(content, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _seed_cursor(odk_service, cursor) -> None:
+    """
+    Place the cursor on ODK Central's newest audit event, not on the local
+    clock: a clock ahead of Central's would skip the events in between
+    """
+    page = odk_service.get_audits(limit=getattr(settings, "ODK_AUDIT_PAGE_SIZE", 500))
+    if page:
+        latest = max(event["loggedAt"] for event in page)
+        cursor.logged_at = parse_datetime(latest)
+        cursor.seen = [_fingerprint(e) for e in page if e["loggedAt"] == latest]
+    else:
+        # Empty log: every event to come is new
+        cursor.logged_at = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+    cursor.save()
+
+
+def poll_audits(odk_service) -> dict:
+    """
+    Read the audit events logged since the last poll and bump the cache
+    versions of the projects and forms they touch. The first poll only
+    places the cursor: events older than the poller are not replayed.
+    """
+    with transaction.atomic():
+        cursor, _ = ODKAuditCursor.objects.select_for_update().get_or_create(
+            name=CURSOR_NAME
+        )
+        if cursor.logged_at is None:
+            _seed_cursor(odk_service, cursor)
+            return {"events": 0, "scopes": []}
+
+        # ODK Central's own format: UTC with milliseconds
+        start = cursor.logged_at.astimezone(dt_timezone.utc).isoformat(
+            timespec="milliseconds"
+        )
+        start = start.replace("+00:00", "Z")
+        seen = set(cursor.seen)
+
+        events = []
+        for event in odk_service.iter_audits(start=start):
+            fingerprint = _fingerprint(event)
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                events.append((event, fingerprint))
+
+        scopes = set()
+        for event, _ in events:
+            scopes |= get_event_scopes(event)
+        for scope in sorted(scopes):
+            ODKCacheManager.bump_version(scope)
+
+        if events:
+            latest = max(event["loggedAt"] for event, _ in events)
+            at_latest = [f for event, f in events if event["loggedAt"] == latest]
+            logged_at = parse_datetime(latest)
+            if logged_at == cursor.logged_at:
+                cursor.seen = list(cursor.seen) + at_latest
+            else:
+                cursor.logged_at, cursor.seen = logged_at, at_latest
+        cursor.save()
+
+    if scopes:
+        logger.info(
+            f"ODK audit poll: {len(events)} event(s), {len(scopes)} cache scope(s) bumped"
+        )
+    return {"events": len(events), "scopes": sorted(scopes)}
@@ -0,0 +1,155 @@
+import contextvars
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from queue import Empty, SimpleQueue
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+
+from core_apps.odk.services.hedging import run_in_worker_thread
+from core_apps.odk.services.poolServices import (
+    ODKAccountPool,
+    lease_accounts,
+    shared_account,
+)
+
+logger = logging.getLogger(__name__)
+
+# Request headers not passed on to the sub-requests
+SKIPPED_META = ("CONTENT_LENGTH", "CONTENT_TYPE", "HTTP_IF_NONE_MATCH")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_batch_executor() -> ThreadPoolExecutor:
+    """Thread pool running batch workers, created lazily in each process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "ODK_BATCH_MAX_WORKERS", 8),
+                thread_name_prefix="odk-batch",
+            )
+        return _executor
+
+
+def validate_batch(items) -> str | None:
+    """Error message for an invalid list of sub-requests, None when valid"""
+    if not isinstance(items, list) or not items:
+        return "requests must be a non-empty list"
+    limit = getattr(settings, "ODK_BATCH_MAX_REQUESTS", 20)
+    if len(items) > limit:
+        return f"At most {limit} requests per batch"
+    prefixes = getattr(settings, "ODK_BATCH_ALLOWED_PREFIXES", ("/api/v1/odk/",))
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            return "Each request needs a path"
+        if item.get("method", "GET").upper() != "GET":
+            return "Only GET requests can be batched"
+        if not urlsplit(item["path"]).path.startswith(tuple(prefixes)):
+            return f"Path not allowed in a batch: {item['path']}"
+    return None
+
+
+def _sub_request(parent, path: str) -> WSGIRequest:
+    url = urlsplit(path)
+    environ = {
+        key: value for key, value in parent.META.items() if key not in SKIPPED_META
+    }
+    environ.update(
+        {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": url.path,
+            "QUERY_STRING": url.query,
+            "wsgi.input": BytesIO(b""),
+        }
+    )
+    request = WSGIRequest(environ)
+    # Authenticated once by the batch view: DRF skips its authenticators
+    request._force_auth_user = parent.user
+    request._force_auth_token = parent.auth
+    return request
+
+
+def run_sub_request(parent, item: dict) -> dict:
+    """
+    Run one GET sub-request through its view and return its status and body.
+
+    Sub-requests go straight to their view, without the middleware: they
+    share the authentication, ODK deadline (the batch view's odk_deadline)
+    and request profile of the batch request. As the request handler does
+    with ATOMIC_REQUESTS, each view runs in a transaction.
+    """
+    result = {"id": item.get("id"), "path": item["path"]}
+    request = _sub_request(parent, item["path"])
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return {**result, "status": 404, "body": {"error": "Not found"}}
+    try:
+        view = BaseHandler().make_view_atomic(match.func)
+        response = view(request, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+    except Exception as e:
+        logger.error(f"Batch sub-request {item['path']} failed: {e}")
+        return {**result, "status": 500, "body": {"error": str(e)}}
+
+    body = None
+    if response.get("Content-Type", "").startswith("application/json"):
+        body = json.loads(response.content or b"null")
+    elif response.status_code != 204:
+        body = {"error": "Only JSON responses can be batched"}
+    return {**result, "status": response.status_code, "body": body}
+
+
+def _worker(parent, queue: SimpleQueue, results: list, account: dict) -> None:
+    """Run queued sub-requests one after the other on one leased account"""
+    try:
+        with shared_account(account):
+            while True:
+                try:
+                    position, item = queue.get_nowait()
+                except Empty:
+                    return
+                results[position] = run_sub_request(parent, item)
+    finally:
+        ODKAccountPool().return_account(account)
+
+
+def run_batch(parent, items: list) -> list:
+    """
+    Run sub-requests concurrently, at most ODK_BATCH_MAX_PARALLEL at a time.
+    Each worker leases one ODK account for all the sub-requests it runs, so
+    a batch costs a handful of leases instead of one per sub-request.
+    """
+    parallel = min(getattr(settings, "ODK_BATCH_MAX_PARALLEL", 4), len(items))
+    accounts = lease_accounts(parallel)
+    queue = SimpleQueue()
+    for position, item in enumerate(items):
+        queue.put((position, item))
+    results = [None] * len(items)
+
+    executor = get_batch_executor()
+    futures = [
+        executor.submit(
+            contextvars.copy_context().run,
+            run_in_worker_thread,
+            _worker,
+            parent,
+            queue,
+            results,
+            account,
+        )
+        for account in accounts
+    ]
+    for future in futures:
+        future.result()
+    return results
@@ -1,6 +1,11 @@
+import hashlib
+import json
 import logging
+from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
+
+from core_apps.common.profiling import record_cache_lookup
 logger = logging.getLogger(__name__)
 
 class ODKCacheManager:
@@ -12,6 +17,10 @@ class ODKCacheManager:
     PROJECTS_TIMEOUT = 600  # 10 minutes
     FORMS_TIMEOUT = 300  # 5 minutes
     SUBMISSIONS_TIMEOUT = 60  # 1 minute
+    # Dernières données connues, servies lorsque ODK Central est indisponible
+    LAST_KNOWN_TIMEOUT = 7 * 24 * 3600  # 7 jours
+    # Le XML d'une version publiée ne change jamais : pas d'expiration
+    FORM_VERSION_TIMEOUT = None
 
     @staticmethod
     def get_cache_key(user_id: int, resource_type: str, resource_id: str = None) -> str:
@@ -21,14 +30,44 @@ class ODKCacheManager:
             key_parts.append(str(resource_id))
         return "_".join(key_parts)
 
+    @staticmethod
+    def get_versioned_key(
+        user_id: int, resource_type: str, resource_id: str = None, scope: str = None
+    ) -> str:
+        """
+        Clé de cache incluant la version de `scope` (voir bump_version) : les
+        événements du journal d'audit d'ODK (core_apps.odk.audits) l'invalident
+        """
+        cache_key = ODKCacheManager.get_cache_key(user_id, resource_type, resource_id)
+        return f"{cache_key}_v{ODKCacheManager.get_version(scope)}"
+
+    @staticmethod
+    def get_timeout(default: int) -> int:
+        """
+        Durée de cache d'une donnée versionnée : bien plus longue lorsque le
+        journal d'audit d'ODK invalide le cache dès qu'elle change
+        """
+        if getattr(settings, "ODK_AUDIT_POLL_ENABLED", False):
+            return max(default, getattr(settings, "ODK_AUDIT_CACHE_TIMEOUT", 3600))
+        return default
+
+    @staticmethod
+    def get(cache_key: str):
+        """Lit une clé du cache en comptabilisant le hit/miss dans le profil de la requête"""
+        cached_data = cache.get(cache_key)
+        record_cache_lookup(cached_data is not None)
+        return cached_data
+
     @staticmethod
     def cache_user_projects(user_id: int, projects, timeout: int = None) -> None:
         """Met en cache les projets d'un utilisateur"""
-        cache_key = ODKCacheManager.get_cache_key(user_id, "projects")
+        cache_key = ODKCacheManager.get_versioned_key(
+            user_id, "projects", scope="projects"
+        )
         cache_data = {"projects": projects, "cached_at": timezone.now().isoformat()}
 
         if timeout is None:
-            timeout = ODKCacheManager.PROJECTS_TIMEOUT
+            timeout = ODKCacheManager.get_timeout(ODKCacheManager.PROJECTS_TIMEOUT)
 
         cache.set(cache_key, cache_data, timeout)
         logger.debug(
@@ -38,8 +77,10 @@ class ODKCacheManager:
     @staticmethod
     def get_cached_user_projects(user_id: int) :
         """Récupère les projets en cache"""
-        cache_key = ODKCacheManager.get_cache_key(user_id, "projects")
-        cached_data = cache.get(cache_key)
+        cache_key = ODKCacheManager.get_versioned_key(
+            user_id, "projects", scope="projects"
+        )
+        cached_data = ODKCacheManager.get(cache_key)
 
         if cached_data:
             logger.debug(f"Projets ODK récupérés du cache pour l'utilisateur {user_id}")
@@ -53,11 +94,13 @@ class ODKCacheManager:
         user_id: int, project_id: int|str, forms: list, timeout: int = None
     ) -> None:
         """Met en cache les formulaires d'un projet"""
-        cache_key = ODKCacheManager.get_cache_key(user_id, "forms", project_id)
+        cache_key = ODKCacheManager.get_versioned_key(
+            user_id, "forms", project_id, scope=f"project_{project_id}"
+        )
         cache_data = {"forms": forms, "cached_at": timezone.now().isoformat()}
 
         if timeout is None:
-            timeout = ODKCacheManager.FORMS_TIMEOUT
+            timeout = ODKCacheManager.get_timeout(ODKCacheManager.FORMS_TIMEOUT)
 
         cache.set(cache_key, cache_data, timeout)
         logger.debug(
@@ -67,8 +110,10 @@ class ODKCacheManager:
     @staticmethod
     def get_cached_project_forms(user_id: int, project_id: int|str) :
         """Récupère les formulaires en cache"""
-        cache_key = ODKCacheManager.get_cache_key(user_id, "forms", project_id)
-        cached_data = cache.get(cache_key)
+        cache_key = ODKCacheManager.get_versioned_key(
+            user_id, "forms", project_id, scope=f"project_{project_id}"
+        )
+        cached_data = ODKCacheManager.get(cache_key)
 
         if cached_data:
             logger.debug(
@@ -90,8 +135,11 @@ class ODKCacheManager:
         timeout: int = None,
     ) -> None:
         """Met en cache les soumissions d'un formulaire"""
-        cache_key = ODKCacheManager.get_cache_key(
-            user_id, "submissions", f"{project_id}/{form_id}"
+        cache_key = ODKCacheManager.get_versioned_key(
+            user_id,
+            "submissions",
+            f"{project_id}/{form_id}",
+            scope=f"form_{project_id}_{form_id}",
         )
         cache_data = {
             "submissions": submissions,
@@ -99,7 +147,7 @@ class ODKCacheManager:
         }
 
         if timeout is None:
-            timeout = ODKCacheManager.SUBMISSIONS_TIMEOUT
+            timeout = ODKCacheManager.get_timeout(ODKCacheManager.SUBMISSIONS_TIMEOUT)
 
         cache.set(cache_key, cache_data, timeout)
         logger.debug(
@@ -111,10 +159,13 @@ class ODKCacheManager:
         user_id: int, project_id: int, form_id: str
     ):
         """Récupère les soumissions en cache"""
-        cache_key = ODKCacheManager.get_cache_key(
-            user_id, "submissions", f"{project_id}/{form_id}"
+        cache_key = ODKCacheManager.get_versioned_key(
+            user_id,
+            "submissions",
+            f"{project_id}/{form_id}",
+            scope=f"form_{project_id}_{form_id}",
         )
-        cached_data = cache.get(cache_key)
+        cached_data = ODKCacheManager.get(cache_key)
 
         if cached_data:
             logger.debug(
@@ -132,7 +183,9 @@ class ODKCacheManager:
     def invalidate_user_cache(user_id: int) -> None:
         """Invalide tout le cache d'un utilisateur"""
         # Supprimer la liste des projets
-        projects_key = ODKCacheManager.get_cache_key(user_id, "projects")
+        projects_key = ODKCacheManager.get_versioned_key(
+            user_id, "projects", scope="projects"
+        )
         cache.delete(projects_key)
 
         logger.info(f"Cache ODK invalidé pour l'utilisateur {user_id}")
@@ -141,13 +194,146 @@ class ODKCacheManager:
     def invalidate_project_cache(user_id: int, project_id: int|str) -> None:
         """Invalide le cache d'un projet spécifique"""
         # Clé pour les formulaires du projet
-        forms_key = ODKCacheManager.get_cache_key(user_id, "forms", project_id)
+        forms_key = ODKCacheManager.get_versioned_key(
+            user_id, "forms", project_id, scope=f"project_{project_id}"
+        )
         cache.delete(forms_key)
 
         # Invalide également la liste des projets
-        projects_key = ODKCacheManager.get_cache_key(user_id, "projects")
+        projects_key = ODKCacheManager.get_versioned_key(
+            user_id, "projects", scope="projects"
+        )
         cache.delete(projects_key)
 
         logger.info(
             f"Cache du projet ODK {project_id} invalidé pour l'utilisateur {user_id}"
         )
+
+    @staticmethod
+    def incr(cache_key: str, timeout: int) -> int:
+        """Incrémente un compteur partagé, créé à 0 s'il n'existe pas"""
+        cache.add(cache_key, 0, timeout)
+        try:
+            return cache.incr(cache_key)
+        except ValueError:
+            # Le compteur a expiré entre add() et incr()
+            cache.set(cache_key, 1, timeout)
+            return 1
+
+    @staticmethod
+    def get_version(scope: str) -> int:
+        """
+        Version courante d'un ensemble de clés (ex. "project_12"), à inclure dans
+        les clés des données qui en dépendent
+        """
+        return cache.get(f"{ODKCacheManager.CACHE_PREFIX}version_{scope}") or 0
+
+    @staticmethod
+    def bump_version(scope: str) -> int:
+        """
+        Invalide d'un coup toutes les clés construites avec la version d'un
+        ensemble : elles ne sont plus lues et expirent d'elles-mêmes
+        """
+        version = ODKCacheManager.incr(
+            f"{ODKCacheManager.CACHE_PREFIX}version_{scope}", None
+        )
+        logger.debug(f"Version du cache {scope} passée à {version}")
+        return version
+
+    @staticmethod
+    def remember_last_known(
+        user_id: int, resource_type: str, resource_id: str | None, data
+    ) -> bool:
+        """
+        Conserve la dernière réponse ODK connue pour le mode dégradé. La copie
+        n'est rafraîchie qu'une fois par ODK_LAST_KNOWN_REFRESH secondes, et
+        les réponses de plus de ODK_LAST_KNOWN_MAX_BYTES ne sont pas gardées.
+        Retourne True si la copie a été écrite.
+        """
+        cache_key = ODKCacheManager.get_cache_key(
+            user_id, f"last_known_{resource_type}", resource_id
+        )
+        # Petit marqueur posé à chaque écriture : tant qu'il existe, la copie
+        # est assez récente et la réponse n'est ni sérialisée ni réécrite
+        refresh = getattr(settings, "ODK_LAST_KNOWN_REFRESH", 600)
+        if not cache.add(f"{cache_key}_fresh", 1, refresh):
+            return False
+
+        size = len(json.dumps(data, default=str))
+        if size > getattr(settings, "ODK_LAST_KNOWN_MAX_BYTES", 1024 * 1024):
+            logger.debug(
+                f"Réponse ODK {resource_type} trop volumineuse ({size} octets), "
+                f"non conservée pour le mode dégradé"
+            )
+            return False
+
+        cache_data = {"data": data, "cached_at": timezone.now().isoformat()}
+        cache.set(cache_key, cache_data, ODKCacheManager.LAST_KNOWN_TIMEOUT)
+        return True
+
+    @staticmethod
+    def get_last_known(user_id: int, resource_type: str, resource_id: str | None = None):
+        """Récupère la dernière réponse ODK connue ({"data", "cached_at"}) ou None"""
+        cache_key = ODKCacheManager.get_cache_key(
+            user_id, f"last_known_{resource_type}", resource_id
+        )
+        cached_data = ODKCacheManager.get(cache_key)
+        if cached_data:
+            logger.debug(
+                f"Données ODK périmées ({resource_type}) récupérées pour l'utilisateur {user_id}"
+            )
+        return cached_data
+
+    @staticmethod
+    def get_content_digest(content: str | bytes) -> str:
+        """SHA-256 d'un contenu (texte encodé en UTF-8)"""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def get_form_version_key(project_id: int | str, form_id: str, version: str) -> str:
+        """Clé (commune à tous les utilisateurs) du digest d'une version de formulaire"""
+        return f"{ODKCacheManager.CACHE_PREFIX}form_version_{project_id}_{form_id}_{version}"
+
+    @staticmethod
+    def get_form_version_digest(
+        project_id: int | str, form_id: str, version: str
+    ) -> str | None:
+        """SHA-256 du XML d'une version déjà téléchargée, ou None"""
+        return ODKCacheManager.get(
+            ODKCacheManager.get_form_version_key(project_id, form_id, version)
+        )
+
+    @staticmethod
+    def get_form_version_xml(project_id: int | str, form_id: str, version: str):
+        """Récupère (digest, xml) d'une version de formulaire, ou None"""
+        digest = ODKCacheManager.get_form_version_digest(project_id, form_id, version)
+        if not digest:
+            return None
+        xml_data = cache.get(f"{ODKCacheManager.CACHE_PREFIX}form_xml_{digest}")
+        if xml_data is None:
+            return None
+        return digest, xml_data
+
+    @staticmethod
+    def cache_form_version_xml(
+        project_id: int | str, form_id: str, version: str, xml_data: str | bytes
+    ) -> str:
+        """
+        Stocke le XML d'une version publiée, adressé par son contenu : les versions
+        identiques de plusieurs formulaires ne sont stockées qu'une fois.
+        Retourne le digest, utilisé comme ETag.
+        """
+        digest = ODKCacheManager.get_content_digest(xml_data)
+        timeout = ODKCacheManager.FORM_VERSION_TIMEOUT
+        cache.set(f"{ODKCacheManager.CACHE_PREFIX}form_xml_{digest}", xml_data, timeout)
+        cache.set(
+            ODKCacheManager.get_form_version_key(project_id, form_id, version),
+            digest,
+            timeout,
+        )
+        logger.debug(
+            f"XML de la version {version} du formulaire {form_id} mis en cache ({digest[:12]})"
+        )
+        return digest
@@ -0,0 +1,192 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core_apps.odk.cache import ODKCacheManager
+from core_apps.odk.services import ODKCentralService
+from core_apps.odk.services.hedging import run_in_worker_thread
+from core_apps.odk.services.poolServices import (
+    ODKAccountPool,
+    get_shared_account,
+    lease_accounts,
+    shared_account,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = f"{ODKCacheManager.CACHE_PREFIX}dashboard_"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_fanout_executor() -> ThreadPoolExecutor:
+    """Thread pool running concurrent ODK reads, created lazily in each process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "ODK_FANOUT_MAX_WORKERS", 8),
+                thread_name_prefix="odk-fanout",
+            )
+        return _executor
+
+
+def _run_calls(django_user, request, calls: list) -> tuple[dict, dict]:
+    """Run (name, call) pairs one after the other, results and errors by name"""
+    results, errors = {}, {}
+    for name, call in calls:
+        try:
+            with ODKCentralService(django_user, request=request) as odk_service:
+                results[name] = call(odk_service)
+        except Exception as e:
+            logger.warning(f"Dashboard read {name} failed: {e}")
+            errors[name] = e
+    return results, errors
+
+
+def _run_on_account(django_user, request, calls: list, account: dict) -> tuple:
+    try:
+        with shared_account(account):
+            return _run_calls(django_user, request, calls)
+    finally:
+        ODKAccountPool().return_account(account)
+
+
+def _chunks(items: list, count: int) -> list:
+    return [items[start::count] for start in range(count)] if items else []
+
+
+def fan_out(
+    django_user, calls: dict, request=None, max_workers: int = None
+) -> tuple[dict, dict]:
+    """
+    Run independent ODK reads concurrently. `calls` maps names to callables
+    taking an ODKCentralService; returns the results and the errors, by name.
+
+    The calls are spread over one pooled account, waited for if need be, and
+    the accounts free right now, up to one per call and `max_workers`
+    (ODK_FANOUT_MAX_WORKERS): each account runs its share one call after the
+    other, so a busy pool is never drained nor waited on by a fan-out. Inside
+    a batch (shared_account), the calls run one after the other on the
+    batch's account. The request deadline and profile follow the calls into
+    the worker threads.
+    """
+    if not calls:
+        return {}, {}
+    if get_shared_account() is not None:
+        return _run_calls(django_user, request, list(calls.items()))
+
+    max_workers = max_workers or getattr(settings, "ODK_FANOUT_MAX_WORKERS", 8)
+    accounts = lease_accounts(min(len(calls), max_workers))
+    executor = get_fanout_executor()
+    futures = [
+        executor.submit(
+            contextvars.copy_context().run,
+            run_in_worker_thread,
+            _run_on_account,
+            django_user,
+            request,
+            chunk,
+            account,
+        )
+        for chunk, account in zip(_chunks(list(calls.items()), len(accounts)), accounts)
+    ]
+    results, errors = {}, {}
+    for future in futures:
+        chunk_results, chunk_errors = future.result()
+        results.update(chunk_results)
+        errors.update(chunk_errors)
+    return results, errors
+
+
+def _list_links(form: dict, odk_project_id: int):
+    def call(odk_service):
+        return odk_service.list_public_links(
+            odk_project_id, form["xmlFormId"], enketo_id=form.get("enketoId")
+        )
+
+    return call
+
+
+def _cache_key(odk_project_id: int | str) -> str:
+    version = ODKCacheManager.get_version(f"project_{odk_project_id}")
+    return f"{CACHE_PREFIX}{odk_project_id}_v{version}"
+
+
+def get_cached_project_summary(odk_project_id: int | str) -> dict | None:
+    return ODKCacheManager.get(_cache_key(odk_project_id))
+
+
+def build_project_summary(django_user, odk_project_id: int, request=None) -> dict:
+    """
+    Everything the project dashboard shows, in two rounds of concurrent reads:
+    the project, its forms (with submission counts) and its app users, then
+    the public links of the forms, spread over at most
+    ODK_DASHBOARD_LINK_WORKERS pooled accounts. Complete
+    summaries are cached under the project's cache version, bumped by every
+    change made through the ODK services or seen in Central's audit log, and
+    expire after ODK_DASHBOARD_CACHE_TIMEOUT seconds so that new submissions
+    show up even when the audit poller is off.
+    """
+    cache_key = _cache_key(odk_project_id)
+    results, errors = fan_out(
+        django_user,
+        {
+            "project": lambda s: s.get_project(odk_project_id),
+            "forms": lambda s: s.get_project_forms(odk_project_id, extended=True),
+            "app_users": lambda s: s.get_project_app_users(odk_project_id),
+        },
+        request=request,
+    )
+    if "project" in errors:
+        raise errors["project"]
+
+    forms = results.get("forms") or []
+    public_links = {}
+    if forms:
+        link_results, link_errors = fan_out(
+            django_user,
+            {form["xmlFormId"]: _list_links(form, odk_project_id) for form in forms},
+            request=request,
+            max_workers=getattr(settings, "ODK_DASHBOARD_LINK_WORKERS", 4),
+        )
+        public_links.update(link_results)
+        if link_errors:
+            errors["public_links"] = next(iter(link_errors.values()))
+
+    app_users = results.get("app_users") or []
+    summary = {
+        "project": results["project"],
+        "forms": [
+            {
+                **form,
+                "publicLinks": len(public_links.get(form["xmlFormId"], [])),
+            }
+            for form in forms
+        ],
+        "app_users": app_users,
+        "public_links": public_links,
+        "totals": {
+            "forms": len(forms),
+            "submissions": sum(form.get("submissions") or 0 for form in forms),
+            "app_users": len(app_users),
+            "public_links": sum(len(links) for links in public_links.values()),
+        },
+        "errors": {name: str(error) for name, error in errors.items()},
+        "generated_at": timezone.now().isoformat(),
+    }
+    if not errors:
+        cache.set(
+            cache_key,
+            summary,
+            ODKCacheManager.get_timeout(
+                getattr(settings, "ODK_DASHBOARD_CACHE_TIMEOUT", 60)
+            ),
+        )
+    return summary
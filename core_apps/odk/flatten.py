@@ -0,0 +1,108 @@
+import logging
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+MAIN_TABLE = "Submissions"
+
+# OData metadata columns (after flattening with "-") renamed as in the CSV export
+METADATA_COLUMNS = {
+    "__id": "KEY",
+    "__system-submissionDate": "SubmissionDate",
+    "__system-updatedAt": "UpdatedAt",
+    "__system-submitterId": "SubmitterID",
+    "__system-submitterName": "SubmitterName",
+    "__system-attachmentsPresent": "AttachmentsPresent",
+    "__system-attachmentsExpected": "AttachmentsExpected",
+    "__system-status": "Status",
+    "__system-reviewState": "ReviewState",
+    "__system-deviceId": "DeviceID",
+    "__system-edits": "Edits",
+    "__system-formVersion": "FormVersion",
+}
+GEOPOINT_PARTS = ("Longitude", "Latitude", "Altitude")
+
+
+def get_repeat_tables(schema: dict | None) -> list:
+    """
+    OData entity sets of the repeats of a form, parents first: the repeat
+    /data/group/household is served as Submissions.group.household.
+    """
+    tables = []
+    for repeat in (schema or {}).get("repeats", []):
+        segments = repeat["path"].split("/")[2:]
+        tables.append(".".join([MAIN_TABLE, *segments]))
+    return tables
+
+
+def _split_geopoints(df):
+    """GeoJSON points become Latitude/Longitude/Altitude/Accuracy columns"""
+    import pandas as pd
+
+    for column in [c for c in df.columns if c.endswith("-coordinates")]:
+        prefix = column[: -len("-coordinates")]
+        if f"{prefix}-type" not in df:
+            continue
+        coordinates = df[column].apply(
+            lambda value: value if isinstance(value, list) else []
+        )
+        parts = pd.DataFrame(coordinates.tolist(), index=df.index)
+        parts = parts.reindex(columns=range(len(GEOPOINT_PARTS)))
+        for position, name in enumerate(GEOPOINT_PARTS):
+            df[f"{prefix}-{name}"] = pd.to_numeric(parts[position], errors="coerce")
+        accuracy = f"{prefix}-properties-accuracy"
+        df[f"{prefix}-Accuracy"] = df.pop(accuracy) if accuracy in df else None
+        df.drop(columns=[column, f"{prefix}-type"], inplace=True)
+    return df
+
+
+def flatten_page(rows: list):
+    """
+    One page of an OData table as a flat DataFrame: groups become "-" joined
+    columns as in the CSV export, geopoints are split, navigation links are
+    dropped, and the repeat keys are renamed KEY and PARENT_KEY.
+    """
+    import pandas as pd
+
+    df = pd.json_normalize(rows, sep="-")
+    df = df.drop(columns=[c for c in df.columns if "@odata." in c])
+    # __Submissions-id, __Submissions-household-id...: key of the parent row
+    parent = [c for c in df.columns if c.startswith("__") and c.endswith("-id")]
+    df = df.rename(
+        columns={**METADATA_COLUMNS, **{column: "PARENT_KEY" for column in parent}}
+    )
+    return _split_geopoints(df)
+
+
+def iter_flat_tables(
+    odk_service, project_id: int, form_id: str, schema: dict = None, tables=None
+) -> Iterator[tuple]:
+    """
+    Stream the main table and the repeat tables of a form as (table, DataFrame)
+    batches, one per OData page, so that memory stays bounded by the page size.
+    """
+    if tables is None:
+        tables = [MAIN_TABLE, *get_repeat_tables(schema)]
+    for table in tables:
+        for rows in odk_service.iter_submissions_data(project_id, form_id, table=table):
+            if rows:
+                yield table, flatten_page(rows)
+
+
+def collect_flat_tables(
+    odk_service, project_id: int, form_id: str, schema: dict = None, tables=None
+) -> dict:
+    """
+    Main and repeat tables of a form as whole DataFrames, by table name, for
+    exports that need whole sheets; stream with iter_flat_tables otherwise
+    """
+    import pandas as pd
+
+    batches = {}
+    for table, df in iter_flat_tables(
+        odk_service, project_id, form_id, schema=schema, tables=tables
+    ):
+        batches.setdefault(table, []).append(df)
+    return {
+        table: pd.concat(frames, ignore_index=True) for table, frames in batches.items()
+    }
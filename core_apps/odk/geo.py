@@ -0,0 +1,502 @@
+import logging
+import math
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core_apps.odk.cache import ODKCacheManager
+from core_apps.odk.services import ODKCentralService
+
+logger = logging.getLogger(__name__)
+
+# Spatial indexes are shared by all the users allowed on the project
+CACHE_PREFIX = f"{ODKCacheManager.CACHE_PREFIX}geo_"
+CACHE_TIMEOUT = 30 * 24 * 3600
+LOCK_TIMEOUT = 600
+
+GEO_TYPES = ("geopoint", "geotrace", "geoshape")
+# Points are sorted by their Morton (Z-order) code at this zoom level: every
+# tile of a lower zoom covers one contiguous range of codes
+INDEX_ZOOM = 16
+MAX_LATITUDE = 85.0511287798
+
+# Indexes already unpickled by this process: cache key -> (version, index)
+_local_indexes = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _cache_key(project_id: int | str, form_id: str) -> str:
+    return f"{CACHE_PREFIX}{project_id}_{form_id}"
+
+
+def get_geo_fields(schema: dict | None) -> list:
+    """Geopoint, geotrace and geoshape questions of the main table"""
+    fields = {}
+    for column in (schema or {}).get("columns", []):
+        if column["type"] in GEO_TYPES and column["path"] not in fields:
+            fields[column["path"]] = {
+                "name": column["path"].split("/", 2)[2].replace("/", "-"),
+                # OData nests fields by group: /data/group/q becomes "group/q"
+                "odata_name": column["path"].split("/", 2)[2],
+                "type": column["type"],
+                "label": column["label"],
+            }
+    return list(fields.values())
+
+
+# Tiles ------------------------------------------------------------------------
+
+
+def _spread_bits(values):
+    """Insert a zero bit between the 16 low bits of each value"""
+    values = values & 0xFFFF
+    values = (values | (values << 8)) & 0x00FF00FF
+    values = (values | (values << 4)) & 0x0F0F0F0F
+    values = (values | (values << 2)) & 0x33333333
+    return (values | (values << 1)) & 0x55555555
+
+
+def _tile_xy(lon, lat, zoom: int):
+    """Web Mercator tile coordinates of longitudes and latitudes (arrays)"""
+    import numpy as np
+
+    n = 2**zoom
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * n
+    return (
+        np.clip(x, 0, n - 1).astype(np.uint64),
+        np.clip(y, 0, n - 1).astype(np.uint64),
+    )
+
+
+def morton_codes(lon, lat):
+    """Z-order codes of points at INDEX_ZOOM"""
+    x, y = _tile_xy(lon, lat, INDEX_ZOOM)
+    return _spread_bits(x) | (_spread_bits(y) << 1)
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> tuple:
+    """(west, south, east, north) of a Web Mercator tile"""
+    n = 2**zoom
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return (
+        x / n * 360.0 - 180.0,
+        latitude(y + 1),
+        (x + 1) / n * 360.0 - 180.0,
+        latitude(y),
+    )
+
+
+# Index --------------------------------------------------------------------------
+
+
+def _empty_index(schema: dict | None) -> dict:
+    import numpy as np
+
+    return {
+        "fields": get_geo_fields(schema),
+        "total": 0,
+        "cursor": None,
+        "cursor_ids": [],
+        # Points, sorted by Morton code
+        "codes": np.empty(0, dtype=np.uint64),
+        "lon": np.empty(0),
+        "lat": np.empty(0),
+        "keys": np.empty(0, dtype=object),
+        "field": np.empty(0, dtype=np.int16),
+        # Geotraces and geoshapes, with their bounding boxes
+        "shapes": [],
+        "refreshed_at": None,
+        "full_refresh_at": timezone.now().isoformat(),
+    }
+
+
+def _page_points(index: dict, df) -> tuple:
+    import numpy as np
+    import pandas as pd
+
+    lon, lat, keys, field = [], [], [], []
+    for position, geo_field in enumerate(index["fields"]):
+        column = f"{geo_field['odata_name']}/coordinates"
+        if geo_field["type"] != "geopoint" or column not in df:
+            continue
+        coordinates = df[column].apply(
+            lambda value: (
+                value[:2] if isinstance(value, list) and len(value) > 1 else None
+            )
+        )
+        present = coordinates.notna()
+        if not present.any():
+            continue
+        points = pd.DataFrame(coordinates[present].tolist(), dtype="float64")
+        lon.append(points[0].to_numpy())
+        lat.append(points[1].to_numpy())
+        keys.append(df.loc[present, "__id"].to_numpy(dtype=object))
+        field.append(np.full(int(present.sum()), position, dtype=np.int16))
+    if not lon:
+        return None
+    return (
+        np.concatenate(lon),
+        np.concatenate(lat),
+        np.concatenate(keys),
+        np.concatenate(field),
+    )
+
+
+def _page_shapes(index: dict, rows: list) -> list:
+    shapes = []
+    for position, geo_field in enumerate(index["fields"]):
+        if geo_field["type"] == "geopoint":
+            continue
+        path = geo_field["odata_name"].split("/")
+        for row in rows:
+            geometry = row
+            for segment in path:
+                geometry = geometry.get(segment) if isinstance(geometry, dict) else None
+            if not isinstance(geometry, dict) or not geometry.get("coordinates"):
+                continue
+            coordinates = geometry["coordinates"]
+            if geometry.get("type") == "Polygon":
+                coordinates = [c for ring in coordinates for c in ring]
+            lons = [c[0] for c in coordinates]
+            lats = [c[1] for c in coordinates]
+            shapes.append(
+                {
+                    "key": row["__id"],
+                    "field": position,
+                    "geometry": geometry,
+                    "bbox": (min(lons), min(lats), max(lons), max(lats)),
+                }
+            )
+    return shapes
+
+
+def add_submissions(index: dict, rows: list) -> None:
+    """Add one page of OData submissions to a spatial index"""
+    import numpy as np
+    import pandas as pd
+
+    if index["cursor_ids"]:
+        # Submissions at the previous cursor date are already indexed
+        seen = set(index["cursor_ids"])
+        rows = [row for row in rows if row["__id"] not in seen]
+    if not rows:
+        return
+
+    df = pd.json_normalize(rows, sep="/")
+    points = _page_points(index, df)
+    if points is not None:
+        lon, lat, keys, field = points
+        codes = np.concatenate([index["codes"], morton_codes(lon, lat)])
+        order = np.argsort(codes, kind="stable")
+        index["codes"] = codes[order]
+        index["lon"] = np.concatenate([index["lon"], lon])[order]
+        index["lat"] = np.concatenate([index["lat"], lat])[order]
+        index["keys"] = np.concatenate([index["keys"], keys])[order]
+        index["field"] = np.concatenate([index["field"], field])[order]
+    index["shapes"] += _page_shapes(index, rows)
+
+    index["total"] += len(rows)
+    dates = df["__system/submissionDate"].astype("string")
+    cursor = dates.max()
+    keys = df.loc[dates == cursor, "__id"].tolist()
+    if cursor == index["cursor"]:
+        index["cursor_ids"] += keys
+    elif index["cursor"] is None or cursor > index["cursor"]:
+        index["cursor"], index["cursor_ids"] = cursor, keys
+
+
+def _keep_local(cache_key: str, index: dict) -> None:
+    """Keep the index in this process, the ODK_GEO_LOCAL_INDEXES last used"""
+    with _local_lock:
+        _local_indexes[cache_key] = (index["refreshed_at"], index)
+        _local_indexes.move_to_end(cache_key)
+        while len(_local_indexes) > getattr(settings, "ODK_GEO_LOCAL_INDEXES", 4):
+            _local_indexes.popitem(last=False)
+
+
+def get_cached_geo_index(project_id: int | str, form_id: str) -> dict | None:
+    """
+    Cached index of a form. Indexes weigh megabytes: the copy kept by this
+    process is used as long as the version stored next to the index in the
+    cache (its refreshed_at) is unchanged, and the index is only fetched and
+    unpickled again when another process updated it.
+    """
+    cache_key = _cache_key(project_id, form_id)
+    version = cache.get(f"{cache_key}_version")
+    with _local_lock:
+        local = _local_indexes.get(cache_key)
+        if version is not None and local is not None and local[0] == version:
+            _local_indexes.move_to_end(cache_key)
+            return local[1]
+    index = ODKCacheManager.get(cache_key)
+    if index is not None:
+        _keep_local(cache_key, index)
+    return index
+
+
+def is_fresh(index: dict | None) -> bool:
+    """True when the index was refreshed less than ODK_GEO_MAX_AGE seconds ago"""
+    if not index or not index["refreshed_at"]:
+        return False
+    age = timezone.now() - parse_datetime(index["refreshed_at"])
+    return age.total_seconds() < getattr(settings, "ODK_GEO_MAX_AGE", 60)
+
+
+def _needs_full_refresh(index: dict) -> bool:
+    # Edits and deletions do not move the cursor
+    age = timezone.now() - parse_datetime(index["full_refresh_at"])
+    return age.total_seconds() > getattr(settings, "ODK_GEO_FULL_REFRESH", 3600)
+
+
+def _refresh(odk_service, project_id, form_id, index: dict | None, full) -> dict:
+    """Build the index (index None or full) or add the new submissions, and store it"""
+    cache_key = _cache_key(project_id, form_id)
+    if index is None or full:
+        index = _empty_index(odk_service.get_form_schema(project_id, form_id))
+    else:
+        # Other threads may be reading the copy kept by this process
+        index = dict(
+            index,
+            shapes=list(index["shapes"]),
+            cursor_ids=list(index["cursor_ids"]),
+        )
+    if index["fields"]:
+        for rows in odk_service.iter_submissions_data(
+            project_id, form_id, since=index["cursor"]
+        ):
+            add_submissions(index, rows)
+    index["refreshed_at"] = timezone.now().isoformat()
+    cache.set(cache_key, index, CACHE_TIMEOUT)
+    cache.set(f"{cache_key}_version", index["refreshed_at"], CACHE_TIMEOUT)
+    _keep_local(cache_key, index)
+    return index
+
+
+def get_geo_index(
+    django_user, project_id: int, form_id: str, full=False, request=None
+) -> dict:
+    """
+    Spatial index of a form for a request. The cached index is served while
+    fresh, and while another request or the refresh task updates it; a stale
+    index is otherwise updated with the submissions received since, an ODK
+    account being leased only once the update lock is held. Full rebuilds,
+    requested or due, are queued to the refresh_geo_index task: only the first
+    indexing of a form reads the whole feed in a request.
+    """
+    index = get_cached_geo_index(project_id, form_id)
+    if index is not None:
+        if full or _needs_full_refresh(index):
+            schedule_geo_refresh(project_id, form_id)
+        if is_fresh(index):
+            return index
+
+    lock_key = f"{_cache_key(project_id, form_id)}_lock"
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if index is not None and not locked:
+        return index
+    try:
+        with ODKCentralService(django_user, request=request) as odk_service:
+            return _refresh(odk_service, project_id, form_id, index, full=False)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def update_geo_index(odk_service, project_id: int, form_id: str, full=False) -> dict:
+    """
+    Bring the spatial index of a form up to date with the submissions received
+    since the last update (all of them on the first call, when a full refresh
+    is requested or due), in the refresh_geo_index task. Concurrent updates of
+    the same form are skipped.
+    """
+    cache_key = _cache_key(project_id, form_id)
+    lock_key = f"{cache_key}_lock"
+    index = get_cached_geo_index(project_id, form_id)
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if index is not None and not locked:
+        return index
+
+    try:
+        full = full or (index is not None and _needs_full_refresh(index))
+        return _refresh(odk_service, project_id, form_id, index, full)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
+def schedule_geo_refresh(project_id: int, form_id: str) -> None:
+    """Queue the refresh_geo_index task, once per form until it has run"""
+    from core_apps.odk.tasks import refresh_geo_index
+
+    if cache.add(_refresh_marker(project_id, form_id), 1, LOCK_TIMEOUT):
+        refresh_geo_index.delay(project_id, form_id)
+
+
+def run_geo_refresh(odk_service, project_id: int, form_id: str) -> dict:
+    """Body of the refresh_geo_index task"""
+    try:
+        return update_geo_index(odk_service, project_id, form_id, full=True)
+    finally:
+        cache.delete(_refresh_marker(project_id, form_id))
+
+
+def _refresh_marker(project_id: int | str, form_id: str) -> str:
+    return f"{_cache_key(project_id, form_id)}_queued"
+
+
+# Queries ------------------------------------------------------------------------
+
+
+def split_bbox(bbox: tuple) -> list:
+    """
+    (west, south, east, north) as a list of boxes: a box with west > east
+    crosses the antimeridian and is split in two on each side of it
+    """
+    west, south, east, north = bbox
+    if west <= east:
+        return [bbox]
+    return [(west, south, 180.0, north), (-180.0, south, east, north)]
+
+
+def _point_feature(index: dict, position: int) -> dict:
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [
+                float(index["lon"][position]),
+                float(index["lat"][position]),
+            ],
+        },
+        "properties": {
+            "key": index["keys"][position],
+            "field": index["fields"][index["field"][position]]["name"],
+        },
+    }
+
+
+def _shape_features(index: dict, bbox: tuple) -> list:
+    boxes = split_bbox(bbox)
+    return [
+        {
+            "type": "Feature",
+            "geometry": shape["geometry"],
+            "properties": {
+                "key": shape["key"],
+                "field": index["fields"][shape["field"]]["name"],
+            },
+        }
+        for shape in index["shapes"]
+        if any(
+            shape["bbox"][0] <= east
+            and shape["bbox"][2] >= west
+            and shape["bbox"][1] <= north
+            and shape["bbox"][3] >= south
+            for west, south, east, north in boxes
+        )
+    ]
+
+
+def features_in_bbox(index: dict, bbox: tuple, limit: int = None) -> dict:
+    """GeoJSON FeatureCollection of the submissions inside (west, south, east, north)"""
+    import numpy as np
+
+    limit = limit or getattr(settings, "ODK_GEO_MAX_FEATURES", 10000)
+    mask = np.zeros(len(index["lon"]), dtype=bool)
+    for west, south, east, north in split_bbox(bbox):
+        mask |= (
+            (index["lon"] >= west)
+            & (index["lon"] <= east)
+            & (index["lat"] >= south)
+            & (index["lat"] <= north)
+        )
+    inside = np.flatnonzero(mask)
+    features = [_point_feature(index, position) for position in inside[:limit]]
+    features += _shape_features(index, bbox)[: max(limit - len(features), 0)]
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "total": int(len(inside)),
+        "truncated": len(inside) > limit,
+        "refreshed_at": index["refreshed_at"],
+    }
+
+
+def clustered_tile(index: dict, zoom: int, x: int, y: int) -> dict:
+    """
+    Points of a Web Mercator tile clustered on a grid of ODK_GEO_TILE_GRID
+    cells per side: a single point stays a plain feature, several points in
+    one cell become one feature at their centroid with a point_count.
+    Geotraces and geoshapes crossing the tile are returned as is.
+    """
+    import numpy as np
+
+    grid = getattr(settings, "ODK_GEO_TILE_GRID", 64)
+    tile_zoom = min(zoom, INDEX_ZOOM)
+    shift = np.uint64(2 * (INDEX_ZOOM - tile_zoom))
+    if zoom > INDEX_ZOOM:
+        scale = 2 ** (zoom - INDEX_ZOOM)
+        tile_code = int(_spread_bits(x // scale) | (_spread_bits(y // scale) << 1))
+    else:
+        tile_code = int(_spread_bits(x) | (_spread_bits(y) << 1))
+    # Contiguous range of the sorted Morton codes covered by the tile
+    start, stop = np.searchsorted(
+        index["codes"],
+        [tile_code << int(shift), (tile_code + 1) << int(shift)],
+    )
+    bounds = tile_bounds(zoom, x, y)
+    lon = index["lon"][start:stop]
+    lat = index["lat"][start:stop]
+    positions = np.arange(start, stop)
+    if zoom > INDEX_ZOOM:
+        inside = (
+            (lon >= bounds[0])
+            & (lon < bounds[2])
+            & (lat > bounds[1])
+            & (lat <= bounds[3])
+        )
+        lon, lat, positions = lon[inside], lat[inside], positions[inside]
+
+    features = []
+    if len(positions):
+        cell_x, cell_y = _tile_xy(lon, lat, zoom + int(math.log2(grid)))
+        cells = cell_x * np.uint64(grid * 2**zoom) + cell_y
+        _, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+        sum_lon = np.bincount(inverse, weights=lon)
+        sum_lat = np.bincount(inverse, weights=lat)
+        # Position of a point of each cell, used for single point cells
+        first = np.empty(len(counts), dtype=np.int64)
+        first[inverse] = positions
+        for cell, count in enumerate(counts):
+            if count == 1:
+                features.append(_point_feature(index, first[cell]))
+                continue
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [
+                            float(sum_lon[cell] / count),
+                            float(sum_lat[cell] / count),
+                        ],
+                    },
+                    "properties": {"cluster": True, "point_count": int(count)},
+                }
+            )
+    features += _shape_features(index, bounds)
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "total": int(len(positions)),
+        "refreshed_at": index["refreshed_at"],
+    }
@@ -0,0 +1,83 @@
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    multiprocess,
+)
+
+from core_apps.odk.utils import get_endpoint_template
+
+# In multiprocess gunicorn mode (PROMETHEUS_MULTIPROC_DIR set before start-up),
+# prometheus_client writes these metrics to per-process files that are merged
+# when /metrics is scraped.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+ODK_REQUEST_LATENCY = Histogram(
+    "odk_request_duration_seconds",
+    "Duration of ODK Central requests, retries and backoff included",
+    ["method", "endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+ODK_RESPONSES = Counter(
+    "odk_responses_total",
+    "ODK Central responses by status code or failure kind",
+    ["method", "endpoint", "status"],
+)
+ODK_RETRIES = Counter(
+    "odk_request_retries_total",
+    "Retries of ODK Central requests",
+    ["method", "endpoint"],
+)
+ODK_POOL_WAIT = Histogram(
+    "odk_pool_wait_seconds",
+    "Time spent waiting for an ODK account from the pool",
+    ["outcome"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30),
+)
+ODK_TOKEN_REFRESHES = Counter(
+    "odk_token_refreshes_total",
+    "ODK Central session token requests",
+    ["account", "outcome"],
+)
+ODK_HEDGED_REQUESTS = Counter(
+    "odk_hedged_requests_total",
+    "Duplicate requests sent by request hedging",
+    ["endpoint"],
+)
+
+
+def observe_request(method: str, endpoint: str, seconds: float) -> None:
+    ODK_REQUEST_LATENCY.labels(method, get_endpoint_template(endpoint)).observe(seconds)
+
+
+def count_response(method: str, endpoint: str, status) -> None:
+    ODK_RESPONSES.labels(method, get_endpoint_template(endpoint), str(status)).inc()
+
+
+def count_retry(method: str, endpoint: str) -> None:
+    ODK_RETRIES.labels(method, get_endpoint_template(endpoint)).inc()
+
+
+def count_hedge(endpoint: str) -> None:
+    ODK_HEDGED_REQUESTS.labels(get_endpoint_template(endpoint)).inc()
+
+
+def observe_pool_wait(seconds: float, outcome: str) -> None:
+    ODK_POOL_WAIT.labels(outcome).observe(seconds)
+
+
+def count_token_refresh(account_id, outcome: str) -> None:
+    ODK_TOKEN_REFRESHES.labels(str(account_id), outcome).inc()
+
+
+def get_metrics_registry():
+    """Registry to expose: merged per-process files in multiprocess mode"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
@@ -0,0 +1,42 @@
+from django.conf import settings
+
+from core_apps.odk.services.deadline import reset_deadline, set_deadline
+from core_apps.odk.services.poolServices import (
+    reset_lease_priority,
+    set_lease_priority,
+)
+
+
+class ODKDeadlineMiddleware:
+    """
+    Give every request a time budget shared by all the ODK Central calls it makes.
+
+    The budget comes from the `odk_deadline` attribute of the view class when
+    present, otherwise from the ODK_REQUEST_DEADLINE setting. Views may also
+    set `odk_lease_priority` (see ODKAccountPool) for their account leases,
+    interactive by default.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            token = getattr(request, "_odk_deadline_token", None)
+            if token is not None:
+                reset_deadline(token)
+            token = getattr(request, "_odk_priority_token", None)
+            if token is not None:
+                reset_lease_priority(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        budget = getattr(view_class, "odk_deadline", None)
+        if budget is None:
+            budget = getattr(settings, "ODK_REQUEST_DEADLINE", 60)
+        request._odk_deadline_token = set_deadline(budget)
+        if priority := getattr(view_class, "odk_lease_priority", None):
+            request._odk_priority_token = set_lease_priority(priority)
+        return None
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:47
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("odk", "0004_delete_odkpermission"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ODKAuditCursor",
+            fields=[
+                (
+                    "pkid",
+                    models.BigAutoField(
+                        editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "id",
+                    models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "name",
+                    models.CharField(max_length=50, unique=True, verbose_name="Name"),
+                ),
+                (
+                    "logged_at",
+                    models.DateTimeField(
+                        null=True, verbose_name="Last Event Logged At"
+                    ),
+                ),
+                (
+                    "seen",
+                    models.JSONField(
+                        default=list, verbose_name="Events Seen At Cursor"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Audit Cursor",
+                "verbose_name_plural": "Audit Cursors",
+                "db_table": "odk_audit_cursors",
+            },
+        ),
+    ]
@@ -3,6 +3,8 @@ from rest_framework.response import Response
 
 from core_apps.projects.models import Projects
 
+from .cache import ODKCacheManager
+
 
 class ProjectValidationMixin:
     """Mixin to handle common project validation across ODK views"""
@@ -31,3 +33,55 @@ class ProjectValidationMixin:
                 status=status.HTTP_404_NOT_FOUND,
             )
         return project.odk_id, None
+
+
+class StaleFallbackMixin:
+    """Mixin serving the last known ODK payload while ODK Central is unavailable"""
+
+    # Fields of the payload's results never kept for degraded responses
+    stale_excluded_fields = ()
+
+    def remember_payload(self, resource_type, resource_id, payload):
+        """Keep a successful ODK payload for later degraded responses"""
+        if self.stale_excluded_fields and isinstance(payload, dict):
+            payload = {
+                **payload,
+                "results": [
+                    {
+                        key: value
+                        for key, value in item.items()
+                        if key not in self.stale_excluded_fields
+                    }
+                    for item in payload.get("results", [])
+                ],
+            }
+        ODKCacheManager.remember_last_known(
+            self.request.user.id, resource_type, resource_id, payload
+        )
+
+    def stale_response(self, resource_type, resource_id, error, extra=None):
+        """Return the last known payload marked as stale, or a 503 without one"""
+        headers = {"Retry-After": str(getattr(error, "retry_after", 0) or 1)}
+        last_known = ODKCacheManager.get_last_known(
+            self.request.user.id, resource_type, resource_id
+        )
+        if last_known is None:
+            return Response(
+                {
+                    "error": "ODK Central is temporarily unavailable",
+                    "detail": str(error),
+                },
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers=headers,
+            )
+
+        payload = last_known["data"]
+        if isinstance(payload, dict):
+            payload = {
+                **payload,
+                **(extra or {}),
+                "stale": True,
+                "cached_at": last_known["cached_at"],
+            }
+        headers["Warning"] = '110 - "Response is stale"'
+        return Response(payload, status=status.HTTP_200_OK, headers=headers)
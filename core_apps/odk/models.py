@@ -26,4 +26,21 @@ class ODKUserSessions(TimeStampedModel):
     def is_valid(self) -> bool:
         if self.token_expired_at is None:
             return False
-        return self.token_expired_at > timezone.now()
\ No newline at end of file
+        return self.token_expired_at > timezone.now()
+
+
+class ODKAuditCursor(TimeStampedModel):
+    """Position of the ODK Central audit poller (see core_apps.odk.audits)"""
+
+    name = models.CharField(verbose_name="Name", max_length=50, unique=True)
+    logged_at = models.DateTimeField(verbose_name="Last Event Logged At", null=True)
+    # Fingerprints of the events logged exactly at logged_at, already applied
+    seen = models.JSONField(verbose_name="Events Seen At Cursor", default=list)
+
+    class Meta:
+        db_table = "odk_audit_cursors"
+        verbose_name = "Audit Cursor"
+        verbose_name_plural = "Audit Cursors"
+
+    def __str__(self) -> str:
+        return f"{self.name} @ {self.logged_at}"
@@ -0,0 +1,185 @@
+from io import BytesIO
+
+from django.core.cache import cache
+
+from core_apps.odk.cache import ODKCacheManager
+from core_apps.odk.xform import get_xform_tree, parse_xform
+
+# Bump when the schema format changes, so that cached schemas are rebuilt
+SCHEMA_FORMAT_VERSION = 1
+SCHEMA_CACHE_PREFIX = (
+    f"{ODKCacheManager.CACHE_PREFIX}form_schema_v{SCHEMA_FORMAT_VERSION}_"
+)
+
+# XForm bind types to pandas dtypes. Dates stay text: ODK exports them as ISO
+# strings with offsets, which Excel cannot store anyway.
+DTYPES = {
+    "int": "Int64",
+    "integer": "Int64",
+    "decimal": "float64",
+    "select1": "category",
+}
+GEOPOINT_PARTS = ("Latitude", "Longitude", "Altitude", "Accuracy")
+
+# Metadata columns added by ODK Central to the submissions CSV
+METADATA_COLUMNS = {
+    "SubmissionDate": "str",
+    "KEY": "str",
+    "SubmitterID": "str",
+    "SubmitterName": "category",
+    "AttachmentsPresent": "Int64",
+    "AttachmentsExpected": "Int64",
+    "Status": "category",
+    "ReviewState": "category",
+    "DeviceID": "str",
+    "Edits": "Int64",
+    "FormVersion": "category",
+}
+
+
+def _column(field: dict, name: str, data_type: str, dtype: str) -> dict:
+    return {
+        "name": name,
+        "path": field["path"],
+        "type": data_type,
+        "dtype": dtype,
+        "label": field["label"],
+        "choices": [c["value"] for c in field["choices"]] if field["choices"] else None,
+    }
+
+
+def _field_columns(field: dict, name: str) -> list:
+    data_type = field["type"] or "string"
+    if field["control"] in ("select", "select1", "rank"):
+        # select_multiple answers are space separated lists of choices
+        data_type = "select1" if field["control"] == "select1" else "select"
+    if data_type == "geopoint":
+        return [
+            _column(field, f"{name}-{part}", data_type, "float64")
+            for part in GEOPOINT_PARTS
+        ]
+    return [_column(field, name, data_type, DTYPES.get(data_type, "str"))]
+
+
+def build_form_schema(tree: dict) -> dict:
+    """
+    Typed column map of a parsed XForm (see core_apps.odk.xform.parse_xform).
+
+    "columns" follows ODK Central's submissions CSV: fields of the root table
+    named by their path without the root element, joined with "-", geopoints
+    split in four columns. Fields inside repeats go to "repeats", one table
+    per repeat; "groups" lists the paths of the (non repeat) groups.
+    """
+    repeats = {}
+    groups = []
+    columns = []
+    for field in tree["fields"]:
+        path = field["path"]
+        # Innermost repeat containing the field
+        repeat = max(
+            (r for r in repeats if path.startswith(f"{r}/")), key=len, default=None
+        )
+        if field["kind"] == "repeat":
+            repeats[path] = {
+                "path": path,
+                "name": field["name"],
+                "parent": repeat,
+                "columns": [],
+            }
+            continue
+        if field["kind"] == "group":
+            groups.append(path)
+            continue
+
+        # Relative to the repeat, or to the root element
+        relative = path[len(repeat) + 1 :] if repeat else path.split("/", 2)[2]
+        name = relative.replace("/", "-")
+        target = repeats[repeat]["columns"] if repeat else columns
+        target.extend(_field_columns(field, name))
+
+    return {
+        "form_id": tree["form_id"],
+        "version": tree["version"],
+        "columns": columns,
+        "repeats": list(repeats.values()),
+        "groups": groups,
+    }
+
+
+def get_form_schema(xml_data: str | bytes) -> dict:
+    """Typed schema of an XForm, cached forever by the SHA-256 of the XML"""
+    cache_key = f"{SCHEMA_CACHE_PREFIX}{ODKCacheManager.get_content_digest(xml_data)}"
+    schema = ODKCacheManager.get(cache_key)
+    if schema is None:
+        schema = build_form_schema(get_xform_tree(xml_data))
+        cache.set(cache_key, schema, ODKCacheManager.FORM_VERSION_TIMEOUT)
+    return schema
+
+
+def get_xlsform_schema(xform_xml: str) -> dict:
+    """Schema of a converted XLSForm (pyxform output), without caching"""
+    return build_form_schema(parse_xform(xform_xml))
+
+
+def get_csv_dtypes(schema: dict | None) -> dict:
+    """dtype mapping for pandas.read_csv of an ODK submissions CSV"""
+    dtypes = dict(METADATA_COLUMNS)
+    if schema:
+        dtypes.update({column["name"]: column["dtype"] for column in schema["columns"]})
+    return dtypes
+
+
+def read_submissions_csv(data: bytes, schema: dict | None = None):
+    """
+    Parse an ODK submissions CSV with explicit dtypes instead of inference.
+    Columns unknown to the schema (or all of them without a schema) are read
+    as text, so that identifiers such as phone numbers keep their leading zeros.
+    """
+    import pandas as pd
+
+    dtypes = get_csv_dtypes(schema)
+    header = pd.read_csv(BytesIO(data), nrows=0, encoding="utf-8").columns
+    try:
+        return pd.read_csv(
+            BytesIO(data),
+            dtype={column: dtypes.get(column, "str") for column in header},
+            encoding="utf-8",
+        )
+    except (TypeError, ValueError):
+        # Older submissions that do not match the current version's types
+        return pd.read_csv(BytesIO(data), dtype="str", encoding="utf-8")
+
+
+def _sheet_name(table: str, used: set) -> str:
+    # Excel sheet names are limited to 31 characters and must be unique
+    name = table.split(".", 1)[-1][:31]
+    suffix = 1
+    while name in used:
+        suffix += 1
+        name = f"{table.split('.', 1)[-1][: 31 - len(str(suffix)) - 1]}~{suffix}"
+    used.add(name)
+    return name
+
+
+def dataframe_to_bytes(df, to: str, repeats: dict = None) -> bytes:
+    """
+    Serialize submissions as CSV, XLSX or Parquet. With XLSX, the flattened
+    repeat tables (see core_apps.odk.flatten) are added as one sheet each,
+    linked to their parent rows by PARENT_KEY.
+    """
+    import pandas as pd
+
+    if to == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    output = BytesIO()
+    if to == "parquet":
+        df.to_parquet(output, engine="pyarrow", compression="zstd", index=False)
+    else:
+        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
+            df.to_excel(writer, index=False, sheet_name="Submissions")
+            used = {"Submissions"}
+            for table, repeat_df in (repeats or {}).items():
+                repeat_df.to_excel(
+                    writer, index=False, sheet_name=_sheet_name(table, used)
+                )
+    return output.getvalue()
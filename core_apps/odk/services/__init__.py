@@ -1,4 +1,5 @@
 from .appUserServices import ODKAppUserService
+from .auditServices import ODKAuditService
 from .baseService import BaseODKService
 from .publicAccessServices import ODKPublicAccessService
 from .formServices import ODKFormService
@@ -13,6 +14,7 @@ class ODKCentralService(
     ODKSubmissionService,
     ODKAppUserService,
     ODKPublicAccessService,
+    ODKAuditService,
 ):
 
     pass
@@ -27,4 +29,5 @@ __all__ = [
     # "ODKPermissionMixin",
     "ODKAppUserService",
     "ODKPublicAccessService",
+    "ODKAuditService",
 ]
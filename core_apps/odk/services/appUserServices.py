@@ -1,6 +1,8 @@
 import logging
 from typing import Dict, List
 
+from core_apps.odk.cache import ODKCacheManager
+
 from .baseService import BaseODKService
 from .exceptions import ODKValidationError
 
@@ -43,6 +45,7 @@ class ODKAppUserService(BaseODKService):
             app_user = self._make_request(
                 "POST", f"projects/{project_id}/app-users", json=payload
             )
+            ODKCacheManager.bump_version(f"project_{project_id}")
 
             self._log_action(
                 "create_app_user",
@@ -78,6 +81,7 @@ class ODKAppUserService(BaseODKService):
             self._make_request(
                 "DELETE", f"projects/{project_id}/app-users/{app_user_id}"
             )
+            ODKCacheManager.bump_version(f"project_{project_id}")
             self._log_action(
                 "delete_app_user",
                 "app_user",
@@ -110,6 +114,7 @@ class ODKAppUserService(BaseODKService):
 
             # Révoquer la session en supprimant le token
             self._make_request("DELETE", f"sessions/{token}")
+            ODKCacheManager.bump_version(f"project_{project_id}")
 
             self._log_action(
                 "revoke_app_user",
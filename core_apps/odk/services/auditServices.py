@@ -0,0 +1,61 @@
+import logging
+from typing import Dict, Iterator, List
+
+from django.conf import settings
+
+from .baseService import BaseODKService
+
+logger = logging.getLogger(__name__)
+
+
+class ODKAuditService(BaseODKService):
+    """Service de lecture du journal d'audit d'ODK Central"""
+
+    def __init__(self, django_user, request=None):
+        super().__init__(django_user, request=request)
+
+    def get_audits(
+        self, start: str = None, limit: int = None, offset: int = 0
+    ) -> List[Dict]:
+        """
+        Récupère les événements du journal d'audit, du plus récent au plus
+        ancien, à partir de `start` (inclus). Les métadonnées étendues donnent
+        l'objet concerné (projet, formulaire...) dans "actee".
+        """
+        params = {"offset": offset}
+        if start:
+            params["start"] = start
+        if limit:
+            params["limit"] = limit
+        try:
+            return self._make_request(
+                "GET",
+                "audits",
+                headers={"X-Extended-Metadata": "true"},
+                params=params,
+            )
+        except Exception as e:
+            self._log_action(
+                "list_audits",
+                "audit",
+                start or "",
+                {
+                    "error": str(e),
+                    "odk_account": (
+                        self.current_account["id"] if self.current_account else None
+                    ),
+                },
+                success=False,
+            )
+            raise
+
+    def iter_audits(self, start: str = None, page_size: int = None) -> Iterator[Dict]:
+        """Parcourt tous les événements depuis `start`, page par page"""
+        page_size = page_size or getattr(settings, "ODK_AUDIT_PAGE_SIZE", 500)
+        offset = 0
+        while True:
+            events = self.get_audits(start=start, limit=page_size, offset=offset)
+            yield from events
+            if len(events) < page_size:
+                return
+            offset += page_size
@@ -1,7 +1,12 @@
+import contextvars
+import copy
 import json
 import logging
 import threading
 import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures import wait
 from datetime import timedelta
 from typing import Any, Dict
 
@@ -10,12 +15,33 @@ from django.utils import timezone
 
 import requests
 
+from core_apps.common.profiling import record_odk_call
+from core_apps.common.ratelimit import parse_retry_after
+from core_apps.common.tracing import odk_request_span, record_response_status
 from core_apps.common.utils import log_audit_action
+from core_apps.odk import metrics
 from core_apps.odk.models import ODKUserSessions
-from core_apps.odk.utils import get_ssl_verify
-
-from .exceptions import ODKValidationError
-from .poolServices import ODKAccountPool
+from core_apps.odk.utils import get_endpoint_class, get_endpoint_template
+
+from .circuitBreaker import ODKCircuitBreaker
+from .deadline import bounded_timeout, check_deadline, get_remaining
+from .exceptions import (
+    ODKDeadlineExceededError,
+    ODKRateLimitedError,
+    ODKServiceUnavailableError,
+    ODKValidationError,
+)
+from .hedging import (
+    HEDGEABLE_METHODS,
+    HedgeBudget,
+    get_hedge_delay,
+    get_hedge_executor,
+    latency_tracker,
+    run_in_worker_thread,
+)
+from .poolServices import ODKAccountPool, get_shared_account
+from .rateLimiter import ODKRateLimiter
+from .transport import get_request_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -32,10 +58,20 @@ class BaseODKService:
         self.current_account = None
         self.current_session_data = None
         self.odk_account_pool = ODKAccountPool()
+        # True when the account belongs to an enclosing batch (shared_account)
+        self.shared_lease = False
 
     def __enter__(self):
         """Context manager to acquire an ODK account from the pool"""
-        self.current_account = self.odk_account_pool.get_account()
+        check_deadline("acquiring an ODK account")
+        if (account := get_shared_account()) is not None:
+            self.current_account = account
+            self.shared_lease = True
+        else:
+            pool_timeout = 30
+            if (remaining := get_remaining()) is not None:
+                pool_timeout = min(pool_timeout, remaining)
+            self.current_account = self.odk_account_pool.get_account(pool_timeout)
         self.current_session_data = self.odk_account_pool.get_session_for_account(
             self.current_account
         )
@@ -43,7 +79,7 @@ class BaseODKService:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Release the account back to the pool"""
-        if self.current_account:
+        if self.current_account and not self.shared_lease:
             self.odk_account_pool.return_account(self.current_account)
 
     def _get_or_create_token(self) -> str:
@@ -67,9 +103,10 @@ class BaseODKService:
             response = session_data["session"].post(
                 f"{self.base_url}/sessions",
                 json={"email": account["email"], "password": account["password"]},
-                verify=get_ssl_verify(),
+                timeout=bounded_timeout(get_request_timeout()),
             )
             response.raise_for_status()
+            metrics.count_token_refresh(account["id"], "success")
 
             token = response.json().get("token")
             expires_at = timezone.now() + timedelta(
@@ -83,16 +120,17 @@ class BaseODKService:
                 {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
             )
 
-            # Also save the token for Django user
+            # Also save the token for Django user (none in background tasks)
             thread_id = threading.current_thread().ident
-            ODKUserSessions.objects.update_or_create(
-                user=self.django_user,
-                defaults={
-                    "odk_token": token,
-                    "token_expired_at": expires_at,
-                    "actor_id": account["id"],
-                },
-            )
+            if self.django_user is not None:
+                ODKUserSessions.objects.update_or_create(
+                    user=self.django_user,
+                    defaults={
+                        "odk_token": token,
+                        "token_expired_at": expires_at,
+                        "actor_id": account["id"],
+                    },
+                )
 
             logger.info(
                 f"ODK authentication successful for account {account['id']} (threads: {thread_id})"
@@ -100,6 +138,7 @@ class BaseODKService:
             return token
 
         except Exception as e:
+            metrics.count_token_refresh(account["id"], "error")
             thread_id = threading.current_thread().ident
             logger.error(
                 f"ODK authentication failed for account {account['id']}: {e} (thread: {thread_id})"
@@ -107,21 +146,177 @@ class BaseODKService:
             raise
 
     def _make_request(self, method: str, endpoint: str, **kwargs) -> Any:
+        """
+        Make a request to ODK Central. Safe requests flagged with hedge=True are
+        duplicated on a second pooled account when slow (ODK_HEDGING_ENABLED).
+        """
+        hedge = kwargs.pop("hedge", False)
+        started = time.monotonic()
+        try:
+            if (
+                hedge
+                and method in HEDGEABLE_METHODS
+                and getattr(settings, "ODK_HEDGING_ENABLED", False)
+            ):
+                return self._hedged_request(method, endpoint, **kwargs)
+            return self._request_with_retries(method, endpoint, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started
+            metrics.observe_request(method, endpoint, elapsed)
+            record_odk_call(elapsed)
+
+    def _hedged_request(self, method: str, endpoint: str, **kwargs) -> Any:
+        """
+        Send the request, and if it has not answered after the endpoint's p95
+        latency, send a duplicate on another free account; the first success wins.
+
+        An account stays leased until the request running on it has finished:
+        when the hedge wins, this service moves to the hedge's account and the
+        primary's account goes back to the pool once the primary answers.
+        """
+        HedgeBudget.record_request()
+        executor = get_hedge_executor()
+        delay = get_hedge_delay(get_endpoint_template(endpoint))
+
+        # The primary runs on its own copy, unaffected if this service moves on
+        primary = executor.submit(
+            contextvars.copy_context().run,
+            run_in_worker_thread,
+            copy.copy(self)._request_with_retries,
+            method,
+            endpoint,
+            **kwargs,
+        )
+        try:
+            return primary.result(timeout=bounded_timeout(delay))
+        except FuturesTimeoutError:
+            pass
+
+        hedge_service = self._lease_hedge_service()
+        if hedge_service is None:
+            try:
+                return primary.result(timeout=get_remaining())
+            except FuturesTimeoutError:
+                self._detach_account(primary)
+                raise ODKDeadlineExceededError(
+                    f"Request time budget exhausted waiting for {method} {endpoint}."
+                )
+
+        metrics.count_hedge(endpoint)
+        logger.info(
+            f"Hedging {method} {endpoint} on ODK account "
+            f"{hedge_service.current_account['id']} after {delay:.2f}s"
+        )
+        secondary = executor.submit(
+            contextvars.copy_context().run,
+            run_in_worker_thread,
+            hedge_service._run_hedge,
+            method,
+            endpoint,
+            **kwargs,
+        )
+
+        # Return the first success; if both fail, report the primary's error
+        errors = {}
+        pending = {primary, secondary}
+        try:
+            while pending:
+                done, pending = wait(
+                    pending, timeout=get_remaining(), return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    if primary in pending:
+                        self._detach_account(primary)
+                    raise ODKDeadlineExceededError(
+                        f"Request time budget exhausted waiting for {method} {endpoint}."
+                    )
+                for future in done:
+                    if future.exception() is None:
+                        if future is secondary and not primary.done():
+                            self._take_over_account(hedge_service, primary)
+                        return future.result()
+                    errors[future] = future.exception()
+            raise errors[primary]
+        finally:
+            if hedge_service.current_account is not None:
+                self._release_when_done(secondary, hedge_service.current_account)
+
+    def _release_when_done(self, future, account: dict) -> None:
+        """Give the account back to the pool once the request using it has finished"""
+        future.add_done_callback(
+            lambda _: self.odk_account_pool.return_account(account)
+        )
+
+    def _detach_account(self, future) -> None:
+        """Stop using an account still busy with `future`, freed when it ends"""
+        if not self.shared_lease:
+            self._release_when_done(future, self.current_account)
+            self.current_account = None
+
+    def _take_over_account(self, hedge_service: "BaseODKService", primary) -> None:
+        """
+        The hedge won while the primary is still running: keep the hedge's
+        account for the next requests of this service, and free the primary's
+        account when its request ends.
+        """
+        self._detach_account(primary)
+        self.current_account = hedge_service.current_account
+        self.current_session_data = hedge_service.current_session_data
+        hedge_service.current_account = None
+
+    def _lease_hedge_service(self) -> "BaseODKService | None":
+        """Copy of this service bound to another free account, within the hedge budget"""
+        # A shared account belongs to the enclosing batch, it cannot be swapped
+        if self.shared_lease:
+            return None
+        account = self.odk_account_pool.get_account_nowait()
+        if account is None:
+            return None
+        if not HedgeBudget.try_spend():
+            self.odk_account_pool.return_account(account)
+            return None
+        hedge_service = copy.copy(self)
+        hedge_service.current_account = account
+        hedge_service.current_session_data = (
+            self.odk_account_pool.get_session_for_account(account)
+        )
+        return hedge_service
+
+    def _run_hedge(self, method: str, endpoint: str, **kwargs) -> Any:
+        """Run a hedged duplicate; _hedged_request gives its account back"""
+        return self._request_with_retries(method, endpoint, **kwargs)
+
+    def _request_with_retries(self, method: str, endpoint: str, **kwargs) -> Any:
         """Make a request to ODK Central with retry and error handling"""
         # Use configuration or default values
         max_retries = getattr(settings, "ODK_MAX_RETRIES", 5)
-        timeout = getattr(settings, "ODK_REQUEST_TIMEOUT", 120)
+        timeout = get_request_timeout()
 
         # Extract return_json parameter (default to True)
         return_json = kwargs.pop("return_json", True)
 
-        # Add default timeout if not specified
-        if "timeout" not in kwargs:
-            kwargs["timeout"] = timeout
-        if "verify" not in kwargs:
-            kwargs["verify"] = get_ssl_verify()
+        # Per-attempt timeouts are shrunk to what is left of the request budget
+        timeout = kwargs.pop("timeout", timeout)
+
+        # Fail fast while ODK Central is known to be down
+        breaker = ODKCircuitBreaker(self.base_url, get_endpoint_class(endpoint))
+        if not breaker.allow_request():
+            logger.warning(
+                f"ODK circuit '{breaker.endpoint_class}' open, skipping {method} {endpoint}"
+            )
+            metrics.count_response(method, endpoint, "circuit_open")
+            raise self._circuit_open_error(breaker)
+
+        # Shared outbound rate limit: requests over it wait here for their turn
+        limiter = None
+        if ODKRateLimiter.enabled():
+            limiter = ODKRateLimiter(self.base_url, self.current_account["id"])
 
         for attempt in range(max_retries):
+            check_deadline(f"{method} {endpoint}")
+            if limiter is not None:
+                limiter.acquire(method, endpoint)
+            kwargs["timeout"] = bounded_timeout(timeout)
             try:
                 self._get_or_create_token()
                 session = self.current_session_data["session"]
@@ -130,10 +325,22 @@ class BaseODKService:
                     f"Attempt {attempt + 1}/{max_retries} - {method} {self.base_url}/{endpoint}"
                 )
 
-                response = session.request(
-                    method, f"{self.base_url}/{endpoint}", **kwargs
-                )
+                attempt_started = time.monotonic()
+                with odk_request_span(
+                    method, endpoint, attempt, self.current_account["id"]
+                ) as span:
+                    response = session.request(
+                        method, f"{self.base_url}/{endpoint}", **kwargs
+                    )
+                    record_response_status(span, response.status_code)
+                metrics.count_response(method, endpoint, response.status_code)
                 response.raise_for_status()
+                breaker.record_success()
+                if method in HEDGEABLE_METHODS:
+                    latency_tracker.record(
+                        get_endpoint_template(endpoint),
+                        time.monotonic() - attempt_started,
+                    )
 
                 # For requests that don't return JSON
                 if response.status_code == 204 or not response.content:
@@ -143,10 +350,14 @@ class BaseODKService:
                 return response.json() if return_json else response.content
             except requests.exceptions.ConnectionError as e:
                 logger.error(f"Connection error to ODK Central ({self.base_url}): {e}")
+                metrics.count_response(method, endpoint, "connection_error")
+                breaker.record_failure()
+                if breaker.is_open():
+                    raise self._circuit_open_error(breaker)
                 if attempt < max_retries - 1:
                     wait_time = 2**attempt
                     logger.info(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
+                    self._sleep_before_retry(wait_time, method, endpoint)
                     continue
                 raise Exception(
                     f"Unable to connect to ODK Central server. "
@@ -154,14 +365,18 @@ class BaseODKService:
                 )
             except requests.exceptions.Timeout as e:
                 logger.error(f"Timeout connecting to ODK Central: {e}")
+                metrics.count_response(method, endpoint, "timeout")
+                breaker.record_failure()
+                if breaker.is_open():
+                    raise self._circuit_open_error(breaker)
                 if attempt < max_retries - 1:
                     wait_time = 2**attempt
                     logger.info(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
+                    self._sleep_before_retry(wait_time, method, endpoint)
                     continue
                 raise Exception(
                     f"ODK Central server is not responding within the timeout period ({timeout}s). "
-                    f"Please check server status or increase ODK_REQUEST_TIMEOUT value."
+                    f"Please check server status or increase ODK_READ_TIMEOUT value."
                 )
             except requests.exceptions.HTTPError as e:
                 if e.response.status_code == 401:
@@ -170,9 +385,34 @@ class BaseODKService:
                     )
                     self.current_session_data["token"] = None
                     if attempt < max_retries - 1:
+                        metrics.count_retry(method, endpoint)
                         continue
 
                 status_code = e.response.status_code
+                if status_code < 500:
+                    # The server answered, it is up
+                    breaker.record_success()
+
+                if status_code == 429:
+                    retry_after = parse_retry_after(
+                        e.response.headers.get("Retry-After")
+                    )
+                    if retry_after is None:
+                        retry_after = 2**attempt
+                    if limiter is not None:
+                        # Every worker holds off, the retry queues in acquire()
+                        limiter.pause(retry_after)
+                    if attempt < max_retries - 1:
+                        if limiter is None:
+                            self._sleep_before_retry(retry_after, method, endpoint)
+                        else:
+                            metrics.count_retry(method, endpoint)
+                        continue
+                    raise ODKRateLimitedError(
+                        f"ODK Central is rate limiting requests. "
+                        f"Please try again in {max(1, round(retry_after))} seconds.",
+                        retry_after=max(1, round(retry_after)),
+                    )
 
                 # Essayer de récupérer le détail de l'erreur depuis la réponse
                 error_detail = None
@@ -193,10 +433,13 @@ class BaseODKService:
                 elif status_code == 403:
                     raise Exception(f"Access denied to resource: {endpoint}")
                 elif status_code >= 500:
+                    breaker.record_failure()
+                    if breaker.is_open():
+                        raise self._circuit_open_error(breaker)
                     if attempt < max_retries - 1:
                         wait_time = 2**attempt
                         logger.info(f"Server error, retrying in {wait_time} seconds...")
-                        time.sleep(wait_time)
+                        self._sleep_before_retry(wait_time, method, endpoint)
                         continue
                     raise Exception(
                         f"ODK Central server error ({status_code}). Please try again later."
@@ -212,12 +455,31 @@ class BaseODKService:
                 if attempt < max_retries - 1:
                     wait_time = 2**attempt
                     logger.info(f"Retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
+                    self._sleep_before_retry(wait_time, method, endpoint)
                     continue
                 raise
 
         raise Exception(f"Maximum number of attempts exceeded for {method} {endpoint}")
 
+    def _sleep_before_retry(self, wait_time: float, method: str, endpoint: str) -> None:
+        """Back off before a retry, unless the wait would outlive the request budget"""
+        remaining = get_remaining()
+        if remaining is not None and wait_time >= remaining:
+            raise ODKDeadlineExceededError(
+                f"Request time budget exhausted, giving up {method} {endpoint}."
+            )
+        metrics.count_retry(method, endpoint)
+        time.sleep(wait_time)
+
+    def _circuit_open_error(
+        self, breaker: ODKCircuitBreaker
+    ) -> ODKServiceUnavailableError:
+        return ODKServiceUnavailableError(
+            f"ODK Central ({self.base_url}) is temporarily unavailable. "
+            f"Please try again in {breaker.retry_after()} seconds.",
+            retry_after=breaker.retry_after(),
+        )
+
     def _log_action(
         self,
         action: str,
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core_apps.odk.cache import ODKCacheManager
+
+logger = logging.getLogger(__name__)
+
+
+class ODKCircuitBreaker:
+    """
+    Circuit breaker shared by all workers through the Redis cache, one per ODK
+    Central base URL and endpoint class.
+
+    - closed: requests go through, failures (connection errors, timeouts, 5xx)
+      are counted over a sliding window
+    - open: once the failure threshold is reached, requests fail fast
+    - half-open: after the recovery timeout a single worker is allowed to probe
+      ODK Central; success closes the circuit, failure opens it again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    CACHE_PREFIX = "odk_circuit_"
+
+    def __init__(self, base_url: str, endpoint_class: str):
+        self.base_url = base_url
+        self.endpoint_class = endpoint_class
+        url_digest = hashlib.sha1(base_url.encode("utf-8")).hexdigest()[:12]
+        self.key_prefix = f"{self.CACHE_PREFIX}{url_digest}_{endpoint_class}"
+        self.failure_threshold = getattr(settings, "ODK_CIRCUIT_FAILURE_THRESHOLD", 5)
+        self.failure_window = getattr(settings, "ODK_CIRCUIT_FAILURE_WINDOW", 60)
+        self.recovery_timeout = getattr(settings, "ODK_CIRCUIT_RECOVERY_TIMEOUT", 30)
+        self._probing = False
+
+    def _key(self, name: str) -> str:
+        return f"{self.key_prefix}_{name}"
+
+    def _opened_at(self):
+        return cache.get(self._key("opened_at"))
+
+    @property
+    def state(self) -> str:
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return self.CLOSED
+        if time.time() - opened_at >= self.recovery_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def is_open(self) -> bool:
+        return self.state == self.OPEN
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent to ODK Central"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN:
+            # Only one worker probes, the others keep failing fast
+            self._probing = cache.add(self._key("probe"), 1, self.recovery_timeout)
+            if self._probing:
+                logger.info(
+                    f"ODK circuit '{self.endpoint_class}' half-open, probing {self.base_url}"
+                )
+            return self._probing
+        return False
+
+    def retry_after(self) -> int:
+        """Seconds until the next probe is allowed"""
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return 0
+        return max(1, int(self.recovery_timeout - (time.time() - opened_at)))
+
+    def record_success(self) -> None:
+        if not self._probing and self._opened_at() is None:
+            return
+        cache.delete_many(
+            [self._key("opened_at"), self._key("failures"), self._key("probe")]
+        )
+        self._probing = False
+        logger.info(
+            f"ODK circuit '{self.endpoint_class}' closed, {self.base_url} recovered"
+        )
+
+    def record_failure(self) -> None:
+        failures = ODKCacheManager.incr(self._key("failures"), self.failure_window)
+
+        if self._probing:
+            self._open(failures, reopen=True)
+        elif failures >= self.failure_threshold:
+            self._open(failures)
+
+    def _open(self, failures: int, reopen: bool = False) -> None:
+        opened_at_key = self._key("opened_at")
+        timeout = self.failure_window + self.recovery_timeout * 10
+        if reopen:
+            cache.set(opened_at_key, time.time(), timeout)
+            cache.delete(self._key("probe"))
+            self._probing = False
+        elif not cache.add(opened_at_key, time.time(), timeout):
+            # Already opened by another worker
+            return
+        logger.error(
+            f"ODK circuit '{self.endpoint_class}' opened for {self.base_url} "
+            f"after {failures} failure(s), retry in {self.recovery_timeout}s"
+        )
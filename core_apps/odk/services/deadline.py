@@ -0,0 +1,58 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+
+from .exceptions import ODKDeadlineExceededError
+
+# Absolute time.monotonic() value after which ODK calls must stop, None = no limit
+_deadline: ContextVar[float | None] = ContextVar("odk_deadline", default=None)
+
+
+def set_deadline(seconds: float | None) -> Token:
+    """Start a time budget of `seconds` for every ODK call made in this context"""
+    return _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+
+def reset_deadline(token: Token) -> None:
+    _deadline.reset(token)
+
+
+@contextmanager
+def odk_deadline(seconds: float | None):
+    """Context manager variant of set_deadline(), used outside of HTTP requests"""
+    token = set_deadline(seconds)
+    try:
+        yield
+    finally:
+        reset_deadline(token)
+
+
+def get_remaining() -> float | None:
+    """Seconds left in the current budget, None when no deadline is set"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline(action: str) -> None:
+    """Raise ODKDeadlineExceededError if the budget is already spent"""
+    remaining = get_remaining()
+    if remaining is not None and remaining <= 0:
+        raise ODKDeadlineExceededError(
+            f"Request time budget exhausted before {action}."
+        )
+
+
+def bounded_timeout(timeout):
+    """
+    Shrink a requests timeout (seconds or a (connect, read) tuple) so that it
+    does not outlive the current budget.
+    """
+    remaining = get_remaining()
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, 0.001)
+    if isinstance(timeout, tuple):
+        return tuple(min(value, remaining) for value in timeout)
+    return min(timeout, remaining)
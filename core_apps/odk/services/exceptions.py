@@ -88,4 +88,20 @@ class ODKValidationError(Exception):
             "validations": validations,
         }
 
-        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ODKServiceUnavailableError(Exception):
+    """Exception levée lorsque ODK Central est indisponible (circuit ouvert)"""
+
+    def __init__(self, message, retry_after: int = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ODKRateLimitedError(ODKServiceUnavailableError):
+    """Exception levée lorsque la limite de débit vers ODK Central est atteinte"""
+
+
+class ODKDeadlineExceededError(ODKServiceUnavailableError):
+    """Exception levée lorsque le budget de temps de la requête est épuisé"""
@@ -2,6 +2,9 @@ import logging
 from typing import Dict, List
 from .baseService import BaseODKService
 from .exceptions import ODKValidationError
+from core_apps.odk.cache import ODKCacheManager
+from core_apps.odk.schema import get_form_schema
+from core_apps.odk.xform import get_xform_tree
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +15,16 @@ class ODKFormService(BaseODKService):
     def __init__(self, django_user, request=None):
         super().__init__(django_user, request=request)
 
-    def get_project_forms(self, project_id: int) -> List[Dict]:
-        """Retrieve forms for a specific project"""
+    def get_project_forms(self, project_id: int, extended: bool = False) -> List[Dict]:
+        """
+        Retrieve forms for a specific project; with extended metadata, each form
+        also carries its submission count and last submission date
+        """
+        headers = {"X-Extended-Metadata": "true"} if extended else {}
         try:
-            return self._make_request("GET", f"projects/{project_id}/forms")
+            return self._make_request(
+                "GET", f"projects/{project_id}/forms", headers=headers, hedge=True
+            )
         except Exception as e:
             self._log_action(
                 "list_forms",
@@ -34,7 +43,9 @@ class ODKFormService(BaseODKService):
     def get_form(self, project_id: int, form_id: str) -> Dict:
         """Retrieve a specific form"""
         try:
-            return self._make_request("GET", f"projects/{project_id}/forms/{form_id}")
+            return self._make_request(
+                "GET", f"projects/{project_id}/forms/{form_id}", hedge=True
+            )
         except Exception as e:
             self._log_action(
                 "get_form",
@@ -113,6 +124,7 @@ class ODKFormService(BaseODKService):
                 headers=headers,
                 params=params,
             )
+            ODKCacheManager.bump_version(f"project_{project_id}")
             self._log_action(
                 "create_form",
                 "form",
@@ -144,6 +156,7 @@ class ODKFormService(BaseODKService):
             result = self._make_request(
                 "DELETE", f"projects/{project_id}/forms/{form_id}"
             )
+            ODKCacheManager.bump_version(f"project_{project_id}")
             self._log_action(
                 "delete_form",
                 "form",
@@ -266,11 +279,13 @@ class ODKFormService(BaseODKService):
             if version:
                 params["version"] = version
 
-            return self._make_request(
+            result = self._make_request(
                 "POST",
                 f"projects/{project_id}/forms/{form_id}/draft/publish",
                 params=params,
             )
+            ODKCacheManager.bump_version(f"project_{project_id}")
+            return result
         except ODKValidationError:
             raise
         except Exception as e:
@@ -366,13 +381,19 @@ class ODKFormService(BaseODKService):
             raise
 
     def get_form_version_xml(self, project_id: int, form_id: str, version: str) -> str:
-        """Get XML for a specific form version"""
+        """Get XML for a specific form version, cached forever once fetched"""
+        cached = ODKCacheManager.get_form_version_xml(project_id, form_id, version)
+        if cached:
+            return cached[1]
         try:
             xml_data = self._make_request(
                 "GET",
                 f"projects/{project_id}/forms/{form_id}/versions/{version}.xml",
                 return_json=False,
             )
+            ODKCacheManager.cache_form_version_xml(
+                project_id, form_id, version, xml_data
+            )
             return xml_data
 
         except Exception as e:
@@ -389,3 +410,16 @@ class ODKFormService(BaseODKService):
                 success=False,
             )
             raise
+
+    def get_form_version_tree(
+        self, project_id: int, form_id: str, version: str
+    ) -> Dict:
+        """Parsed field tree of a form version (see core_apps.odk.xform)"""
+        return get_xform_tree(self.get_form_version_xml(project_id, form_id, version))
+
+    def get_form_schema(self, project_id: int, form_id: str) -> Dict:
+        """Typed column schema of the published version of a form"""
+        form = self.get_form(project_id, form_id)
+        # ODK Central addresses an empty version as "___"
+        version = form.get("version") or "___"
+        return get_form_schema(self.get_form_version_xml(project_id, form_id, version))
@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from core_apps.odk.cache import ODKCacheManager
+
+logger = logging.getLogger(__name__)
+
+# Hedging only ever duplicates requests that are safe to send twice
+HEDGEABLE_METHODS = frozenset({"GET", "HEAD"})
+
+
+class LatencyTracker:
+    """Recent latencies of the ODK endpoints, kept per process and per endpoint template"""
+
+    def __init__(self, maxlen: int = 200):
+        self._samples = defaultdict(lambda: deque(maxlen=maxlen))
+        self._lock = threading.Lock()
+
+    def record(self, template: str, seconds: float) -> None:
+        with self._lock:
+            self._samples[template].append(seconds)
+
+    def percentile(self, template: str, percent: float) -> float | None:
+        """Return the given percentile, or None until enough samples are collected"""
+        with self._lock:
+            samples = sorted(self._samples.get(template, ()))
+        if len(samples) < getattr(settings, "ODK_HEDGE_MIN_SAMPLES", 20):
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+
+latency_tracker = LatencyTracker()
+
+
+def get_hedge_delay(template: str) -> float:
+    """Delay before hedging: the endpoint's observed p95, or ODK_HEDGE_DELAY"""
+    observed = latency_tracker.percentile(
+        template, getattr(settings, "ODK_HEDGE_PERCENTILE", 95)
+    )
+    if observed is None:
+        return getattr(settings, "ODK_HEDGE_DELAY", 1.0)
+    return observed
+
+
+class HedgeBudget:
+    """
+    Global hedge budget shared through the Redis cache: over each one-minute
+    window, hedges may not exceed ODK_HEDGE_BUDGET_RATIO of the hedgeable requests.
+    """
+
+    CACHE_PREFIX = "odk_hedge_"
+    WINDOW = 60
+
+    @classmethod
+    def _keys(cls) -> tuple[str, str]:
+        window = int(time.time() // cls.WINDOW)
+        return (
+            f"{cls.CACHE_PREFIX}requests_{window}",
+            f"{cls.CACHE_PREFIX}sent_{window}",
+        )
+
+    @classmethod
+    def record_request(cls) -> None:
+        requests_key, _ = cls._keys()
+        ODKCacheManager.incr(requests_key, cls.WINDOW * 2)
+
+    @classmethod
+    def try_spend(cls) -> bool:
+        requests_key, sent_key = cls._keys()
+        allowed = cache.get(requests_key, 0) * getattr(
+            settings, "ODK_HEDGE_BUDGET_RATIO", 0.05
+        )
+        # Reserve atomically, and give the slot back when over budget so that
+        # denied attempts do not use it up
+        if ODKCacheManager.incr(sent_key, cls.WINDOW * 2) <= allowed:
+            return True
+        try:
+            cache.decr(sent_key)
+        except ValueError:
+            # The counter expired in the meantime
+            pass
+        return False
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """Thread pool running hedged requests, created lazily in each process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "ODK_HEDGE_MAX_WORKERS", 8),
+                thread_name_prefix="odk-hedge",
+            )
+        return _executor
+
+
+def run_in_worker_thread(func, *args, **kwargs):
+    """Run func in an executor thread, closing the thread's DB connection afterwards"""
+    try:
+        return func(*args, **kwargs)
+    finally:
+        connection.close()
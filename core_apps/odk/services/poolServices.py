@@ -1,16 +1,80 @@
+import itertools
 import logging
 import threading
+import time
+from collections import deque
 from contextlib import contextmanager
+from contextvars import ContextVar
 from multiprocessing.context import TimeoutError
-from queue import Empty, Queue
 
 from django.conf import settings
 from django.utils import timezone
 
-import requests
+from core_apps.common.profiling import record_pool_wait
+from core_apps.odk import metrics
+
+from .deadline import get_remaining
+from .transport import build_odk_session
 
 logger = logging.getLogger(__name__)
 
+# Compte prêté à un lot de sous-requêtes (voir core_apps.odk.batch), avec le
+# thread qui l'a reçu : les threads lancés depuis ce contexte empruntent le leur
+_shared_account: ContextVar[tuple | None] = ContextVar(
+    "odk_shared_account", default=None
+)
+
+
+@contextmanager
+def shared_account(account: dict):
+    """Fait réutiliser `account` par les services ODK ouverts dans ce thread"""
+    token = _shared_account.set((account, threading.get_ident()))
+    try:
+        yield account
+    finally:
+        _shared_account.reset(token)
+
+
+def get_shared_account() -> dict | None:
+    """Compte partagé du thread courant, ou None"""
+    shared = _shared_account.get()
+    if shared is None or shared[1] != threading.get_ident():
+        return None
+    return shared[0]
+
+
+# Classes de priorité des emprunts de comptes, de la plus prioritaire à la moins
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITY_RANKS = {INTERACTIVE: 0, BACKGROUND: 1}
+
+_lease_priority: ContextVar[str] = ContextVar("odk_lease_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def lease_priority(priority: str):
+    """Classe de priorité des comptes empruntés dans ce contexte"""
+    if priority not in PRIORITY_RANKS:
+        raise ValueError(f"Unknown ODK lease priority: {priority}")
+    token = _lease_priority.set(priority)
+    try:
+        yield priority
+    finally:
+        _lease_priority.reset(token)
+
+
+def set_lease_priority(priority: str):
+    """Comme lease_priority, pour un contexte ouvert et fermé séparément"""
+    return _lease_priority.set(priority)
+
+
+def reset_lease_priority(token) -> None:
+    _lease_priority.reset(token)
+
+
+def get_lease_priority() -> str:
+    return _lease_priority.get()
+
 
 class ODKAccountPool:
     """Singleton class to manage a pool of ODK accounts for concurrent access"""
@@ -47,13 +111,19 @@ class ODKAccountPool:
                 }
             )
 
-        self.account_queue = Queue()
+        self.free_accounts = deque()
         self.account_locks = {}
         self.account_sessions = {}
+        # Emprunts en cours : id du compte -> classe de priorité
+        self.leases = {}
+        # Emprunts en attente, servis par priorité (voir _next_waiter)
+        self.waiters = []
+        self.condition = threading.Condition()
+        self._arrivals = itertools.count()
 
-        # Initialize Queue and locks for each account
+        # Initialize free accounts and locks for each account
         for account in self.accounts:
-            self.account_queue.put(account)
+            self.free_accounts.append(account)
             self.account_locks[account["id"]] = threading.Lock()
 
         self._initialized = True
@@ -68,26 +138,119 @@ class ODKAccountPool:
         finally:
             self.return_account(account)
 
-    def get_account(self, timeout=30) -> dict:
-        """Récupère un compte disponible du pool"""
+    def _reserved(self) -> int:
+        """Comptes gardés pour les requêtes interactives (au moins un reste partageable)"""
+        reserved = getattr(settings, "ODK_POOL_RESERVED_INTERACTIVE", 1)
+        return max(min(reserved, len(self.accounts) - 1), 0)
+
+    def _effective_rank(self, waiter: dict, now: float) -> int:
+        """
+        Rang de priorité d'une attente : chaque ODK_POOL_AGING_SECONDS passées
+        à attendre la font monter d'une classe, pour qu'aucune ne soit affamée
+        """
+        aging = getattr(settings, "ODK_POOL_AGING_SECONDS", 10)
+        promotions = int((now - waiter["since"]) / aging) if aging else 0
+        return max(PRIORITY_RANKS[waiter["priority"]] - promotions, 0)
+
+    def _is_eligible(self, priority: str, rank: int) -> bool:
+        """Un compte libre peut-il être prêté à cette classe, à ce rang ?"""
+        if not self.free_accounts:
+            return False
+        limit = getattr(settings, "ODK_POOL_CLASS_LIMITS", {}).get(priority)
+        in_use = sum(1 for leased in self.leases.values() if leased == priority)
+        if limit is not None and in_use >= limit:
+            return False
+        # Seules les attentes de rang interactif puisent dans la réserve
+        return rank == 0 or len(self.free_accounts) > self._reserved()
+
+    def _next_waiter(self) -> dict | None:
+        """Attente à servir maintenant : la mieux classée parmi les éligibles"""
+        now = time.monotonic()
+        ranked = sorted(
+            (self._effective_rank(waiter, now), waiter["arrival"], waiter)
+            for waiter in self.waiters
+        )
+        for rank, _, waiter in ranked:
+            if self._is_eligible(waiter["priority"], rank):
+                return waiter
+        return None
+
+    def _lease(self, priority: str) -> dict:
+        account = self.free_accounts.popleft()
+        self.leases[account["id"]] = priority
+        return account
+
+    def get_account(self, timeout=30, priority: str = None) -> dict:
+        """
+        Récupère un compte disponible du pool. Les attentes sont servies par
+        classe de priorité (celle du contexte par défaut, voir lease_priority),
+        puis par ordre d'arrivée ; les comptes réservés ne vont qu'aux
+        requêtes interactives et ODK_POOL_CLASS_LIMITS plafonne chaque classe.
+        """
         thread_id = threading.current_thread().ident
-        try:
-            account = self.account_queue.get(timeout=timeout)
-            logger.debug(f"ODK account {account['id']} assigned to thread {thread_id}")
-            return account
-        except Empty:
-            logger.error(
-                f"No ODK account available after {timeout} seconds (thread: {thread_id})"
-            )
-            raise TimeoutError(f"No ODK account available after {timeout} seconds")
-        except Exception as e:
-            logger.error(f"Error retrieving account: {e} (thread: {thread_id})")
-            raise Exception(f"Error retrieving ODK account: {e}")
+        priority = priority or get_lease_priority()
+        started = time.monotonic()
+        deadline = started + timeout
+        waiter = {
+            "priority": priority,
+            "since": started,
+            "arrival": next(self._arrivals),
+        }
+        # Sans notification, l'attente est réévaluée à ce rythme pour le vieillissement
+        tick = max(getattr(settings, "ODK_POOL_AGING_SECONDS", 10) / 4, 0.05)
+        with self.condition:
+            self.waiters.append(waiter)
+            try:
+                while self._next_waiter() is not waiter:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        waited = time.monotonic() - started
+                        metrics.observe_pool_wait(waited, "timeout")
+                        record_pool_wait(waited)
+                        logger.error(
+                            f"No ODK account available after {timeout} seconds "
+                            f"({priority}, thread: {thread_id})"
+                        )
+                        raise TimeoutError(
+                            f"No ODK account available after {timeout} seconds"
+                        )
+                    self.condition.wait(min(remaining, tick))
+                account = self._lease(priority)
+            finally:
+                self.waiters.remove(waiter)
+                # Un autre emprunt est peut-être servi à présent
+                self.condition.notify_all()
+
+        waited = time.monotonic() - started
+        metrics.observe_pool_wait(waited, "acquired")
+        record_pool_wait(waited)
+        logger.debug(
+            f"ODK account {account['id']} assigned to thread {thread_id} ({priority})"
+        )
+        return account
+
+    def get_account_nowait(self, priority: str = None) -> dict | None:
+        """
+        Récupère un compte libre sans attendre, None si tous sont utilisés,
+        réservés à une autre classe ou promis à des emprunts en attente
+        """
+        priority = priority or get_lease_priority()
+        rank = PRIORITY_RANKS[priority]
+        with self.condition:
+            now = time.monotonic()
+            if any(self._effective_rank(w, now) <= rank for w in self.waiters):
+                return None
+            if not self._is_eligible(priority, rank):
+                return None
+            return self._lease(priority)
 
     def return_account(self, account) -> None:
         """Remet un compte dans le pool"""
         thread_id = threading.current_thread().ident
-        self.account_queue.put(account)
+        with self.condition:
+            self.leases.pop(account["id"], None)
+            self.free_accounts.append(account)
+            self.condition.notify_all()
         logger.debug(
             f"ODK account {account['id']} returned to the pool by thread {thread_id}"
         )
@@ -107,7 +270,7 @@ class ODKAccountPool:
             ):
                 logger.debug(f"Resetting session for account {account_id}")
                 self.account_sessions[account_id] = {
-                    "session": requests.Session(),
+                    "session": build_odk_session(),
                     "token": None,
                     "expires_at": None,
                 }
@@ -119,3 +282,22 @@ class ODKAccountPool:
                 session_info["session"].close()
                 logger.debug(f"Session closed for account {account_id}")
         self.account_sessions.clear()
+
+
+def lease_accounts(count: int) -> list:
+    """
+    Un compte, en l'attendant si besoin (dans le budget de temps de la
+    requête), puis autant de comptes libres que possible jusqu'à `count` :
+    un emprunt groupé ne retient jamais le pool longtemps
+    """
+    pool = ODKAccountPool()
+    timeout = 30
+    if (remaining := get_remaining()) is not None:
+        timeout = max(min(timeout, remaining), 0)
+    accounts = [pool.get_account(timeout)]
+    while len(accounts) < count:
+        account = pool.get_account_nowait()
+        if account is None:
+            break
+        accounts.append(account)
+    return accounts
@@ -75,7 +75,7 @@ class ODKProjectService(BaseODKService):
     def get_projects(self) -> List[Dict]:
         """Récupère tous les projets depuis ODK Central"""
         try:
-            projects = self._make_request("GET", "projects")
+            projects = self._make_request("GET", "projects", hedge=True)
             return projects
         except Exception as e:
             self._log_action(
@@ -97,7 +97,7 @@ class ODKProjectService(BaseODKService):
     def get_project(self, project_id: int) -> Dict:
         """Récupère un projet spécifique depuis ODK Central"""
         try:
-            project = self._make_request("GET", f"projects/{project_id}")
+            project = self._make_request("GET", f"projects/{project_id}", hedge=True)
 
             return project
         except Exception as e:
@@ -2,6 +2,7 @@ import logging
 from typing import Dict, List, Optional
 from .baseService import BaseODKService
 from .exceptions import ODKValidationError
+from core_apps.odk.cache import ODKCacheManager
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,7 @@ class ODKPublicAccessService(BaseODKService):
         link_data = self._make_request(
             "POST", f"projects/{project_id}/forms/{form_id}/public-links", json=payload
         )
+        ODKCacheManager.bump_version(f"project_{project_id}")
 
         self._enhance_link_with_url(link_data, project_id, form_id)
 
@@ -66,9 +68,16 @@ class ODKPublicAccessService(BaseODKService):
         return link_data
 
     def list_public_links(
-        self, project_id: int, form_id: str, extended: bool = False
+        self,
+        project_id: int,
+        form_id: str,
+        extended: bool = False,
+        enketo_id: Optional[str] = None,
     ) -> List[Dict]:
-        """List all Public Access Links for a form"""
+        """
+        List all Public Access Links for a form. Pass the form's enketo_id when
+        already known to save the form lookup.
+        """
         headers = {self.EXTENDED_METADATA_HEADER: "true"} if extended else {}
         links_data = self._make_request(
             "GET",
@@ -77,7 +86,7 @@ class ODKPublicAccessService(BaseODKService):
         )
 
         if links_data:
-            if enketo_id := self._get_enketo_id(project_id, form_id):
+            if enketo_id := enketo_id or self._get_enketo_id(project_id, form_id):
                 for link in links_data:
                     if token := link.get("token"):
                         link["public_url"] = self._build_public_url(enketo_id, token)
@@ -0,0 +1,68 @@
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+
+from core_apps.common.ratelimit import Bucket, block_buckets, take_tokens
+from core_apps.odk import metrics
+
+from .deadline import get_remaining
+from .exceptions import ODKRateLimitedError
+
+logger = logging.getLogger(__name__)
+
+
+class ODKRateLimiter:
+    """
+    Outbound rate limit toward one ODK Central server, shared by all workers:
+    a token bucket for the server and one per pooled account. Requests over
+    the rate wait their turn (within the request time budget) instead of
+    hitting ODK Central, and a 429 pauses the buckets for its Retry-After.
+    """
+
+    CACHE_PREFIX = "odk_ratelimit_"
+
+    def __init__(self, base_url: str, account_id):
+        url_digest = hashlib.sha1(base_url.encode("utf-8")).hexdigest()[:12]
+        prefix = f"{self.CACHE_PREFIX}{url_digest}"
+        self.server_bucket = Bucket(
+            f"{prefix}_server",
+            getattr(settings, "ODK_RATE_LIMIT_SERVER_RATE", 20),
+            getattr(settings, "ODK_RATE_LIMIT_SERVER_BURST", 40),
+        )
+        self.account_bucket = Bucket(
+            f"{prefix}_account_{account_id}",
+            getattr(settings, "ODK_RATE_LIMIT_ACCOUNT_RATE", 10),
+            getattr(settings, "ODK_RATE_LIMIT_ACCOUNT_BURST", 20),
+        )
+        self.buckets = [self.server_bucket, self.account_bucket]
+
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(settings, "ODK_RATE_LIMIT_ENABLED", False)
+
+    def acquire(self, method: str, endpoint: str) -> None:
+        """
+        Wait for a slot to send a request. Raises ODKRateLimitedError when the
+        wait would exceed ODK_RATE_LIMIT_MAX_WAIT or the request time budget.
+        """
+        max_wait = getattr(settings, "ODK_RATE_LIMIT_MAX_WAIT", 10)
+        if (remaining := get_remaining()) is not None:
+            max_wait = min(max_wait, remaining)
+        granted, wait = take_tokens(self.buckets, 1, max(max_wait, 0))
+        if not granted:
+            metrics.count_response(method, endpoint, "rate_limited")
+            raise ODKRateLimitedError(
+                f"Too many requests to ODK Central, {method} {endpoint} "
+                f"would wait {wait:.1f}s.",
+                retry_after=max(1, round(wait)),
+            )
+        if wait > 0:
+            logger.debug(f"Rate limit: {method} {endpoint} queued for {wait:.2f}s")
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """ODK Central answered 429: stop sending requests for `seconds`"""
+        logger.warning(f"ODK Central asked to slow down, pausing for {seconds:.1f}s")
+        block_buckets(self.buckets, seconds)
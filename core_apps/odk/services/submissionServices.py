@@ -1,4 +1,8 @@
-from typing import Dict, List
+from typing import Dict, Iterator, List
+
+from django.conf import settings
+
+from core_apps.odk.schema import dataframe_to_bytes, read_submissions_csv
 
 from .baseService import BaseODKService
 from .exceptions import ODKValidationError
@@ -57,25 +61,35 @@ class ODKSubmissionService(BaseODKService):
             raise
 
     def export_submissions(
-        self, project_id: int, form_id: str, to: str = "csv"
+        self,
+        project_id: int,
+        form_id: str,
+        to: str = "csv",
+        schema: Dict = None,
+        since: str = None,
+        repeats: Dict = None,
     ) -> bytes:
-        """Exporte les soumissions d'un formulaire en CSV ou XLSX"""
+        """
+        Exporte les soumissions d'un formulaire en CSV, XLSX ou Parquet. Pour le
+        XLSX et le Parquet, le schéma du formulaire (voir core_apps.odk.schema)
+        fixe les types des colonnes. Avec `since`, seules les soumissions reçues
+        à partir de cette date (incluse) sont exportées. Les tables de groupes
+        répétés aplaties (`repeats`) sont ajoutées au XLSX, une feuille chacune.
+        """
         try:
+            params = (
+                {"$filter": f"__system/submissionDate ge {since}"} if since else None
+            )
             result = self._make_request(
                 "POST",
                 f"projects/{project_id}/forms/{form_id}/submissions.csv",
                 return_json=False,
+                params=params,
             )
-            if to == "xlsx":
-                from io import BytesIO, StringIO
-
-                import pandas as pd
-
-                df = pd.read_csv(StringIO(result.decode("utf-8")))
-                output = BytesIO()
-                with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-                    df.to_excel(writer, index=False, sheet_name="Submissions")
-                return output.getvalue()
+            if to in ("xlsx", "parquet"):
+                return dataframe_to_bytes(
+                    read_submissions_csv(result, schema), to, repeats=repeats
+                )
 
             return result
 
@@ -119,3 +133,50 @@ class ODKSubmissionService(BaseODKService):
                 },
                 success=False,
             )
+
+    def iter_submissions_data(
+        self,
+        project_id: int,
+        form_id: str,
+        since: str = None,
+        page_size: int = None,
+        table: str = "Submissions",
+    ) -> Iterator[List[Dict]]:
+        """
+        Parcourt le flux OData des soumissions page par page, par date de
+        soumission croissante, en suivant @odata.nextLink. Avec `since`, seules
+        les soumissions reçues à partir de cette date (incluse) sont lues.
+        `table` désigne une table de répétition (ex. "Submissions.household"),
+        lue dans l'ordre d'ODK Central et sans filtre de date.
+        """
+        page_size = page_size or getattr(settings, "ODK_ANALYTICS_PAGE_SIZE", 5000)
+        endpoint = f"projects/{project_id}/forms/{form_id}.svc/{table}"
+        params = {"$top": page_size}
+        if table == "Submissions":
+            params["$orderby"] = "__system/submissionDate asc"
+            if since:
+                params["$filter"] = f"__system/submissionDate ge {since}"
+        try:
+            while endpoint:
+                data = self._make_request("GET", endpoint, params=params)
+                yield data.get("value", [])
+                next_link = data.get("@odata.nextLink")
+                # Lien absolu vers ODK Central, paramètres de pagination inclus
+                endpoint = next_link.split("/v1/", 1)[1] if next_link else None
+                params = None
+        except ODKValidationError:
+            raise
+        except Exception as e:
+            self._log_action(
+                "iter_submissions_data",
+                "submission",
+                f"{project_id}/{form_id}",
+                {
+                    "error": str(e),
+                    "odk_account": (
+                        self.current_account["id"] if self.current_account else None
+                    ),
+                },
+                success=False,
+            )
+            raise
@@ -0,0 +1,83 @@
+import logging
+import socket
+
+from django.conf import settings
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+
+from core_apps.odk.utils import get_ssl_verify
+
+logger = logging.getLogger(__name__)
+
+
+class KeepAliveHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections use TCP keep-alive"""
+
+    def __init__(self, *args, socket_options=None, **kwargs):
+        self.socket_options = socket_options
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options is not None:
+            kwargs["socket_options"] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def get_keepalive_socket_options() -> list:
+    """Socket options enabling TCP keep-alive, with probe timings where supported"""
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    probes = (
+        ("TCP_KEEPIDLE", getattr(settings, "ODK_TCP_KEEPIDLE", 60)),
+        ("TCP_KEEPINTVL", getattr(settings, "ODK_TCP_KEEPINTVL", 15)),
+        ("TCP_KEEPCNT", getattr(settings, "ODK_TCP_KEEPCNT", 4)),
+    )
+    for name, value in probes:
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+def get_request_timeout() -> tuple:
+    """Default (connect, read) timeout for ODK Central requests"""
+    return (
+        getattr(settings, "ODK_CONNECT_TIMEOUT", 5),
+        getattr(settings, "ODK_READ_TIMEOUT", 120),
+    )
+
+
+def build_odk_session() -> requests.Session:
+    """
+    Create the HTTP session used by one pooled ODK account: sized connection
+    pool, TCP keep-alive and urllib3-level retries of failed connections.
+
+    Only connection failures are retried here, each attempt bounded by the
+    connect timeout: the request was never sent, so any method can be
+    replayed. Read errors and error statuses are left to the retry loop of
+    BaseODKService, which knows the request deadline and feeds the circuit
+    breaker and the retry metrics.
+    """
+    retries = Retry(
+        total=getattr(settings, "ODK_TRANSPORT_RETRIES", 2),
+        connect=getattr(settings, "ODK_TRANSPORT_RETRIES", 2),
+        read=0,
+        other=0,
+        status=0,
+        backoff_factor=getattr(settings, "ODK_TRANSPORT_BACKOFF", 0.2),
+        raise_on_status=False,
+    )
+    adapter = KeepAliveHTTPAdapter(
+        pool_connections=getattr(settings, "ODK_POOL_CONNECTIONS", 4),
+        pool_maxsize=getattr(settings, "ODK_POOL_MAXSIZE", 10),
+        max_retries=retries,
+        socket_options=get_keepalive_socket_options(),
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.verify = get_ssl_verify()
+    return session
@@ -0,0 +1,316 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core_apps.odk.schema import read_submissions_csv
+from core_apps.odk.services import ODKCentralService
+from core_apps.odk.services.deadline import get_remaining, odk_deadline
+from core_apps.odk.services.exceptions import ODKServiceUnavailableError
+from core_apps.odk.services.hedging import run_in_worker_thread
+from core_apps.odk.services.poolServices import BACKGROUND, lease_priority
+
+logger = logging.getLogger(__name__)
+
+# Bump when the snapshot layout changes, so that snapshots are rebuilt
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+# Interval between attempts to take the refresh lock of a form
+LOCK_POLL_INTERVAL = 0.1
+
+_executor = None
+_executor_lock = threading.Lock()
+# Forms whose rebuild is queued or running in this process
+_rebuilding = set()
+
+
+def snapshots_enabled() -> bool:
+    return getattr(settings, "ODK_SNAPSHOTS_ENABLED", False)
+
+
+class SubmissionSnapshot:
+    """
+    Submissions of one form materialized as zstd-compressed Parquet files on
+    local disk. Each refresh appends a part with the submissions received since
+    the last one (the CSV export filtered on __system/submissionDate); parts
+    are compacted when they pile up. manifest.json is replaced atomically, so
+    readers never see a half-written snapshot.
+    """
+
+    def __init__(self, project_id: int, form_id: str, root: str | Path = None):
+        self.project_id = project_id
+        self.form_id = form_id
+        root = Path(root or getattr(settings, "ODK_SNAPSHOT_DIR"))
+        self.directory = root / str(project_id) / form_id
+
+    # Manifest ---------------------------------------------------------------
+
+    def load_manifest(self) -> dict | None:
+        try:
+            manifest = json.loads((self.directory / MANIFEST).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        if manifest.get("format") != SNAPSHOT_FORMAT_VERSION:
+            return None
+        return manifest
+
+    def _save_manifest(self, manifest: dict) -> None:
+        temporary = self.directory / f".{MANIFEST}.{uuid.uuid4().hex}"
+        temporary.write_text(json.dumps(manifest))
+        os.replace(temporary, self.directory / MANIFEST)
+
+    @staticmethod
+    def _new_manifest() -> dict:
+        return {
+            "format": SNAPSHOT_FORMAT_VERSION,
+            "generation": 0,
+            "rows": 0,
+            "columns": [],
+            "parts": [],
+            "cursor": None,
+            "cursor_ids": [],
+            "refreshed_at": None,
+            "full_refresh_at": timezone.now().isoformat(),
+        }
+
+    @staticmethod
+    def is_fresh(manifest: dict | None) -> bool:
+        """True when refreshed less than ODK_SNAPSHOT_MAX_AGE seconds ago"""
+        if not manifest or not manifest["refreshed_at"]:
+            return False
+        age = timezone.now() - parse_datetime(manifest["refreshed_at"])
+        return age.total_seconds() < getattr(settings, "ODK_SNAPSHOT_MAX_AGE", 60)
+
+    @staticmethod
+    def _needs_full_refresh(manifest: dict) -> bool:
+        # Review state changes, edits and deletions do not move the cursor
+        age = timezone.now() - parse_datetime(manifest["full_refresh_at"])
+        return age.total_seconds() > getattr(
+            settings, "ODK_SNAPSHOT_FULL_REFRESH", 3600
+        )
+
+    @contextmanager
+    def _lock(self, wait: float):
+        """
+        Serialize refreshes of this form across the processes of the host.
+        Yields False if the lock is still held by another refresh after `wait`
+        seconds, bounded by the request time budget.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if (remaining := get_remaining()) is not None:
+            wait = min(wait, remaining)
+        give_up_at = time.monotonic() + wait
+        with open(self.directory / ".lock", "w") as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= give_up_at:
+                        yield False
+                        return
+                    time.sleep(LOCK_POLL_INTERVAL)
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Refresh ----------------------------------------------------------------
+
+    def refresh(
+        self, odk_service, schema: dict = None, full: bool = False, background=False
+    ) -> dict:
+        """
+        Bring the snapshot up to date with ODK Central and return its manifest.
+
+        While another process refreshes the form, requests are served the
+        previous manifest, or wait for the first one within their time budget.
+        Requests only append the new submissions: due full rebuilds are left
+        to a background thread (schedule_rebuild).
+        """
+        previous = self.load_manifest()
+        wait = getattr(settings, "ODK_SNAPSHOT_LOCK_TIMEOUT", 30)
+        if previous is not None and not background:
+            wait = 0
+        with self._lock(wait) as locked:
+            if not locked:
+                if previous is not None:
+                    return previous
+                raise ODKServiceUnavailableError(
+                    f"The submissions snapshot of form {self.form_id} is being "
+                    "built, try again later.",
+                    retry_after=5,
+                )
+            manifest = self.load_manifest()
+            # Another process may have refreshed it while we waited for the lock
+            if not full and self.is_fresh(manifest):
+                return manifest
+            rebuild = manifest is None or full
+            if manifest is not None and self._needs_full_refresh(manifest):
+                if background:
+                    rebuild = True
+                elif not full:
+                    schedule_rebuild(self.project_id, self.form_id, schema)
+            previous_parts = manifest["parts"] if manifest and rebuild else []
+            if rebuild:
+                generation = manifest["generation"] + 1 if manifest else 0
+                manifest = self._new_manifest()
+                manifest["generation"] = generation
+
+            data = odk_service.export_submissions(
+                self.project_id, self.form_id, since=manifest["cursor"]
+            )
+            df = read_submissions_csv(data, schema)
+            if manifest["cursor_ids"]:
+                # Submissions at the previous cursor date are already stored
+                df = df[~df["KEY"].isin(manifest["cursor_ids"])]
+            if not df.empty:
+                self._append(manifest, df)
+            if len(manifest["parts"]) > getattr(settings, "ODK_SNAPSHOT_MAX_PARTS", 20):
+                self._compact(manifest)
+
+            manifest["refreshed_at"] = timezone.now().isoformat()
+            obsolete = previous_parts + manifest.pop("compacted", [])
+            self._save_manifest(manifest)
+            for part in obsolete:
+                (self.directory / part).unlink(missing_ok=True)
+            return manifest
+
+    def _append(self, manifest: dict, df) -> None:
+        part = f"part-{uuid.uuid4().hex}.parquet"
+        df.to_parquet(
+            self.directory / part, engine="pyarrow", compression="zstd", index=False
+        )
+        manifest["parts"].append(part)
+        manifest["rows"] += len(df)
+        manifest["generation"] += 1
+        manifest["columns"] += [c for c in df.columns if c not in manifest["columns"]]
+
+        dates = df["SubmissionDate"].astype("string")
+        cursor = dates.max()
+        keys = df.loc[dates == cursor, "KEY"].tolist()
+        if cursor == manifest["cursor"]:
+            manifest["cursor_ids"] += keys
+        elif manifest["cursor"] is None or cursor > manifest["cursor"]:
+            manifest["cursor"], manifest["cursor_ids"] = cursor, keys
+
+    def _compact(self, manifest: dict) -> None:
+        parts = manifest["parts"]
+        df = self._read_parts(parts, manifest["columns"])
+        part = f"part-{uuid.uuid4().hex}.parquet"
+        df.to_parquet(
+            self.directory / part, engine="pyarrow", compression="zstd", index=False
+        )
+        manifest["parts"] = [part]
+        # Removed once the new manifest is in place
+        manifest.setdefault("compacted", []).extend(parts)
+        logger.info(f"Compacted {len(parts)} snapshot parts of form {self.form_id}")
+
+    # Reads ------------------------------------------------------------------
+
+    def _read_parts(self, parts: list, columns: list):
+        import pandas as pd
+        import pyarrow.parquet as pq
+
+        frames = []
+        for part in parts:
+            path = self.directory / part
+            available = pq.read_schema(path).names
+            # Parts written before a form version added columns lack them
+            wanted = [c for c in columns if c in available]
+            table = pq.read_table(path, columns=wanted, memory_map=True)
+            frames.append(table.to_pandas())
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True).reindex(columns=columns)
+
+    def read(self, columns: list = None, manifest: dict = None):
+        """
+        Submissions as a DataFrame, memory-mapping the Parquet parts and reading
+        only the given columns (all of them, in CSV order, by default).
+        """
+        for attempt in range(2):
+            manifest = manifest or self.load_manifest()
+            if manifest is None:
+                raise FileNotFoundError(f"No snapshot for form {self.form_id}")
+            wanted = [
+                c for c in columns or manifest["columns"] if c in manifest["columns"]
+            ]
+            try:
+                return self._read_parts(manifest["parts"], wanted)
+            except FileNotFoundError:
+                if attempt:
+                    raise
+                # Parts replaced by a concurrent rebuild or compaction
+                manifest = None
+
+
+def get_submissions_snapshot(
+    odk_service,
+    project_id: int,
+    form_id: str,
+    schema: dict = None,
+    full=False,
+    background=False,
+) -> tuple:
+    """Snapshot of a form refreshed if needed, with its manifest"""
+    snapshot = SubmissionSnapshot(project_id, form_id)
+    manifest = snapshot.load_manifest()
+    if full or not SubmissionSnapshot.is_fresh(manifest):
+        manifest = snapshot.refresh(
+            odk_service, schema=schema, full=full, background=background
+        )
+    return snapshot, manifest
+
+
+def get_rebuild_executor() -> ThreadPoolExecutor:
+    """Thread running snapshot rebuilds, created lazily in each process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="odk-snapshot"
+            )
+        return _executor
+
+
+def schedule_rebuild(project_id: int, form_id: str, schema: dict = None) -> None:
+    """
+    Rebuild a snapshot from the full CSV export in a thread of this process:
+    snapshots live on the local disk, so the rebuild must run on this host.
+    """
+    with _executor_lock:
+        if (project_id, form_id) in _rebuilding:
+            return
+        _rebuilding.add((project_id, form_id))
+    get_rebuild_executor().submit(
+        run_in_worker_thread, _rebuild, project_id, form_id, schema
+    )
+
+
+def _rebuild(project_id: int, form_id: str, schema: dict) -> None:
+    try:
+        with (
+            odk_deadline(getattr(settings, "ODK_SNAPSHOT_REBUILD_DEADLINE", 600)),
+            lease_priority(BACKGROUND),
+        ):
+            with ODKCentralService(None) as odk_service:
+                SubmissionSnapshot(project_id, form_id).refresh(
+                    odk_service, schema=schema, full=True, background=True
+                )
+        logger.info(f"Snapshot of form {form_id} rebuilt")
+    except Exception as e:
+        logger.warning(f"Unable to rebuild the snapshot of form {form_id}: {e}")
+    finally:
+        with _executor_lock:
+            _rebuilding.discard((project_id, form_id))
@@ -1,17 +1,134 @@
-import xml.etree.ElementTree as xEt
-from io import BytesIO
+from django.conf import settings
+from django.core.cache import cache
 
 from celery import shared_task
-from pyxform.xls2xform import convert
+
+from core_apps.odk.analytics import run_analytics_refresh
+from core_apps.odk.audits import poll_audits
+from core_apps.odk.geo import run_geo_refresh
+from core_apps.odk.services import ODKCentralService
+from core_apps.odk.services.deadline import odk_deadline
+from core_apps.odk.services.poolServices import BACKGROUND, lease_priority
+from core_apps.odk.warming import decay_hits, warm_caches, warming_enabled
+from core_apps.odk.xlsform import convert_xlsform
+
+AUDIT_POLL_LOCK = "odk_audit_poll_lock"
+AUDIT_POLL_LOCK_TIMEOUT = 120
+WARMING_LOCK = "odk_warming_lock"
+WARMING_LOCK_TIMEOUT = 300
+# Full analytics recomputations and geo rebuilds read the whole OData feed
+ANALYTICS_REFRESH_TIME_LIMIT = 600
+GEO_REFRESH_TIME_LIMIT = 600
 
 
 @shared_task
 def convert_excel_to_xform_task(file_content, file_name):
+    """
+    Convert an XLSForm and return its digest: the XForm itself stays in the
+    cache (see core_apps.odk.xlsform.get_cached_xform) instead of going
+    through the result backend.
+    """
     try:
-        warnings = []
-        result = convert(xlsform=BytesIO(file_content), warnings=warnings)
-        xform_xml = result.xform
-        xEt.fromstring(xform_xml)
-        return xform_xml
+        # Prefork workers are daemonic and cannot start a process pool
+        result = convert_xlsform(file_content, file_name, use_pool=False)
     except Exception as e:
         raise Exception(f"Failed to convert Excel to XForm: {str(e)}")
+    return {
+        "digest": result["digest"],
+        "form_id": result["form_id"],
+        "version": result["version"],
+        "warnings": result["warnings"],
+    }
+
+
+@shared_task(ignore_result=True)
+def poll_odk_audits():
+    """
+    Tail ODK Central's audit log and invalidate the caches of the projects
+    and forms changed outside of this API (ODK Collect, the Central UI...).
+    Scheduled by CELERY_BEAT_SCHEDULE when ODK_AUDIT_POLL_ENABLED.
+    """
+    if not getattr(settings, "ODK_AUDIT_POLL_ENABLED", False):
+        return None
+    # Beat may fire again while a slow poll is still running
+    if not cache.add(AUDIT_POLL_LOCK, 1, AUDIT_POLL_LOCK_TIMEOUT):
+        return None
+    try:
+        with (
+            odk_deadline(getattr(settings, "ODK_AUDIT_POLL_DEADLINE", 30)),
+            lease_priority(BACKGROUND),
+        ):
+            with ODKCentralService(None) as odk_service:
+                result = poll_audits(odk_service)
+    finally:
+        cache.delete(AUDIT_POLL_LOCK)
+    if result["scopes"] and warming_enabled():
+        # Reload the hot payloads just invalidated before users ask for them
+        warm_odk_caches.delay(scopes=result["scopes"])
+    return result
+
+
+@shared_task(ignore_result=True)
+def warm_odk_caches(scopes=None):
+    """
+    Refresh the cached payloads of the most read projects, forms and
+    submission lists (see core_apps.odk.warming). Routed to the low priority
+    ODK_WARMING_QUEUE by CELERY_TASK_ROUTES.
+    """
+    if not warming_enabled():
+        return None
+    if not cache.add(WARMING_LOCK, 1, WARMING_LOCK_TIMEOUT):
+        return None
+    try:
+        with (
+            odk_deadline(getattr(settings, "ODK_WARMING_DEADLINE", 120)),
+            lease_priority(BACKGROUND),
+        ):
+            return warm_caches(scopes=scopes)
+    finally:
+        cache.delete(WARMING_LOCK)
+
+
+@shared_task(
+    ignore_result=True,
+    soft_time_limit=ANALYTICS_REFRESH_TIME_LIMIT - 60,
+    time_limit=ANALYTICS_REFRESH_TIME_LIMIT,
+)
+def refresh_form_analytics(project_id, form_id, full=True):
+    """
+    Recompute the submission analytics of a form from every submission, or
+    only its repeat statistics: queued by core_apps.odk.analytics when a
+    request finds them due, the previous aggregates being served meanwhile.
+    """
+    with (
+        odk_deadline(getattr(settings, "ODK_ANALYTICS_REFRESH_DEADLINE", 480)),
+        lease_priority(BACKGROUND),
+    ):
+        with ODKCentralService(None) as odk_service:
+            run_analytics_refresh(odk_service, project_id, form_id, full)
+
+
+@shared_task(
+    ignore_result=True,
+    soft_time_limit=GEO_REFRESH_TIME_LIMIT - 60,
+    time_limit=GEO_REFRESH_TIME_LIMIT,
+)
+def refresh_geo_index(project_id, form_id):
+    """
+    Rebuild the spatial index of a form from every submission: queued by
+    core_apps.odk.geo when a request finds a full refresh requested or due,
+    the previous index being served meanwhile.
+    """
+    with (
+        odk_deadline(getattr(settings, "ODK_GEO_REFRESH_DEADLINE", 480)),
+        lease_priority(BACKGROUND),
+    ):
+        with ODKCentralService(None) as odk_service:
+            run_geo_refresh(odk_service, project_id, form_id)
+
+
+@shared_task(ignore_result=True)
+def decay_odk_warming_hits():
+    """Age the access counters used to pick the payloads to keep warm"""
+    if warming_enabled():
+        decay_hits()
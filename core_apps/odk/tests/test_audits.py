@@ -0,0 +1,112 @@
+from datetime import datetime
+from datetime import timezone as dt_timezone
+from unittest import mock
+
+from django.test import TestCase
+
+from core_apps.odk.audits import CURSOR_NAME, _fingerprint, poll_audits
+from core_apps.odk.models import ODKAuditCursor
+
+
+def make_event(logged_at: str, action: str, project_id=1, form_id="survey"):
+    return {
+        "loggedAt": logged_at,
+        "action": action,
+        "acteeId": f"{project_id}-{form_id}",
+        "actorId": 5,
+        "details": None,
+        "actee": {"projectId": project_id, "xmlFormId": form_id},
+    }
+
+
+class FakeAuditService:
+    """The audit log of ODK Central, newest events first"""
+
+    def __init__(self, events: list):
+        self.events = events
+        self.starts = []
+
+    def get_audits(self, start=None, limit=None, offset=0):
+        return self.events[offset : offset + limit if limit else None]
+
+    def iter_audits(self, start=None, page_size=None):
+        self.starts.append(start)
+        # The start bound is inclusive
+        yield from (event for event in self.events if event["loggedAt"] >= start)
+
+
+class PollAuditsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("core_apps.odk.audits.ODKCacheManager.bump_version")
+        self.bump_version = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.old_events = [
+            make_event("2026-01-02T10:00:00.000Z", "submission.create"),
+            make_event("2026-01-02T10:00:00.000Z", "form.update", form_id="other"),
+            make_event("2026-01-01T09:00:00.000Z", "form.create"),
+        ]
+
+    def get_cursor(self) -> ODKAuditCursor:
+        return ODKAuditCursor.objects.get(name=CURSOR_NAME)
+
+    def test_first_poll_seeds_the_cursor_from_the_newest_event(self):
+        result = poll_audits(FakeAuditService(self.old_events))
+        self.assertEqual(result, {"events": 0, "scopes": []})
+        cursor = self.get_cursor()
+        self.assertEqual(
+            cursor.logged_at, datetime(2026, 1, 2, 10, tzinfo=dt_timezone.utc)
+        )
+        self.assertEqual(
+            sorted(cursor.seen), sorted(_fingerprint(e) for e in self.old_events[:2])
+        )
+        self.bump_version.assert_not_called()
+
+    def test_first_poll_on_an_empty_log_starts_at_the_epoch(self):
+        poll_audits(FakeAuditService([]))
+        self.assertEqual(
+            self.get_cursor().logged_at, datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+        )
+
+    def test_events_are_applied_once(self):
+        service = FakeAuditService(self.old_events)
+        poll_audits(service)
+        new_event = make_event("2026-01-02T11:30:00.000Z", "form.update", 2, "visit")
+        service.events = [new_event] + self.old_events
+
+        result = poll_audits(service)
+        self.assertEqual(service.starts, ["2026-01-02T10:00:00.000Z"])
+        self.assertEqual(result, {"events": 1, "scopes": ["form_2_visit", "project_2"]})
+        self.bump_version.assert_has_calls(
+            [mock.call("form_2_visit"), mock.call("project_2")]
+        )
+        cursor = self.get_cursor()
+        self.assertEqual(
+            cursor.logged_at, datetime(2026, 1, 2, 11, 30, tzinfo=dt_timezone.utc)
+        )
+        self.assertEqual(cursor.seen, [_fingerprint(new_event)])
+
+        self.bump_version.reset_mock()
+        self.assertEqual(poll_audits(service), {"events": 0, "scopes": []})
+        self.bump_version.assert_not_called()
+
+    def test_events_repeated_across_pages_count_once(self):
+        service = FakeAuditService(self.old_events)
+        poll_audits(service)
+        new_event = make_event("2026-01-02T12:00:00.000Z", "project.update", 3, None)
+        # An event logged while paging shifts the offsets: a page repeats one
+        service.events = [new_event, new_event] + self.old_events
+
+        self.assertEqual(poll_audits(service)["events"], 1)
+        self.assertEqual(self.bump_version.call_count, 2)
+
+    def test_events_logged_at_the_cursor_instant_extend_the_seen_list(self):
+        service = FakeAuditService(self.old_events)
+        poll_audits(service)
+        late_event = make_event("2026-01-02T10:00:00.000Z", "submission.update")
+        service.events = [late_event] + self.old_events
+
+        self.assertEqual(poll_audits(service)["events"], 1)
+        cursor = self.get_cursor()
+        self.assertEqual(len(cursor.seen), 3)
+        self.assertIn(_fingerprint(late_event), cursor.seen)
+        self.assertEqual(poll_audits(service)["events"], 0)
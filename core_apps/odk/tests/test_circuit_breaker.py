@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core_apps.odk.services import circuitBreaker
+from core_apps.odk.services.circuitBreaker import ODKCircuitBreaker
+
+BASE_URL = "https://odk.example.com/v1"
+
+
+@override_settings(
+    ODK_CIRCUIT_FAILURE_THRESHOLD=3,
+    ODK_CIRCUIT_FAILURE_WINDOW=60,
+    ODK_CIRCUIT_RECOVERY_TIMEOUT=30,
+)
+class ODKCircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.now = 1_000_000.0
+        patcher = mock.patch.object(
+            circuitBreaker.time, "time", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_breaker(self, endpoint_class="projects") -> ODKCircuitBreaker:
+        # One instance per request, as _request_with_retries does
+        return ODKCircuitBreaker(BASE_URL, endpoint_class)
+
+    def open_circuit(self) -> None:
+        for _ in range(3):
+            self.make_breaker().record_failure()
+
+    def test_opens_after_the_failure_threshold(self):
+        for _ in range(2):
+            self.make_breaker().record_failure()
+        self.assertEqual(self.make_breaker().state, ODKCircuitBreaker.CLOSED)
+        self.make_breaker().record_failure()
+        breaker = self.make_breaker()
+        self.assertEqual(breaker.state, ODKCircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.retry_after(), 30)
+
+    def test_circuits_are_per_endpoint_class(self):
+        self.open_circuit()
+        self.assertTrue(self.make_breaker("submissions").allow_request())
+
+    def test_a_single_probe_is_allowed_once_half_open(self):
+        self.open_circuit()
+        self.now += 30
+        probe, other = self.make_breaker(), self.make_breaker()
+        self.assertEqual(probe.state, ODKCircuitBreaker.HALF_OPEN)
+        self.assertTrue(probe.allow_request())
+        self.assertFalse(other.allow_request())
+
+    def test_a_successful_probe_closes_the_circuit(self):
+        self.open_circuit()
+        self.now += 30
+        probe = self.make_breaker()
+        probe.allow_request()
+        probe.record_success()
+        breaker = self.make_breaker()
+        self.assertEqual(breaker.state, ODKCircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow_request())
+        # The failure count starts over
+        for _ in range(2):
+            self.make_breaker().record_failure()
+        self.assertEqual(self.make_breaker().state, ODKCircuitBreaker.CLOSED)
+
+    def test_a_failed_probe_opens_the_circuit_again(self):
+        self.open_circuit()
+        self.now += 30
+        probe = self.make_breaker()
+        probe.allow_request()
+        probe.record_failure()
+        breaker = self.make_breaker()
+        self.assertEqual(breaker.state, ODKCircuitBreaker.OPEN)
+        self.assertEqual(breaker.retry_after(), 30)
+        # The next probe comes one recovery timeout after the failed one
+        self.now += 30
+        self.assertTrue(self.make_breaker().allow_request())
+
+    def test_any_answer_from_the_server_closes_the_circuit(self):
+        self.open_circuit()
+        # e.g. a request sent before the circuit opened finally answers
+        self.make_breaker().record_success()
+        self.assertEqual(self.make_breaker().state, ODKCircuitBreaker.CLOSED)
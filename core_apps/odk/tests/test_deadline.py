@@ -0,0 +1,140 @@
+import contextvars
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
+
+import requests
+
+from core_apps.odk.middleware import ODKDeadlineMiddleware
+from core_apps.odk.services.baseService import BaseODKService
+from core_apps.odk.services.deadline import (
+    bounded_timeout,
+    check_deadline,
+    get_remaining,
+    odk_deadline,
+)
+from core_apps.odk.services.exceptions import ODKDeadlineExceededError
+from core_apps.odk.services.poolServices import ODKAccountPool
+
+
+class DeadlineTests(SimpleTestCase):
+    def test_no_budget_outside_of_a_deadline(self):
+        self.assertIsNone(get_remaining())
+        check_deadline("anything")
+        self.assertEqual(bounded_timeout((3, 30)), (3, 30))
+
+    def test_nested_deadlines_are_restored(self):
+        with odk_deadline(30):
+            with odk_deadline(5):
+                self.assertLessEqual(get_remaining(), 5)
+            self.assertGreater(get_remaining(), 5)
+        self.assertIsNone(get_remaining())
+
+    def test_timeouts_are_bounded_by_the_budget(self):
+        with odk_deadline(2):
+            connect, read = bounded_timeout((3.05, 30))
+            self.assertLessEqual(connect, 2)
+            self.assertLessEqual(read, 2)
+            self.assertEqual(bounded_timeout(0.5), 0.5)
+        with odk_deadline(-1):
+            # Never 0, which requests would read as "no timeout"
+            self.assertEqual(bounded_timeout(30), 0.001)
+
+    def test_expired_budget_raises(self):
+        with odk_deadline(0):
+            with self.assertRaises(ODKDeadlineExceededError):
+                check_deadline("listing the projects")
+
+    def test_budget_follows_copied_contexts_into_threads(self):
+        seen = []
+        with odk_deadline(10):
+            context = contextvars.copy_context()
+        thread = threading.Thread(
+            target=context.run, args=(lambda: seen.append(get_remaining()),)
+        )
+        thread.start()
+        thread.join()
+        self.assertIsNotNone(seen[0])
+        self.assertLessEqual(seen[0], 10)
+
+
+class SlowView:
+    odk_deadline = 5
+
+
+class ODKDeadlineMiddlewareTests(SimpleTestCase):
+    def run_view(self, view_class) -> list:
+        budgets = []
+        view = mock.Mock(view_class=view_class)
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            budgets.append(get_remaining())
+            return "response"
+
+        middleware = ODKDeadlineMiddleware(get_response)
+        self.assertEqual(middleware(RequestFactory().get("/")), "response")
+        self.assertIsNone(get_remaining())
+        return budgets
+
+    def test_view_budget(self):
+        (budget,) = self.run_view(SlowView)
+        self.assertTrue(4 < budget <= 5)
+
+    @override_settings(ODK_REQUEST_DEADLINE=60)
+    def test_default_budget(self):
+        (budget,) = self.run_view(None)
+        self.assertTrue(59 < budget <= 60)
+
+
+@override_settings(
+    ODK_ADMIN_EMAIL="first@example.com",
+    ODK_ADMIN_PASSWORD="first",
+    ODK_CENTRAL_URL="https://odk.example.com/v1",
+    ODK_MAX_RETRIES=5,
+    ODK_RATE_LIMIT_ENABLED=False,
+)
+class ServiceDeadlineTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(ODKAccountPool, "_instance", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = ODKAccountPool()
+
+    def make_service(self) -> BaseODKService:
+        service = BaseODKService(None).__enter__()
+        self.addCleanup(service.__exit__, None, None, None)
+        session = mock.Mock()
+        session.request.side_effect = requests.exceptions.ConnectionError("down")
+        service.current_session_data.update(
+            session=session,
+            token="token",
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        return service
+
+    def test_no_account_is_leased_once_the_budget_is_spent(self):
+        with odk_deadline(0):
+            with self.assertRaises(ODKDeadlineExceededError):
+                BaseODKService(None).__enter__()
+        self.assertEqual(self.pool.leases, {})
+
+    def test_attempts_stop_when_the_backoff_outlives_the_budget(self):
+        with odk_deadline(1.5):
+            service = self.make_service()
+            with mock.patch("core_apps.odk.services.baseService.time.sleep") as sleep:
+                with self.assertRaises(ODKDeadlineExceededError):
+                    service._make_request("GET", "projects")
+        session = service.current_session_data["session"]
+        # Backoffs of 1s then 2s: the second one does not fit in 1.5s
+        self.assertEqual(session.request.call_count, 2)
+        sleep.assert_called_once_with(1)
+        for call in session.request.call_args_list:
+            connect, read = call.kwargs["timeout"]
+            self.assertLessEqual(max(connect, read), 1.5)
@@ -0,0 +1,80 @@
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core_apps.odk.views.submissionViews import SubmissionsDataView
+
+SCHEMA = {"repeats": [{"path": "/data/household"}]}
+
+PAGES = {
+    "Submissions": [
+        [{"__id": "uuid:1", "name": "A", "loc": None}],
+        [{"__id": "uuid:2", "name": "B", "age": 4.5}],
+    ],
+    "Submissions.household": [
+        [
+            {"__Submissions-id": "uuid:1", "__id": "h1", "members": 3},
+            {"__Submissions-id": "uuid:2", "__id": "h2", "members": None},
+        ]
+    ],
+}
+
+
+class FakeODKService:
+    entered = 0
+
+    def __init__(self, user, request=None):
+        pass
+
+    def __enter__(self):
+        FakeODKService.entered += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        FakeODKService.entered -= 1
+
+    def get_form_schema(self, project_id, form_id):
+        return SCHEMA
+
+    def iter_submissions_data(self, project_id, form_id, table="Submissions"):
+        if table not in PAGES:
+            raise Exception(f"Resource not found: {table}")
+        for page in PAGES[table]:
+            # The account stays leased while the stream is read
+            assert FakeODKService.entered == 1
+            yield page
+
+
+@mock.patch("core_apps.odk.views.submissionViews.ODKCentralService", FakeODKService)
+class FlatTablesStreamTests(SimpleTestCase):
+    def stream(self) -> list:
+        request = SimpleNamespace(user=None)
+        lines = SubmissionsDataView()._stream_flat_tables(request, 1, "survey")
+        return [json.loads(line) for line in lines]
+
+    def test_one_line_per_page_of_each_table(self):
+        lines = self.stream()
+        self.assertEqual(
+            [line["table"] for line in lines],
+            ["Submissions", "Submissions", "Submissions.household"],
+        )
+        self.assertEqual(
+            lines[0]["rows"], [{"KEY": "uuid:1", "name": "A", "loc": None}]
+        )
+        self.assertEqual(
+            lines[2]["rows"],
+            [
+                {"PARENT_KEY": "uuid:1", "KEY": "h1", "members": 3.0},
+                {"PARENT_KEY": "uuid:2", "KEY": "h2", "members": None},
+            ],
+        )
+        self.assertEqual(FakeODKService.entered, 0)
+
+    def test_errors_end_the_stream(self):
+        with mock.patch.dict(SCHEMA, {"repeats": [{"path": "/data/missing"}]}):
+            lines = self.stream()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[-1]["error"], "Unable to get submissions data")
+        self.assertEqual(FakeODKService.entered, 0)
@@ -0,0 +1,231 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from core_apps.odk import geo
+from core_apps.odk.geo import (
+    _empty_index,
+    _tile_xy,
+    add_submissions,
+    clustered_tile,
+    features_in_bbox,
+    get_cached_geo_index,
+    get_geo_index,
+    run_geo_refresh,
+    split_bbox,
+)
+
+SCHEMA = {
+    "columns": [
+        {"path": "/data/loc", "type": "geopoint", "label": "Location"},
+        {"path": "/data/trip/route", "type": "geotrace", "label": "Route"},
+    ]
+}
+
+POINTS = {
+    "dakar-1": (-17.4400, 14.6900),
+    "dakar-2": (-17.4401, 14.6901),
+    "dakar-3": (-17.4402, 14.6902),
+    "paris": (2.3500, 48.8500),
+    "fiji": (179.5000, -17.8000),
+    "samoa": (-179.5000, -17.8000),
+}
+
+
+def make_row(key: str, date: str, coordinates=None, route=None) -> dict:
+    row = {"__id": key, "__system": {"submissionDate": date}}
+    if coordinates is not None:
+        row["loc"] = {"type": "Point", "coordinates": [*coordinates, 10.0]}
+    if route is not None:
+        row["trip"] = {"route": {"type": "LineString", "coordinates": route}}
+    return row
+
+
+@override_settings(ODK_GEO_TILE_GRID=64, ODK_GEO_MAX_FEATURES=100)
+class GeoIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = _empty_index(SCHEMA)
+        rows = [
+            make_row(key, f"2026-01-01T10:0{i}:00.000Z", coordinates)
+            for i, (key, coordinates) in enumerate(POINTS.items())
+        ]
+        rows.append(
+            make_row(
+                "route",
+                "2026-01-01T11:00:00.000Z",
+                route=[[-17.50, 14.60], [-17.45, 14.65]],
+            )
+        )
+        rows.append(make_row("no-location", "2026-01-01T11:00:00.000Z"))
+        add_submissions(self.index, rows[:4])
+        add_submissions(self.index, rows[4:])
+
+    def keys(self, collection: dict) -> set:
+        return {
+            feature["properties"]["key"]
+            for feature in collection["features"]
+            if "key" in feature["properties"]
+        }
+
+    def test_add_submissions_skips_rows_already_indexed(self):
+        self.assertEqual(self.index["total"], 8)
+        self.assertEqual(self.index["cursor"], "2026-01-01T11:00:00.000Z")
+        self.assertEqual(self.index["cursor_ids"], ["route", "no-location"])
+        add_submissions(
+            self.index, [make_row("no-location", "2026-01-01T11:00:00.000Z")]
+        )
+        self.assertEqual(self.index["total"], 8)
+        self.assertEqual(len(self.index["lon"]), 6)
+
+    def test_features_in_bbox(self):
+        collection = features_in_bbox(self.index, (-18.0, 14.0, -17.0, 15.0))
+        self.assertEqual(collection["total"], 3)
+        self.assertFalse(collection["truncated"])
+        self.assertEqual(
+            self.keys(collection), {"dakar-1", "dakar-2", "dakar-3", "route"}
+        )
+        feature = next(
+            f for f in collection["features"] if f["properties"]["key"] == "dakar-1"
+        )
+        self.assertEqual(feature["geometry"]["coordinates"], [-17.44, 14.69])
+        self.assertEqual(feature["properties"]["field"], "loc")
+
+    def test_features_in_bbox_truncates_to_the_limit(self):
+        collection = features_in_bbox(self.index, (-180.0, -85.0, 180.0, 85.0), 2)
+        self.assertEqual(len(collection["features"]), 2)
+        self.assertEqual(collection["total"], 6)
+        self.assertTrue(collection["truncated"])
+
+    def test_features_in_bbox_across_the_antimeridian(self):
+        self.assertEqual(
+            split_bbox((179.0, -18.0, -179.0, -17.0)),
+            [(179.0, -18.0, 180.0, -17.0), (-180.0, -18.0, -179.0, -17.0)],
+        )
+        collection = features_in_bbox(self.index, (179.0, -18.0, -179.0, -17.0))
+        self.assertEqual(self.keys(collection), {"fiji", "samoa"})
+
+    def test_world_tile_clusters_every_point(self):
+        tile = clustered_tile(self.index, 0, 0, 0)
+        self.assertEqual(tile["total"], 6)
+        points = [f for f in tile["features"] if f["geometry"]["type"] == "Point"]
+        clusters = [f for f in points if f["properties"].get("cluster")]
+        self.assertEqual([f["properties"]["point_count"] for f in clusters], [3])
+        self.assertEqual(
+            sum(f["properties"].get("point_count", 1) for f in points), tile["total"]
+        )
+        lon, lat = clusters[0]["geometry"]["coordinates"]
+        self.assertAlmostEqual(lon, -17.4401)
+        self.assertAlmostEqual(lat, 14.6901)
+        # The geotrace crosses the tile too
+        self.assertIn("route", self.keys(tile))
+
+    def test_tiles_beyond_the_index_zoom_keep_plain_points(self):
+        x, y = _tile_xy(*POINTS["paris"], 18)
+        tile = clustered_tile(self.index, 18, int(x), int(y))
+        self.assertEqual(tile["total"], 1)
+        self.assertEqual(self.keys(tile), {"paris"})
+
+        empty = clustered_tile(self.index, 18, int(x) + 1, int(y))
+        self.assertEqual((empty["total"], empty["features"]), (0, []))
+
+
+class FakeODKService:
+    """ODK Central serving ROWS, counting the accounts leased"""
+
+    rows = []
+    leases = 0
+
+    def __init__(self, django_user=None, request=None):
+        self.schema_reads = 0
+
+    def __enter__(self):
+        FakeODKService.leases += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def get_form_schema(self, project_id, form_id):
+        self.schema_reads += 1
+        return SCHEMA
+
+    def iter_submissions_data(self, project_id, form_id, since=None):
+        yield [
+            row
+            for row in self.rows
+            if since is None or row["__system"]["submissionDate"] >= since
+        ]
+
+
+@override_settings(ODK_GEO_MAX_AGE=60, ODK_GEO_FULL_REFRESH=3600)
+class GetGeoIndexTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        for patcher in (
+            mock.patch.object(geo, "_local_indexes", geo.OrderedDict()),
+            mock.patch.object(geo, "ODKCentralService", FakeODKService),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch("core_apps.odk.tasks.refresh_geo_index.delay")
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+        FakeODKService.leases = 0
+        FakeODKService.rows = [
+            make_row("paris", "2026-01-01T10:00:00.000Z", POINTS["paris"])
+        ]
+        # First indexing, in the request
+        self.index = get_geo_index(None, 1, "survey")
+        self.assertEqual(FakeODKService.leases, 1)
+
+    def age_index(self, **age) -> None:
+        index = dict(self.index)
+        refreshed_at = timezone.now() - timedelta(**age)
+        index["refreshed_at"] = index["full_refresh_at"] = refreshed_at.isoformat()
+        cache.set(geo._cache_key(1, "survey"), index)
+        cache.set(f"{geo._cache_key(1, 'survey')}_version", index["refreshed_at"])
+
+    def test_fresh_index_is_served_without_an_account(self):
+        self.assertIs(get_geo_index(None, 1, "survey"), self.index)
+        self.assertEqual(FakeODKService.leases, 1)
+
+    def test_stale_index_is_served_while_another_update_runs(self):
+        self.age_index(minutes=5)
+        cache.add(f"{geo._cache_key(1, 'survey')}_lock", 1)
+        self.assertEqual(get_geo_index(None, 1, "survey")["total"], 1)
+        self.assertEqual(FakeODKService.leases, 1)
+
+    def test_stale_index_is_updated_incrementally(self):
+        self.age_index(minutes=5)
+        FakeODKService.rows.append(
+            make_row("fiji", "2026-01-02T10:00:00.000Z", POINTS["fiji"])
+        )
+        index = get_geo_index(None, 1, "survey")
+        self.assertEqual(FakeODKService.leases, 2)
+        self.assertEqual(index["total"], 2)
+        self.assertTrue(geo.is_fresh(index))
+        self.assertIsNone(cache.get(f"{geo._cache_key(1, 'survey')}_lock"))
+        self.delay.assert_not_called()
+
+    def test_full_rebuilds_are_queued_once(self):
+        get_geo_index(None, 1, "survey", full=True)
+        self.age_index(hours=2)
+        get_geo_index(None, 1, "survey")
+        self.delay.assert_called_once_with(1, "survey")
+        # The due rebuild did not run in the request
+        self.assertEqual(get_cached_geo_index(1, "survey")["total"], 1)
+
+    def test_refresh_task_rebuilds_the_index(self):
+        get_geo_index(None, 1, "survey", full=True)
+        FakeODKService.rows = []
+        service = FakeODKService()
+        index = run_geo_refresh(service, 1, "survey")
+        self.assertEqual(service.schema_reads, 1)
+        self.assertEqual(index["total"], 0)
+        # Another full refresh can be queued
+        get_geo_index(None, 1, "survey", full=True)
+        self.assertEqual(self.delay.call_count, 2)
@@ -0,0 +1,94 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core_apps.odk.services.baseService import BaseODKService
+from core_apps.odk.services.deadline import odk_deadline
+from core_apps.odk.services.exceptions import ODKDeadlineExceededError
+from core_apps.odk.services.poolServices import ODKAccountPool
+
+
+class FakeService(BaseODKService):
+    """Answers from the account the request runs on, when its gate opens"""
+
+    gates = {}
+    answers = {}
+
+    def _request_with_retries(self, method: str, endpoint: str, **kwargs):
+        account_id = self.current_account["id"]
+        self.gates[account_id].wait(5)
+        return self.answers[account_id]
+
+
+@override_settings(
+    ODK_ADMIN_EMAIL="first@example.com",
+    ODK_ADMIN_PASSWORD="first",
+    ODK_ADMIN_EMAIL_2="second@example.com",
+    ODK_ADMIN_PASSWORD_2="second",
+    ODK_POOL_RESERVED_INTERACTIVE=0,
+    ODK_POOL_CLASS_LIMITS={},
+    ODK_HEDGING_ENABLED=True,
+    ODK_HEDGE_DELAY=0.05,
+    ODK_HEDGE_BUDGET_RATIO=1.0,
+)
+class HedgedRequestTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(ODKAccountPool, "_instance", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = ODKAccountPool()
+        FakeService.gates = {5: threading.Event(), 6: threading.Event()}
+        FakeService.answers = {5: "primary", 6: "hedge"}
+        # Never leave a request blocked in the shared executor
+        self.addCleanup(lambda: [gate.set() for gate in FakeService.gates.values()])
+
+    def wait_for_leases(self, expected: dict) -> None:
+        for _ in range(200):
+            if self.pool.leases == expected:
+                return
+            time.sleep(0.01)
+        self.assertEqual(self.pool.leases, expected)
+
+    def test_the_hedge_account_is_taken_over_when_the_hedge_wins(self):
+        FakeService.gates[6].set()
+        with FakeService(None) as service:
+            result = service._make_request("GET", "projects", hedge=True)
+            self.assertEqual(result, "hedge")
+            self.assertEqual(service.current_account["id"], 6)
+            # The primary's account stays leased while its request runs
+            self.assertEqual(set(self.pool.leases), {5, 6})
+            FakeService.gates[5].set()
+            self.wait_for_leases({6: "interactive"})
+        self.assertEqual(self.pool.leases, {})
+        self.assertEqual(len(self.pool.free_accounts), 2)
+
+    def test_the_hedge_account_is_released_when_its_request_ends(self):
+        with FakeService(None) as service:
+            threading.Timer(0.2, FakeService.gates[5].set).start()
+            result = service._make_request("GET", "projects", hedge=True)
+            self.assertEqual(result, "primary")
+            self.assertEqual(service.current_account["id"], 5)
+            self.assertEqual(set(self.pool.leases), {5, 6})
+            FakeService.gates[6].set()
+            self.wait_for_leases({5: "interactive"})
+        self.assertEqual(self.pool.leases, {})
+
+    def test_the_primary_account_is_released_after_the_deadline(self):
+        other = self.pool.get_account(1)
+        with odk_deadline(0.3):
+            with FakeService(None) as service:
+                primary_id = service.current_account["id"]
+                with self.assertRaises(ODKDeadlineExceededError):
+                    service._make_request("GET", "projects", hedge=True)
+                # No account to hedge on: the primary still holds its account
+                self.assertIsNone(service.current_account)
+                self.assertIn(primary_id, self.pool.leases)
+        FakeService.gates[primary_id].set()
+        self.wait_for_leases({other["id"]: "interactive"})
+        self.pool.return_account(other)
+        self.assertEqual(len(self.pool.free_accounts), 2)
@@ -0,0 +1,28 @@
+from django.test import SimpleTestCase, override_settings
+
+from rest_framework.test import APIRequestFactory
+
+from core_apps.odk.views.metricsViews import MetricsView
+
+
+class MetricsViewTests(SimpleTestCase):
+    def get(self, **headers):
+        request = APIRequestFactory().get("/metrics", **headers)
+        return MetricsView.as_view()(request)
+
+    @override_settings(PROMETHEUS_METRICS_TOKEN=None, DEBUG=False)
+    def test_hidden_without_a_token(self):
+        self.assertEqual(self.get().status_code, 404)
+
+    @override_settings(PROMETHEUS_METRICS_TOKEN=None, DEBUG=True)
+    def test_open_without_a_token_in_debug(self):
+        self.assertEqual(self.get().status_code, 200)
+
+    @override_settings(PROMETHEUS_METRICS_TOKEN="secret", DEBUG=False)
+    def test_requires_the_token(self):
+        self.assertEqual(self.get().status_code, 401)
+        response = self.get(HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 401)
+        response = self.get(HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE", response.content)
@@ -0,0 +1,101 @@
+import threading
+import time
+from multiprocessing.context import TimeoutError
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core_apps.odk.services.poolServices import (
+    BACKGROUND,
+    INTERACTIVE,
+    ODKAccountPool,
+    lease_accounts,
+)
+
+
+@override_settings(
+    ODK_ADMIN_EMAIL="first@example.com",
+    ODK_ADMIN_PASSWORD="first",
+    ODK_ADMIN_EMAIL_2="second@example.com",
+    ODK_ADMIN_PASSWORD_2="second",
+    ODK_POOL_RESERVED_INTERACTIVE=1,
+    ODK_POOL_AGING_SECONDS=60,
+    ODK_POOL_CLASS_LIMITS={},
+)
+class ODKAccountPoolTests(SimpleTestCase):
+    def setUp(self):
+        # A pool of two accounts for each test, not the process singleton
+        patcher = mock.patch.object(ODKAccountPool, "_instance", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = ODKAccountPool()
+
+    def get_in_thread(self, priority: str, results: list) -> threading.Thread:
+        """Start a get_account call and wait until it is queued"""
+        queued = len(self.pool.waiters) + 1
+
+        def target():
+            results.append((priority, self.pool.get_account(5, priority)))
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        while len(self.pool.waiters) < queued:
+            time.sleep(0.005)
+        return thread
+
+    def test_reserved_account_only_goes_to_interactive_requests(self):
+        self.assertIsNotNone(self.pool.get_account_nowait(BACKGROUND))
+        self.assertIsNone(self.pool.get_account_nowait(BACKGROUND))
+        self.assertIsNotNone(self.pool.get_account_nowait(INTERACTIVE))
+        self.assertIsNone(self.pool.get_account_nowait(INTERACTIVE))
+
+    @override_settings(
+        ODK_POOL_RESERVED_INTERACTIVE=0, ODK_POOL_CLASS_LIMITS={BACKGROUND: 1}
+    )
+    def test_class_limits_cap_the_leases_of_a_class(self):
+        self.assertIsNotNone(self.pool.get_account_nowait(BACKGROUND))
+        self.assertIsNone(self.pool.get_account_nowait(BACKGROUND))
+        self.assertIsNotNone(self.pool.get_account_nowait(INTERACTIVE))
+
+    @override_settings(ODK_POOL_RESERVED_INTERACTIVE=0)
+    def test_interactive_waiters_are_served_first(self):
+        first = self.pool.get_account(1, INTERACTIVE)
+        second = self.pool.get_account(1, INTERACTIVE)
+        results = []
+        background = self.get_in_thread(BACKGROUND, results)
+        interactive = self.get_in_thread(INTERACTIVE, results)
+
+        self.pool.return_account(first)
+        interactive.join(5)
+        self.assertEqual(results, [(INTERACTIVE, first)])
+        self.assertTrue(background.is_alive())
+
+        self.pool.return_account(second)
+        background.join(5)
+        self.assertEqual(results[1], (BACKGROUND, second))
+        self.assertEqual(self.pool.waiters, [])
+
+    @override_settings(ODK_POOL_AGING_SECONDS=0.2)
+    def test_aging_promotes_background_waiters_to_the_reserve(self):
+        self.pool.get_account(1, INTERACTIVE)
+        started = time.monotonic()
+        account = self.pool.get_account(2, BACKGROUND)
+        self.assertEqual(account["id"], 6)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertEqual(self.pool.leases, {5: INTERACTIVE, 6: BACKGROUND})
+
+    @override_settings(ODK_POOL_AGING_SECONDS=0)
+    def test_background_waiters_time_out_without_aging(self):
+        self.pool.get_account(1, INTERACTIVE)
+        with self.assertRaises(TimeoutError):
+            self.pool.get_account(0.2, BACKGROUND)
+        self.assertEqual(self.pool.waiters, [])
+        self.assertEqual(len(self.pool.free_accounts), 1)
+
+    @override_settings(ODK_POOL_RESERVED_INTERACTIVE=0)
+    def test_lease_accounts_takes_the_free_accounts(self):
+        accounts = lease_accounts(3)
+        self.assertEqual([account["id"] for account in accounts], [5, 6])
+        for account in accounts:
+            self.pool.return_account(account)
+        self.assertEqual(len(lease_accounts(1)), 1)
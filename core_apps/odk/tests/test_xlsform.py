@@ -0,0 +1,81 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core_apps.odk import xlsform
+from core_apps.odk.services.exceptions import ODKValidationError
+
+
+class FakePool:
+    """Conversion pool answering every submission with the same outcome"""
+
+    def __init__(self, outcome):
+        self.outcome = outcome
+        self.worker = mock.Mock()
+        self._processes = {1: self.worker}
+        self.shutdown = mock.Mock()
+
+    def submit(self, fn, *args):
+        future = Future()
+        if isinstance(self.outcome, Exception):
+            future.set_exception(self.outcome)
+        elif self.outcome == "cancelled":
+            future.cancel()
+        elif self.outcome is not None:
+            future.set_result(self.outcome)
+        return future
+
+
+@override_settings(ODK_XLSFORM_CONVERSION_TIMEOUT=0.1)
+class RunConversionTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(xlsform, "_pool", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        convert = mock.patch.object(xlsform, "_convert")
+        self.convert = convert.start()
+        self.addCleanup(convert.stop)
+
+    def use_pools(self, *pools):
+        patcher = mock.patch.object(xlsform, "ProcessPoolExecutor", side_effect=pools)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_conversion(self):
+        return xlsform._run_conversion(b"form", ".xlsx", use_pool=True)
+
+    def test_conversions_lost_with_the_pool_are_resubmitted(self):
+        for lost in (BrokenProcessPool("worker died"), "cancelled"):
+            broken, fresh = FakePool(lost), FakePool({"xform": "<h:html/>"})
+            self.use_pools(broken, fresh)
+            self.assertEqual(self.run_conversion(), {"xform": "<h:html/>"})
+            broken.shutdown.assert_called_once()
+            broken.worker.terminate.assert_not_called()
+            # Never converted in the web process
+            self.convert.assert_not_called()
+            xlsform._pool = None
+
+    def test_gives_up_when_the_fresh_pool_is_lost_too(self):
+        self.use_pools(FakePool(BrokenProcessPool()), FakePool(BrokenProcessPool()))
+        with self.assertRaises(ODKValidationError):
+            self.run_conversion()
+        self.convert.assert_not_called()
+
+    def test_timeout_stops_the_workers_of_its_pool(self):
+        stuck = FakePool(None)
+        self.use_pools(stuck)
+        with self.assertRaises(ODKValidationError) as raised:
+            self.run_conversion()
+        self.assertIn("timed out", str(raised.exception))
+        stuck.worker.terminate.assert_called_once()
+        self.assertIsNone(xlsform._pool)
+
+    def test_reset_leaves_a_pool_already_replaced_alone(self):
+        old, current = FakePool(None), FakePool(None)
+        xlsform._pool = current
+        xlsform._reset_pool(old, terminate=True)
+        self.assertIs(xlsform._pool, current)
+        current.shutdown.assert_not_called()
+        current.worker.terminate.assert_not_called()
@@ -16,12 +16,17 @@ from core_apps.odk.views import (
     FormSubmissionsExportView,
     FormSubmissionsListView,
     FormVersionsView,
+    FormVersionDiffView,
     FormVersionXMLView,
     FormXLSXDownloadView,
     MatrixView,
     ODKProjectListView,
+    ODKProjectSummaryView,
     ProjectFormsListView,
     SubmissionsDataView,
+    FormSubmissionsAnalyticsView,
+    FormSubmissionsGeoJSONView,
+    FormSubmissionsGeoTileView,
     RevokeAccessLinkView
 )
 
@@ -29,6 +34,12 @@ app_name = "odk"
 
 urlpatterns = [
     path("projects", ODKProjectListView.as_view(), name="projects-list"),
+    # Project dashboard: project, forms, app users and public links at once
+    path(
+        "projects/<int:project_id>/summary/",
+        ODKProjectSummaryView.as_view(),
+        name="project-summary",
+    ),
     # # Forms
     path("projects/<int:project_id>/forms/", FormCreateView.as_view(), name="add-form"),
     # List forms in a project
@@ -72,6 +83,23 @@ urlpatterns = [
         SubmissionsDataView.as_view(),
         name="submissions-json",
     ),
+    # Submission statistics (per day, enumerator, review state, choices)
+    path(
+        "projects/<int:project_id>/forms/<str:form_id>/analytics/",
+        FormSubmissionsAnalyticsView.as_view(),
+        name="submissions-analytics",
+    ),
+    # Submissions map: GeoJSON in a bounding box and clustered tiles
+    path(
+        "projects/<int:project_id>/forms/<str:form_id>/geo/",
+        FormSubmissionsGeoJSONView.as_view(),
+        name="submissions-geojson",
+    ),
+    path(
+        "projects/<int:project_id>/forms/<str:form_id>/geo/tiles/<int:z>/<int:x>/<int:y>/",
+        FormSubmissionsGeoTileView.as_view(),
+        name="submissions-geo-tile",
+    ),
     # Submission details
     path(
         "projects/<int:project_id>/forms/<str:form_id>/submissions/<str:instance_id>/",
@@ -136,6 +164,12 @@ urlpatterns = [
         FormVersionsView.as_view(),
         name="form-versions",
     ),
+    # Structural diff between two versions (?from=&to=)
+    path(
+        "projects/<int:project_id>/forms/<str:form_id>/versions/diff/",
+        FormVersionDiffView.as_view(),
+        name="form-version-diff",
+    ),
     # XML for a specific version
     path(
         "projects/<int:project_id>/forms/<str:form_id>/versions/<str:version>.xml",
@@ -1,29 +1,27 @@
 import base64
 import json
 import logging
-import os
 import zlib
+from functools import lru_cache
 from io import BytesIO
 
+from django.conf import settings
+
 import requests
 import segno
-from dotenv import load_dotenv
 from urllib3.exceptions import InsecureRequestWarning
 
-from config.env import CUR_ENV_FILE
-
 logger = logging.getLogger(__name__)
 
-if os.path.isfile(CUR_ENV_FILE):
-    load_dotenv(CUR_ENV_FILE)
-
 
+@lru_cache(maxsize=1)
 def get_ssl_verify():
     """
     Determine if SSL verification should be used for ODK requests.
-    For development environments, this can be disabled via an environment variable.
+    For development environments, this can be disabled via the ODK_VERIFY_SSL
+    environment variable. Resolved once per process.
     """
-    verify_ssl = os.getenv("ODK_VERIFY_SSL", "True").lower() in ("true", "1", "t")
+    verify_ssl = getattr(settings, "ODK_VERIFY_SSL", True)
 
     if not verify_ssl:
         # Suppress only the single warning from urllib3 needed.
@@ -35,17 +33,66 @@ def get_ssl_verify():
     return verify_ssl
 
 
+# Path segments of the ODK Central API followed by an identifier, and the
+# placeholder used for that identifier in endpoint templates
+ODK_ENDPOINT_PLACEHOLDERS = {
+    "projects": "{projectId}",
+    "forms": "{xmlFormId}",
+    "submissions": "{instanceId}",
+    "versions": "{version}",
+    "sessions": "{token}",
+    "app-users": "{actorId}",
+    "app-user": "{actorId}",
+    "public-links": "{linkId}",
+}
+ODK_ENDPOINT_SUFFIXES = (".svc", ".xml", ".xlsx", ".csv.zip", ".csv")
+
+
+def get_endpoint_template(endpoint: str) -> str:
+    """
+    Replace the identifiers of an ODK Central endpoint with placeholders,
+    e.g. ``projects/3/forms/survey/versions/1.2.xml`` becomes
+    ``projects/{projectId}/forms/{xmlFormId}/versions/{version}.xml``.
+    """
+    segments = endpoint.split("?", 1)[0].strip("/").split("/")
+    template = []
+    previous = None
+    for segment in segments:
+        placeholder = ODK_ENDPOINT_PLACEHOLDERS.get(previous)
+        if placeholder and segment not in ODK_ENDPOINT_PLACEHOLDERS:
+            suffix = next((s for s in ODK_ENDPOINT_SUFFIXES if segment.endswith(s)), "")
+            template.append(f"{placeholder}{suffix}")
+        else:
+            template.append(segment)
+        previous = segment
+    return "/".join(template)
+
+
+def get_endpoint_class(endpoint: str) -> str:
+    """
+    Group ODK Central endpoints into coarse classes (projects, forms, submissions,
+    odata, export...) so that a failing family of endpoints can be isolated.
+    """
+    template = get_endpoint_template(endpoint)
+    if ".svc" in template:
+        return "odata"
+    if template.endswith((".csv", ".csv.zip")):
+        return "export"
+    resources = [s for s in template.split("/") if not s.startswith("{")]
+    return resources[-1] if resources else "root"
+
+
 def generate_odk_qr_code(server_url, app_user_token, project_id, project_name):
     """Génère un QR code pour la configuration ODK Collect"""
     # Préparation des données à encoder
-    settings = {
+    collect_settings = {
         "general": {
             "server_url": f"{server_url}/v1/key/{app_user_token}/projects/{project_id}"
         },
         "admin": {},
         "project": {"name": project_name},
     }
-    compressed = zlib.compress(json.dumps(settings).encode("utf-8"))
+    compressed = zlib.compress(json.dumps(collect_settings).encode("utf-8"))
     qr_data = base64.b64encode(compressed)
 
     # Génération du QR code
@@ -1,8 +1,10 @@
 from .accessViews import CreateListAccessView, RevokeAccessLinkView
+from .batchViews import BatchView
 from .draftViews import (
     FormDraftPublishView,
     FormDraftSubmissionsView,
     FormDraftView,
+    FormVersionDiffView,
     FormVersionsView,
     FormVersionXMLView,
 )
@@ -13,9 +15,12 @@ from .formViews import (
     FormXLSXDownloadView,
     ProjectFormsListView,
 )
-from .projectViews import ODKProjectListView
+from .geoViews import FormSubmissionsGeoJSONView, FormSubmissionsGeoTileView
+from .metricsViews import MetricsView
+from .projectViews import ODKProjectListView, ODKProjectSummaryView
 from .submissionViews import (
     FormSubmissionDetailView,
+    FormSubmissionsAnalyticsView,
     FormSubmissionsExportView,
     FormSubmissionsListView,
     SubmissionsDataView,
@@ -30,6 +35,7 @@ from .userViews import (
 
 __all__ = [
     "ODKProjectListView",
+    "ODKProjectSummaryView",
     "FormCreateView",
     "ProjectFormsListView",
     "AppUserCreateView",
@@ -39,16 +45,22 @@ __all__ = [
     "FormDraftPublishView",
     "FormDraftSubmissionsView",
     "FormVersionsView",
+    "FormVersionDiffView",
     "FormVersionXMLView",
     "FormDetailView",
     "FormDeleteView",
     "FormSubmissionsListView",
     "FormSubmissionsExportView",
     "FormSubmissionDetailView",
+    "FormSubmissionsAnalyticsView",
+    "FormSubmissionsGeoJSONView",
+    "FormSubmissionsGeoTileView",
     "CreateListAccessView",
     "RevokeAccessLinkView",
     "AppUsersFormView",
     "MatrixView",
     "SubmissionsDataView",
     "FormXLSXDownloadView",
+    "MetricsView",
+    "BatchView",
 ]
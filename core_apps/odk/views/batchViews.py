@@ -0,0 +1,34 @@
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core_apps.odk.batch import run_batch, validate_batch
+
+logger = logging.getLogger(__name__)
+
+
+class BatchView(APIView):
+    """
+    Run several GET requests of the ODK API in one call:
+    {"requests": [{"id": "forms", "path": "/api/v1/odk/projects/1/forms"}, ...]}.
+    The caller is authenticated once; each item comes back with its own
+    status and JSON body, in the order of the request.
+    """
+
+    # Shared by all the sub-requests of the batch
+    odk_deadline = 120
+
+    def post(self, request):
+        items = request.data.get("requests") if isinstance(request.data, dict) else None
+        if error := validate_batch(items):
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response({"responses": run_batch(request, items)})
+        except Exception as e:
+            logger.error(f"Error running batch: {e}")
+            return Response(
+                {"error": "Unable to run batch", "detail": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
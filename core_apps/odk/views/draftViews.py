@@ -1,13 +1,20 @@
 import logging
 from django.http import HttpResponse
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from core_apps.common.renderers import GenericJSONRenderer
 from core_apps.odk.services import ODKCentralService
-from core_apps.odk.services.exceptions import ODKValidationError
+from core_apps.odk.xform import diff_xform_trees, get_cached_version_tree
+from core_apps.odk.xlsform import is_xlsform, validate_xlsform
+from core_apps.odk.services.exceptions import (
+    ODKServiceUnavailableError,
+    ODKValidationError,
+)
 from core_apps.projects.models import Projects
 from ..cache import ODKCacheManager
+from ..mixins import StaleFallbackMixin
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +88,16 @@ class FormDraftView(APIView):
         form_data = form_file.read()
         ignore_warnings = request.query_params.get("ignore_warnings", "false") == "true"
 
+        # Reject invalid XLSForms before leasing an ODK account
+        if is_xlsform(filename):
+            try:
+                validate_xlsform(form_data, filename, ignore_warnings=ignore_warnings)
+            except ODKValidationError as e:
+                return e.to_response(
+                    error_message="Form validation error",
+                    log_message=f"XLSForm validation error during draft upload: {e}",
+                )
+
         try:
             with ODKCentralService(request.user, request=request) as odk_service:
                 odk_project_id = django_project.odk_id
@@ -228,7 +245,7 @@ class FormDraftSubmissionsView(APIView):
             )
 
 
-class FormVersionsView(APIView):
+class FormVersionsView(StaleFallbackMixin, APIView):
     """View for form version management"""
 
     renderer_classes = [GenericJSONRenderer]
@@ -253,9 +270,13 @@ class FormVersionsView(APIView):
                     )
 
                 versions = odk_service.get_form_versions(odk_project_id, form_id)
+                payload = {"results": versions}
+                self.remember_payload("versions", f"{project_id}/{form_id}", payload)
 
-                return Response({"results": versions}, status=status.HTTP_200_OK)
+                return Response(payload, status=status.HTTP_200_OK)
 
+        except ODKServiceUnavailableError as e:
+            return self.stale_response("versions", f"{project_id}/{form_id}", e)
         except Exception as e:
             logger.error(f"Error getting form versions: {e}")
             return Response(
@@ -265,11 +286,31 @@ class FormVersionsView(APIView):
 
 
 class FormVersionXMLView(APIView):
-    """View for retrieving XML of a specific version"""
+    """
+    View for retrieving XML of a specific version.
+
+    Published versions never change: the XML is cached forever after the first
+    download and served with a strong ETag (its SHA-256), so repeat downloads
+    cost no ODK call and, with If-None-Match, no body.
+    """
 
     renderer_classes = [GenericJSONRenderer]
     object_label = "form_version_xml"
 
+    @staticmethod
+    def _xml_response(request, form_id, version, digest, xml_data=None):
+        etag = quote_etag(digest)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(xml_data, content_type="application/xml")
+            response["Content-Disposition"] = (
+                f'attachment; filename="{form_id}_v{version}.xml"'
+            )
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, max-age=31536000, immutable"
+        return response
+
     def get(self, request, project_id, form_id, version):
         """Retrieve XML for a specific form version"""
         try:
@@ -279,6 +320,14 @@ class FormVersionXMLView(APIView):
                 {"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
+        # Served from the cache without leasing an ODK account
+        if django_project.odk_id:
+            cached = ODKCacheManager.get_form_version_xml(
+                django_project.odk_id, form_id, version
+            )
+            if cached:
+                return self._xml_response(request, form_id, version, *cached)
+
         try:
             with ODKCentralService(request.user, request=request) as odk_service:
                 odk_project_id = django_project.odk_id
@@ -291,11 +340,10 @@ class FormVersionXMLView(APIView):
                 xml_data = odk_service.get_form_version_xml(
                     odk_project_id, form_id, version
                 )
-                response = HttpResponse(xml_data, content_type="application/xml")
-                response["Content-Disposition"] = (
-                    f'attachment; filename="{form_id}_v{version}.xml"'
-                )
-                return response
+                digest = ODKCacheManager.get_form_version_digest(
+                    odk_project_id, form_id, version
+                ) or ODKCacheManager.get_content_digest(xml_data)
+                return self._xml_response(request, form_id, version, digest, xml_data)
         except ODKValidationError:
             raise
         except Exception as e:
@@ -304,3 +352,59 @@ class FormVersionXMLView(APIView):
                 {"error": "Unable to get form version XML", "detail": str(e)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+
+class FormVersionDiffView(APIView):
+    """
+    Structural diff between two published versions of a form: questions
+    added, removed and changed (type, label, constraints, choices...).
+    Parsed versions are cached forever, so only unseen versions cost an ODK call.
+    """
+
+    renderer_classes = [GenericJSONRenderer]
+    object_label = "form_version_diff"
+
+    def get(self, request, project_id, form_id):
+        """Compare the `from` and `to` versions given in the query string"""
+        old_version = request.query_params.get("from")
+        new_version = request.query_params.get("to")
+        if old_version is None or new_version is None:
+            return Response(
+                {"error": "The 'from' and 'to' versions are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            django_project = Projects.objects.get(pkid=project_id)
+        except Projects.DoesNotExist:
+            return Response(
+                {"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        odk_project_id = django_project.odk_id
+        if not odk_project_id:
+            return Response(
+                {"error": "ODK project not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            trees = [
+                get_cached_version_tree(odk_project_id, form_id, version)
+                for version in (old_version, new_version)
+            ]
+            if None in trees:
+                with ODKCentralService(request.user, request=request) as odk_service:
+                    trees = [
+                        odk_service.get_form_version_tree(
+                            odk_project_id, form_id, version
+                        )
+                        for version in (old_version, new_version)
+                    ]
+            return Response(diff_xform_trees(*trees), status=status.HTTP_200_OK)
+        except ODKValidationError:
+            raise
+        except Exception as e:
+            logger.error(f"Error comparing form versions: {e}")
+            return Response(
+                {"error": "Unable to compare form versions", "detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
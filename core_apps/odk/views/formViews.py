@@ -5,13 +5,18 @@ from django.http import HttpResponse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from core_apps.odk.services.exceptions import ODKValidationError
+from core_apps.odk.services.exceptions import (
+    ODKServiceUnavailableError,
+    ODKValidationError,
+)
 from core_apps.common.renderers import GenericJSONRenderer
 from core_apps.odk.services import ODKCentralService
+from core_apps.odk.warming import load_project_forms, record_access, warming_enabled
+from core_apps.odk.xlsform import is_xlsform, validate_xlsform
 from core_apps.projects.models import Projects
 
 from ..cache import ODKCacheManager
-from ..mixins import ProjectValidationMixin
+from ..mixins import ProjectValidationMixin, StaleFallbackMixin
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +26,8 @@ class FormCreateView(APIView):
         GenericJSONRenderer,
     ]
     object_label = "project_form"
+    # Uploads are converted, validated and pushed to ODK Central
+    throttle_cost = 50
     # permission_classes = [IsAuthenticated]
 
     def post(self, request, project_id):
@@ -63,6 +70,10 @@ class FormCreateView(APIView):
             )
             publish = request.query_params.get("publish", "false").lower() == "true"
 
+            # Reject invalid XLSForms before leasing an ODK account
+            if is_xlsform(filename):
+                validate_xlsform(form_data, filename, ignore_warnings=ignore_warnings)
+
             # Appel du service ODK
             with ODKCentralService(request.user, request=request) as odk_service:
                 try:
@@ -140,11 +151,13 @@ class FormCreateView(APIView):
             logger.error(f"Error rolling back ODK project creation: {rollback_error}")
 
 
-class ProjectFormsListView(APIView):
+class ProjectFormsListView(StaleFallbackMixin, APIView):
     renderer_classes = [
         GenericJSONRenderer,
     ]
     object_label = "project_forms"
+    # One submissions read per form when not cached
+    throttle_cost = 10
     # permission_classes = [IsAuthenticated]
 
     def get(self, request, project_id):
@@ -159,22 +172,31 @@ class ProjectFormsListView(APIView):
                 return Response(
                     {"error": "Project not found"}, status=status.HTTP_404_NOT_FOUND
                 )
+            record_access("forms", request.user.id, django_project.odk_id)
+            # Only warming keeps the cached counts up to date with submissions
+            # made outside of this API (ODK Collect...)
+            if warming_enabled() and (
+                cached_forms := ODKCacheManager.get_cached_project_forms(
+                    request.user.id, django_project.odk_id
+                )
+            ):
+                return Response(
+                    {"count": len(cached_forms), "forms": cached_forms, "cached": True},
+                    status=status.HTTP_200_OK,
+                )
             # Appel du service ODK
             with ODKCentralService(request.user, request=request) as odk_service:
                 try:
-                    forms = odk_service.get_project_forms(django_project.odk_id)
-
-                    for form in forms:
-                        form["publish"] = form.get("publishedAt") is not None
-                        if form.get("publishedAt") is None:
-                            form["submissions"] = 0
-                        else:
-                            form["submissions"]= len(odk_service.get_form_submissions(django_project.odk_id, form["xmlFormId"]))
-                    return Response(
-                        {"count": len(forms), "forms": forms}, status=status.HTTP_200_OK
+                    forms = load_project_forms(
+                        odk_service, request.user.id, django_project.odk_id
                     )
+                    payload = {"count": len(forms), "forms": forms}
+                    self.remember_payload("forms", project_id, payload)
+                    return Response(payload, status=status.HTTP_200_OK)
                 except Exception as e:
                     raise e
+        except ODKServiceUnavailableError as e:
+            return self.stale_response("forms", project_id, e)
         except Exception as e:
             logger.error(f"Error listing forms: {e}")
             return Response(
@@ -186,7 +208,7 @@ class ProjectFormsListView(APIView):
             )
 
 
-class FormDetailView(APIView):
+class FormDetailView(StaleFallbackMixin, APIView):
     renderer_classes = [
         GenericJSONRenderer,
     ]
@@ -209,6 +231,9 @@ class FormDetailView(APIView):
             with ODKCentralService(request.user, request=request) as odk_service:
                 try:
                     form_details = odk_service.get_form(django_project.odk_id, form_id)
+                    self.remember_payload(
+                        "form", f"{project_id}/{form_id}", form_details
+                    )
                     return Response(form_details, status=status.HTTP_200_OK)
                 except Exception as e:
                     if "404" in str(e):
@@ -217,6 +242,8 @@ class FormDetailView(APIView):
                             status=status.HTTP_404_NOT_FOUND,
                         )
                     raise e
+        except ODKServiceUnavailableError as e:
+            return self.stale_response("form", f"{project_id}/{form_id}", e)
         except Exception as e:
             logger.error(f"Error retrieving form details: {e}")
             return Response(
@@ -274,6 +301,8 @@ class FormDeleteView(APIView):
 class FormXLSXDownloadView(ProjectValidationMixin, APIView):
     """Download the XLSX source of a Form from ODK Central and stream it to the client."""
 
+    throttle_cost = 20
+
     def get(self, request, project_id: int, form_id: str):
         project, error_response = self.validate_project(project_id)
         if error_response:
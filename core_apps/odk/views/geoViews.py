@@ -0,0 +1,114 @@
+import logging
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core_apps.odk.geo import (
+    clustered_tile,
+    features_in_bbox,
+    get_cached_geo_index,
+    get_geo_index,
+)
+from core_apps.odk.mixins import ProjectValidationMixin
+from core_apps.odk.services.exceptions import (
+    ODKServiceUnavailableError,
+    ODKValidationError,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class GeoIndexMixin(ProjectValidationMixin):
+    """
+    Spatial index of a form's submissions, served from the cache while fresh
+    or being updated, and updated incrementally otherwise (see
+    core_apps.odk.geo.get_geo_index). When ODK Central is unavailable, the
+    last index is used as is.
+    """
+
+    # The first indexing reads the whole OData feed
+    odk_deadline = 300
+    throttle_cost = 20
+
+    def load_geo_index(self, request, odk_project_id, form_id):
+        full = request.query_params.get("refresh") == "full"
+        try:
+            return get_geo_index(
+                request.user, odk_project_id, form_id, full=full, request=request
+            )
+        except ODKServiceUnavailableError:
+            index = get_cached_geo_index(odk_project_id, form_id)
+            if index is None:
+                raise
+            logger.warning(f"ODK Central unavailable, stale geo index for {form_id}")
+            return index
+
+    def geo_response(self, request, project_id, form_id, build):
+        django_project, error_response = self.validate_project(project_id)
+        if error_response:
+            return error_response
+        odk_project_id = django_project.odk_id
+        if not odk_project_id:
+            return Response(
+                {"error": "ODK project not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        try:
+            index = self.load_geo_index(request, odk_project_id, form_id)
+            return Response(build(index), status=status.HTTP_200_OK)
+        except ODKServiceUnavailableError as e:
+            return Response(
+                {"error": "ODK Central is unavailable", "detail": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        except ODKValidationError:
+            raise
+        except Exception as e:
+            logger.error(f"Error building submissions map: {e}")
+            return Response(
+                {"error": "Unable to build submissions map", "detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+
+class FormSubmissionsGeoJSONView(GeoIndexMixin, APIView):
+    """
+    GeoJSON of the geopoint, geotrace and geoshape answers of a form inside
+    ?bbox=west,south,east,north (the whole world by default), capped at
+    ODK_GEO_MAX_FEATURES features
+    """
+
+    def get(self, request, project_id, form_id):
+        bbox = request.query_params.get("bbox", "-180,-90,180,90")
+        try:
+            bbox = tuple(float(value) for value in bbox.split(","))
+            if len(bbox) != 4:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {"error": "bbox must be west,south,east,north in degrees"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return self.geo_response(
+            request, project_id, form_id, lambda index: features_in_bbox(index, bbox)
+        )
+
+
+class FormSubmissionsGeoTileView(GeoIndexMixin, APIView):
+    """Web Mercator tile z/x/y of a form's submissions, points clustered"""
+
+    # A map view loads a few dozen tiles, served from the cached index
+    throttle_cost = 2
+
+    def get(self, request, project_id, form_id, z, x, y):
+        if z > 22 or x >= 2**z or y >= 2**z:
+            return Response(
+                {"error": "Invalid tile coordinates"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return self.geo_response(
+            request,
+            project_id,
+            form_id,
+            lambda index: clustered_tile(index, z, x, y),
+        )
@@ -0,0 +1,36 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+
+from core_apps.odk.metrics import get_metrics_registry
+
+
+class MetricsView(APIView):
+    """
+    Prometheus metrics, protected by PROMETHEUS_METRICS_TOKEN. Without a token
+    the endpoint only exists in DEBUG, never on a production host.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = []
+
+    def get(self, request):
+        token = getattr(settings, "PROMETHEUS_METRICS_TOKEN", None)
+        if token:
+            provided = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(provided, f"Bearer {token}"):
+                return HttpResponse(status=401)
+        elif not settings.DEBUG:
+            # Fail closed: unprotected metrics are not published
+            return HttpResponse(status=404)
+
+        return HttpResponse(
+            generate_latest(get_metrics_registry()),
+            content_type=CONTENT_TYPE_LATEST,
+        )
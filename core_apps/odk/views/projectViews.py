@@ -5,18 +5,23 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from core_apps.common.renderers import GenericJSONRenderer
+from core_apps.odk.dashboard import build_project_summary, get_cached_project_summary
 from core_apps.odk.services import ODKCentralService
+from core_apps.odk.services.exceptions import ODKServiceUnavailableError
+from core_apps.odk.warming import load_user_projects, record_access
 
 from ..cache import ODKCacheManager
+from ..mixins import ProjectValidationMixin, StaleFallbackMixin
 
 logger = logging.getLogger(__name__)
 
 
-class ODKProjectListView(APIView):
+class ODKProjectListView(StaleFallbackMixin, APIView):
     renderer_classes = [GenericJSONRenderer]
     object_label = "odkProjects"
 
     def get(self, request):
+        record_access("projects", request.user.id)
         if cached_projects := ODKCacheManager.get_cached_user_projects(request.user.id):
             # Retourne les données en cache
             return Response(
@@ -32,10 +37,11 @@ class ODKProjectListView(APIView):
         # Sinon, récupère depuis ODK avec le pool de comptes
         try:
             with ODKCentralService(request.user, request=request) as odk_service:
-                projects = odk_service.get_projects()
-
-                # Met en cache le résultat
-                ODKCacheManager.cache_user_projects(request.user.id, projects)
+                # Récupère et met en cache le résultat
+                projects = load_user_projects(odk_service, request.user.id)
+                self.remember_payload(
+                    "projects", None, {"count": len(projects), "results": projects}
+                )
 
                 return Response(
                     {
@@ -47,9 +53,73 @@ class ODKProjectListView(APIView):
                     status=status.HTTP_200_OK,
                 )
 
+        except ODKServiceUnavailableError as e:
+            return self.stale_response(
+                "projects",
+                None,
+                e,
+                extra={"userRole": request.user.profile.get_odk_role_display()},
+            )
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des projets ODK: {e}")
             return Response(
                 {"error": "Impossible de récupérer les projets", "detail": str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class ODKProjectSummaryView(StaleFallbackMixin, ProjectValidationMixin, APIView):
+    """
+    Project dashboard in one call: project, forms with submission counts, app
+    users and public links, read concurrently from ODK Central and cached
+    until the project changes
+    """
+
+    renderer_classes = [GenericJSONRenderer]
+    object_label = "summary"
+    throttle_cost = 5
+
+    def get(self, request, project_id):
+        django_project, error_response = self.validate_project(project_id)
+        if error_response:
+            return error_response
+        odk_project_id = django_project.odk_id
+        if not odk_project_id:
+            return Response(
+                {"error": "ODK project not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        if summary := get_cached_project_summary(odk_project_id):
+            return Response({**summary, "cached": True}, status=status.HTTP_200_OK)
+
+        try:
+            summary = build_project_summary(
+                request.user, odk_project_id, request=request
+            )
+            if not summary["errors"]:
+                # App user tokens and public link tokens are credentials
+                self.remember_payload(
+                    "project_summary",
+                    project_id,
+                    {
+                        **summary,
+                        "app_users": [
+                            {
+                                key: value
+                                for key, value in app_user.items()
+                                if key != "token"
+                            }
+                            for app_user in summary["app_users"]
+                        ],
+                        "public_links": {},
+                    },
+                )
+            return Response({**summary, "cached": False}, status=status.HTTP_200_OK)
+        except ODKServiceUnavailableError as e:
+            return self.stale_response("project_summary", project_id, e)
+        except Exception as e:
+            logger.error(f"Erreur lors du résumé du projet ODK {project_id}: {e}")
+            return Response(
+                {"error": "Impossible de résumer le projet", "detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
@@ -1,21 +1,54 @@
+import json
 import logging
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from core_apps.common.renderers import GenericJSONRenderer
-from core_apps.odk.mixins import ProjectValidationMixin
+from core_apps.odk.analytics import (
+    format_analytics,
+    get_cached_analytics,
+    is_fresh,
+    update_form_analytics,
+)
+from core_apps.odk.cache import ODKCacheManager
+from core_apps.odk.flatten import (
+    collect_flat_tables,
+    get_repeat_tables,
+    iter_flat_tables,
+)
+from core_apps.odk.mixins import ProjectValidationMixin, StaleFallbackMixin
+from core_apps.odk.schema import dataframe_to_bytes
 from core_apps.odk.services import ODKCentralService
-from core_apps.odk.services.exceptions import ODKValidationError
+from core_apps.odk.services.deadline import odk_deadline
+from core_apps.odk.services.exceptions import (
+    ODKServiceUnavailableError,
+    ODKValidationError,
+)
+from core_apps.odk.services.poolServices import BACKGROUND
+from core_apps.odk.snapshots import get_submissions_snapshot, snapshots_enabled
+from core_apps.odk.warming import (
+    load_form_submissions,
+    record_access,
+    warming_enabled,
+)
 
 logger = logging.getLogger(__name__)
 
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
 
-class FormSubmissionsListView(ProjectValidationMixin, APIView):
+class FormSubmissionsListView(StaleFallbackMixin, ProjectValidationMixin, APIView):
     renderer_classes = [GenericJSONRenderer]
     object_label = "submissions"
+    throttle_cost = 10
 
     def get(self, request, project_id, form_id):
         """Retrieve all submissions for a specific form"""
@@ -23,20 +56,38 @@ class FormSubmissionsListView(ProjectValidationMixin, APIView):
         django_project, error_response = self.validate_project(project_id)
         if error_response:
             return error_response
+        odk_project_id = django_project.odk_id
+        if not odk_project_id:
+            return Response(
+                {"error": "ODK project not found"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        record_access("submissions", request.user.id, odk_project_id, form_id)
+        # Only warming keeps the cached list up to date with submissions made
+        # outside of this API (ODK Collect...)
+        if (
+            warming_enabled()
+            and (
+                cached := ODKCacheManager.get_cached_form_submissions(
+                    request.user.id, odk_project_id, form_id
+                )
+            )
+            is not None
+        ):
+            return Response(
+                {"count": len(cached), "results": cached, "cached": True},
+                status=status.HTTP_200_OK,
+            )
         try:
             with ODKCentralService(request.user, request=request) as odk_service:
-                odk_project_id = django_project.odk_id
-                if not odk_project_id:
-                    return Response(
-                        {"error": "ODK project not found"},
-                        status=status.HTTP_404_NOT_FOUND,
-                    )
-
-                submissions = odk_service.get_form_submissions(odk_project_id, form_id)
-                return Response(
-                    {"count": len(submissions), "results": submissions},
-                    status=status.HTTP_200_OK,
+                submissions = load_form_submissions(
+                    odk_service, request.user.id, odk_project_id, form_id
                 )
+                payload = {"count": len(submissions), "results": submissions}
+                self.remember_payload("submissions", f"{project_id}/{form_id}", payload)
+                return Response(payload, status=status.HTTP_200_OK)
+        except ODKServiceUnavailableError as e:
+            return self.stale_response("submissions", f"{project_id}/{form_id}", e)
         except Exception as e:
             logger.error(f"Error getting form submissions: {e}")
             return Response(
@@ -46,10 +97,19 @@ class FormSubmissionsListView(ProjectValidationMixin, APIView):
 
 
 class FormSubmissionsExportView(ProjectValidationMixin, APIView):
-    """Export all submissions of a form as CSV or XLSX"""
+    """
+    Export all submissions of a form as CSV, XLSX or Parquet, from the local
+    Parquet snapshot of the form when ODK_SNAPSHOTS_ENABLED. XLSX exports get
+    one more sheet per repeat group, flattened from the OData feed.
+    """
 
     renderer_classes = [GenericJSONRenderer]
     object_label = "submission"
+    # Large exports legitimately take longer than the default request budget
+    odk_deadline = 300
+    # and must not hold the accounts reserved for page loads
+    odk_lease_priority = BACKGROUND
+    throttle_cost = 200
 
     def post(self, request, project_id, form_id):
         django_project, error_response = self.validate_project(project_id)
@@ -66,21 +126,41 @@ class FormSubmissionsExportView(ProjectValidationMixin, APIView):
                     )
                 to = request.headers["to"] if "to" in request.headers else "csv"
 
-                if to not in ["csv", "xlsx"]:
+                if to not in EXPORT_CONTENT_TYPES:
                     return Response(
                         {
-                            "error": "Invalid format. Supported formats are 'csv' and 'xlsx'."
+                            "error": "Invalid format. Supported formats are 'csv', 'xlsx' and 'parquet'."
                         },
                         status=status.HTTP_400_BAD_REQUEST,
                     )
-                if to == "csv":
-                    contentType = "text/csv"
-                else:
-                    contentType = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                contentType = EXPORT_CONTENT_TYPES[to]
 
-                file_bytes = odk_service.export_submissions(
-                    odk_project_id, form_id, to=to
-                )
+                schema = None
+                if to != "csv" or snapshots_enabled():
+                    try:
+                        schema = odk_service.get_form_schema(odk_project_id, form_id)
+                    except Exception as e:
+                        # Without a schema every column is exported as text
+                        logger.warning(f"No schema for form {form_id}: {e}")
+                repeats = None
+                if to == "xlsx" and schema and schema["repeats"]:
+                    repeats = collect_flat_tables(
+                        odk_service,
+                        odk_project_id,
+                        form_id,
+                        tables=get_repeat_tables(schema),
+                    )
+                if snapshots_enabled():
+                    snapshot, manifest = get_submissions_snapshot(
+                        odk_service, odk_project_id, form_id, schema=schema
+                    )
+                    file_bytes = dataframe_to_bytes(
+                        snapshot.read(manifest=manifest), to, repeats=repeats
+                    )
+                else:
+                    file_bytes = odk_service.export_submissions(
+                        odk_project_id, form_id, to=to, schema=schema, repeats=repeats
+                    )
                 response = HttpResponse(
                     file_bytes,
                     content_type=contentType,
@@ -130,11 +210,31 @@ class FormSubmissionDetailView(ProjectValidationMixin, APIView):
 
 
 class SubmissionsDataView(ProjectValidationMixin, APIView):
+    """
+    OData submissions of a form. With ?flatten=true, the main table and one
+    table per repeat group are streamed flattened, rows linked by KEY and
+    PARENT_KEY as in the CSV export: one NDJSON line {"table", "rows"} per
+    OData page, so that memory stays bounded by the page size.
+    """
+
+    # The whole OData feed of the form
+    throttle_cost = 100
+    odk_deadline = 300
 
     def get(self, request, project_id, form_id):
         project, error_response = self.validate_project(project_id)
         if error_response:
             return error_response
+        if request.query_params.get("flatten") == "true":
+            if not project.odk_id:
+                return Response(
+                    {"error": "ODK project not found"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            return StreamingHttpResponse(
+                self._stream_flat_tables(request, project.odk_id, form_id),
+                content_type="application/x-ndjson",
+            )
         try:
             with ODKCentralService(request.user, request=request) as odk_service:
                 odk_id = project.odk_id
@@ -152,3 +252,76 @@ class SubmissionsDataView(ProjectValidationMixin, APIView):
                 {"error": "Unable to get submissions data", "detail": str(e)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+
+    def _stream_flat_tables(self, request, odk_id, form_id):
+        """
+        Lines of the flattened tables. The stream outlives the view and its
+        middleware: it holds its own ODK account and time budget while it runs.
+        Errors after the first line can only be reported as a last line.
+        """
+        try:
+            with (
+                odk_deadline(self.odk_deadline),
+                ODKCentralService(request.user, request=request) as odk_service,
+            ):
+                schema = odk_service.get_form_schema(odk_id, form_id)
+                for table, df in iter_flat_tables(
+                    odk_service, odk_id, form_id, schema=schema
+                ):
+                    # to_json turns NaN into null and numpy scalars into numbers
+                    rows = df.to_json(orient="records")
+                    yield f'{{"table": {json.dumps(table)}, "rows": {rows}}}\n'
+        except Exception as e:
+            logger.error(f"Error streaming flattened submissions: {e}")
+            error = {"error": "Unable to get submissions data", "detail": str(e)}
+            yield json.dumps(error) + "\n"
+
+
+class FormSubmissionsAnalyticsView(StaleFallbackMixin, ProjectValidationMixin, APIView):
+    """
+    Per-form statistics: submissions per day, per enumerator, per review state
+    and choice distributions of the select questions. Aggregates are kept in
+    the cache and updated with the submissions received since the last call;
+    ?refresh=full queues their recomputation from scratch (as do periodic full
+    refreshes), served once the background task has run.
+    """
+
+    renderer_classes = [GenericJSONRenderer]
+    object_label = "analytics"
+    # The first computation reads the whole OData feed
+    odk_deadline = 300
+    throttle_cost = 20
+
+    def get(self, request, project_id, form_id):
+        django_project, error_response = self.validate_project(project_id)
+        if error_response:
+            return error_response
+        odk_project_id = django_project.odk_id
+        if not odk_project_id:
+            return Response(
+                {"error": "ODK project not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        full = request.query_params.get("refresh") == "full"
+        state = get_cached_analytics(odk_project_id, form_id)
+        if is_fresh(state) and not full:
+            return Response(format_analytics(state), status=status.HTTP_200_OK)
+
+        try:
+            with ODKCentralService(request.user, request=request) as odk_service:
+                state = update_form_analytics(
+                    odk_service, odk_project_id, form_id, full=full
+                )
+                payload = format_analytics(state)
+                self.remember_payload("analytics", f"{project_id}/{form_id}", payload)
+                return Response(payload, status=status.HTTP_200_OK)
+        except ODKServiceUnavailableError as e:
+            return self.stale_response("analytics", f"{project_id}/{form_id}", e)
+        except ODKValidationError:
+            raise
+        except Exception as e:
+            logger.error(f"Error computing submission analytics: {e}")
+            return Response(
+                {"error": "Unable to compute submission analytics", "detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
@@ -7,9 +7,10 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from core_apps.common.renderers import GenericJSONRenderer
-from core_apps.odk.mixins import ProjectValidationMixin
+from core_apps.odk.mixins import ProjectValidationMixin, StaleFallbackMixin
 from core_apps.odk.services import ODKCentralService
 from core_apps.odk.services.appUserServices import ODKAppUserService
+from core_apps.odk.services.exceptions import ODKServiceUnavailableError
 from core_apps.odk.utils import generate_odk_qr_code
 from core_apps.projects.models import Projects
 
@@ -17,11 +18,13 @@ logger = logging.getLogger(__name__)
 
 
 # TODO: Create one class view to do all the job: AppUserView with get, post, delete methods
-class AppUserListView(APIView):
+class AppUserListView(StaleFallbackMixin, APIView):
     renderer_classes = [
         GenericJSONRenderer,
     ]
     object_label = "app_users"
+    # App user tokens are credentials (the QR codes embed them too)
+    stale_excluded_fields = ("token", "qr_code")
 
     def get(self, request, project_id):
         """
@@ -70,12 +73,13 @@ class AppUserListView(APIView):
                             logger.warning(f"Failed to generate QR code: {qr_error}")
                             # Continue without QR code if generation fails
                             pass
-                    return Response(
-                        {"count": len(app_users), "results": app_users},
-                        status=status.HTTP_200_OK,
-                    )
+                    payload = {"count": len(app_users), "results": app_users}
+                    self.remember_payload("app_users", project_id, payload)
+                    return Response(payload, status=status.HTTP_200_OK)
                 except Exception as e:
                     raise e
+        except ODKServiceUnavailableError as e:
+            return self.stale_response("app_users", project_id, e)
         except Exception as e:
             logger.error(f"Error retrieving app users: {e}")
             return Response(
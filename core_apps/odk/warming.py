@@ -0,0 +1,197 @@
+import logging
+from uuid import UUID
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core_apps.odk.cache import ODKCacheManager
+from core_apps.odk.services import ODKCentralService
+from core_apps.odk.services.deadline import check_deadline
+from core_apps.odk.services.exceptions import ODKServiceUnavailableError
+from core_apps.odk.services.poolServices import (
+    BACKGROUND,
+    ODKAccountPool,
+    shared_account,
+)
+
+logger = logging.getLogger(__name__)
+
+# Redis sorted set: "<kind>:<user id>[:<odk project id>[:<form id>]]" -> hits
+HITS_KEY = f"{ODKCacheManager.CACHE_PREFIX}warming_hits"
+
+
+def _get_redis():
+    """Raw Redis client of the default cache, None with other cache backends"""
+    try:
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+    except (ImportError, NotImplementedError):
+        return None
+
+
+def warming_enabled() -> bool:
+    return getattr(settings, "ODK_WARMING_ENABLED", False)
+
+
+def record_access(kind: str, user_id, *ids) -> None:
+    """
+    Count a read of a cacheable ODK resource (projects, forms or submissions),
+    so that the warming task knows which payloads are worth keeping warm
+    """
+    if not warming_enabled():
+        return
+    client = _get_redis()
+    if client is None:
+        return
+    member = ":".join(str(part) for part in (kind, user_id, *ids))
+    try:
+        client.zincrby(HITS_KEY, 1, member)
+    except Exception as e:
+        # Counting is best effort: never fail the request for it
+        logger.warning(f"Unable to record ODK cache access {member}: {e}")
+
+
+def get_hot_entries(limit: int) -> list[tuple]:
+    """Most read resources, hottest first, as (kind, user id, *ids) tuples"""
+    client = _get_redis()
+    if client is None:
+        return []
+    members = client.zrevrange(HITS_KEY, 0, limit - 1)
+    return [tuple(member.decode().split(":", 3)) for member in members]
+
+
+def decay_hits() -> None:
+    """
+    Halve every counter and drop the cold ones, so that the ranking follows
+    recent traffic and the sorted set stays small
+    """
+    client = _get_redis()
+    if client is None:
+        return
+    pipe = client.pipeline()
+    pipe.zunionstore(HITS_KEY, {HITS_KEY: getattr(settings, "ODK_WARMING_DECAY", 0.5)})
+    pipe.zremrangebyscore(HITS_KEY, 0, getattr(settings, "ODK_WARMING_MIN_HITS", 1))
+    pipe.zremrangebyrank(
+        HITS_KEY, 0, -getattr(settings, "ODK_WARMING_MAX_TRACKED", 1000) - 1
+    )
+    pipe.execute()
+
+
+def load_user_projects(odk_service, user_id) -> list:
+    projects = odk_service.get_projects()
+    ODKCacheManager.cache_user_projects(user_id, projects)
+    return projects
+
+
+def load_project_forms(odk_service, user_id, odk_project_id) -> list:
+    """Forms of a project with their submission counts, as listed by the API"""
+    forms = odk_service.get_project_forms(odk_project_id)
+    for form in forms:
+        form["publish"] = form.get("publishedAt") is not None
+        if form.get("publishedAt") is None:
+            form["submissions"] = 0
+        else:
+            form["submissions"] = len(
+                odk_service.get_form_submissions(odk_project_id, form["xmlFormId"])
+            )
+    ODKCacheManager.cache_project_forms(user_id, odk_project_id, forms)
+    return forms
+
+
+def load_form_submissions(odk_service, user_id, odk_project_id, form_id) -> list:
+    submissions = odk_service.get_form_submissions(odk_project_id, form_id)
+    ODKCacheManager.cache_form_submissions(
+        user_id, odk_project_id, form_id, submissions
+    )
+    return submissions
+
+
+# kind -> (loader, number of ids after the user id)
+WARMERS = {
+    "projects": (load_user_projects, 0),
+    "forms": (load_project_forms, 1),
+    "submissions": (load_form_submissions, 2),
+}
+
+
+def get_entry_key(kind: str, user_id, ids: tuple) -> tuple[str, str]:
+    """Versioned cache key of a tracked payload, and its version scope"""
+    if kind == "projects":
+        scope = "projects"
+        cache_key = ODKCacheManager.get_versioned_key(user_id, "projects", scope=scope)
+    elif kind == "forms":
+        scope = f"project_{ids[0]}"
+        cache_key = ODKCacheManager.get_versioned_key(
+            user_id, "forms", ids[0], scope=scope
+        )
+    else:
+        scope = f"form_{ids[0]}_{ids[1]}"
+        cache_key = ODKCacheManager.get_versioned_key(
+            user_id, "submissions", f"{ids[0]}/{ids[1]}", scope=scope
+        )
+    return cache_key, scope
+
+
+def _needs_warming(cache_key: str) -> bool:
+    """Missing payloads, and those about to expire when the cache tells TTLs"""
+    if not hasattr(cache, "ttl"):
+        return cache.get(cache_key) is None
+    ttl = cache.ttl(cache_key)
+    # django-redis: 0 when the key does not exist, None without expiry
+    return ttl is not None and ttl < getattr(settings, "ODK_WARMING_REFRESH_AHEAD", 60)
+
+
+def warm_caches(scopes=None) -> dict:
+    """
+    Reload the cached payloads of the ODK_WARMING_TOP_N most read resources
+    that are missing or about to expire; with `scopes`, only those depending
+    on these cache versions (just bumped by the audit poller). Runs on one
+    background account of this worker process's pool, taken only if one is
+    free there: the pool is per process, so this does not see the leases of
+    the web processes, and ODK_POOL_CLASS_LIMITS and the rate limits are what
+    keep warming from crowding ODK Central.
+    """
+    entries = get_hot_entries(getattr(settings, "ODK_WARMING_TOP_N", 50))
+    due = []
+    for kind, user_id, *ids in entries:
+        if kind not in WARMERS or len(ids) != WARMERS[kind][1]:
+            continue
+        cache_key, scope = get_entry_key(kind, user_id, ids)
+        if scopes is not None and scope not in scopes:
+            continue
+        if _needs_warming(cache_key):
+            due.append((WARMERS[kind][0], UUID(user_id), ids))
+    if not due:
+        return {"warmed": 0, "failed": 0, "postponed": 0}
+
+    account = ODKAccountPool().get_account_nowait(BACKGROUND)
+    if account is None:
+        logger.info("No free ODK account, cache warming postponed")
+        return {"warmed": 0, "failed": 0, "postponed": len(due)}
+
+    users = get_user_model().objects.in_bulk(
+        {user_id for _, user_id, _ in due}, field_name="id"
+    )
+    warmed = failed = 0
+    try:
+        with shared_account(account):
+            for loader, user_id, ids in due:
+                check_deadline("warming the ODK caches")
+                user = users.get(user_id)
+                if user is None:
+                    continue
+                try:
+                    with ODKCentralService(user) as odk_service:
+                        loader(odk_service, user.id, *ids)
+                    warmed += 1
+                except ODKServiceUnavailableError:
+                    raise
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Unable to warm ODK cache {ids}: {e}")
+    finally:
+        ODKAccountPool().return_account(account)
+    logger.info(f"ODK cache warming: {warmed} payload(s) refreshed, {failed} failed")
+    return {"warmed": warmed, "failed": failed, "postponed": 0}
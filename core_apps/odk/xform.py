@@ -0,0 +1,330 @@
+import logging
+import re
+import xml.etree.ElementTree as xEt
+
+from django.core.cache import cache
+
+from core_apps.odk.cache import ODKCacheManager
+
+logger = logging.getLogger(__name__)
+
+XFORMS_NS = "http://www.w3.org/2002/xforms"
+JR_NS = "http://openrosa.org/javarosa"
+H_NS = "http://www.w3.org/1999/xhtml"
+
+# Bump when the tree format changes, so that cached trees are re-parsed
+TREE_FORMAT_VERSION = 1
+TREE_CACHE_PREFIX = f"{ODKCacheManager.CACHE_PREFIX}xform_tree_v{TREE_FORMAT_VERSION}_"
+
+# Body elements that bind a control to an instance node
+CONTROLS = {
+    "input",
+    "select",
+    "select1",
+    "upload",
+    "trigger",
+    "range",
+    "rank",
+}
+# Field attributes compared by diff_xform_trees
+COMPARED_ATTRIBUTES = (
+    "kind",
+    "type",
+    "control",
+    "label",
+    "hint",
+    "appearance",
+    "required",
+    "relevant",
+    "constraint",
+    "constraint_message",
+    "calculate",
+    "readonly",
+    "default",
+)
+
+_ITEXT_REF = re.compile(r"jr:itext\(\s*'([^']+)'\s*\)")
+_INSTANCE_REF = re.compile(r"instance\(\s*'([^']+)'\s*\)")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(element) -> str | None:
+    if element is None:
+        return None
+    text = " ".join("".join(element.itertext()).split())
+    return text or None
+
+
+class _XFormParser:
+    """Builds the normalized field tree of an XForm document"""
+
+    def __init__(self, root):
+        self.root = root
+        self.model = root.find(f".//{{{XFORMS_NS}}}model")
+        self.itext = self._parse_itext()
+        self.secondary = {}
+        self.fields = {}
+
+    def _parse_itext(self) -> dict:
+        """Text of each itext id, in the default (or first) language"""
+        translations = self.root.findall(
+            f".//{{{XFORMS_NS}}}itext/{{{XFORMS_NS}}}translation"
+        )
+        if not translations:
+            return {}
+        default = next(
+            (t for t in translations if t.get("default") is not None), translations[0]
+        )
+        texts = {}
+        for text in default.findall(f"{{{XFORMS_NS}}}text"):
+            values = text.findall(f"{{{XFORMS_NS}}}value")
+            # Plain text value first, media forms (image, audio...) otherwise
+            plain = [v for v in values if v.get("form") is None] or values
+            texts[text.get("id")] = _text(plain[0]) if plain else None
+        return texts
+
+    def _label(self, parent, tag: str = "label") -> str | None:
+        element = parent.find(f"{{{XFORMS_NS}}}{tag}")
+        if element is None:
+            return None
+        match = _ITEXT_REF.search(element.get("ref", ""))
+        if match:
+            return self.itext.get(match.group(1))
+        return _text(element)
+
+    def parse(self) -> dict:
+        if self.model is None:
+            raise ValueError("Not an XForm: no <model> element")
+        instances = self.model.findall(f"{{{XFORMS_NS}}}instance")
+        primary = next((i for i in instances if i.get("id") is None), None)
+        if primary is None or not len(primary):
+            raise ValueError("Not an XForm: no primary instance")
+        for instance in instances:
+            if instance.get("id") is not None:
+                self.secondary[instance.get("id")] = instance
+
+        data = primary[0]
+        self._walk_instance(data, f"/{_local(data.tag)}")
+        self._apply_binds()
+        body = self.root.find(f"{{{H_NS}}}body")
+        if body is not None:
+            self._walk_body(body)
+
+        title = self.root.find(f".//{{{H_NS}}}title")
+        return {
+            "form_id": data.get("id"),
+            "version": data.get("version"),
+            "title": _text(title),
+            "fields": list(self.fields.values()),
+        }
+
+    def _walk_instance(self, element, path: str) -> None:
+        for child in element:
+            child_path = f"{path}/{_local(child.tag)}"
+            if child_path in self.fields:
+                # Repeat instances beyond the template
+                continue
+            is_repeat = child.get(f"{{{JR_NS}}}template") is not None
+            if len(child):
+                kind = "repeat" if is_repeat else "group"
+            else:
+                kind = "question"
+            self.fields[child_path] = {
+                "path": child_path,
+                "name": _local(child.tag),
+                "kind": kind,
+                "type": None,
+                "control": None,
+                "label": None,
+                "hint": None,
+                "appearance": None,
+                "required": None,
+                "relevant": None,
+                "constraint": None,
+                "constraint_message": None,
+                "calculate": None,
+                "readonly": None,
+                "default": (
+                    ((child.text or "").strip() or None) if kind == "question" else None
+                ),
+                "choices": None,
+            }
+            if len(child):
+                self._walk_instance(child, child_path)
+
+    def _apply_binds(self) -> None:
+        for bind in self.model.findall(f"{{{XFORMS_NS}}}bind"):
+            field = self.fields.get(bind.get("nodeset"))
+            if field is None:
+                continue
+            field["type"] = bind.get("type", field["type"])
+            for attribute in (
+                "required",
+                "relevant",
+                "constraint",
+                "calculate",
+                "readonly",
+            ):
+                if bind.get(attribute) is not None:
+                    field[attribute] = bind.get(attribute)
+            message = bind.get(f"{{{JR_NS}}}constraintMsg")
+            if message:
+                match = _ITEXT_REF.search(message)
+                field["constraint_message"] = (
+                    self.itext.get(match.group(1)) if match else message
+                )
+
+    def _walk_body(self, element) -> None:
+        for child in element:
+            tag = _local(child.tag)
+            ref = child.get("ref") or child.get("nodeset")
+            field = self.fields.get(ref)
+            if field is not None:
+                if tag in ("group", "repeat"):
+                    # A repeat is wrapped in a group bound to the same node
+                    if tag == "repeat":
+                        field["kind"] = "repeat"
+                    field["label"] = field["label"] or self._label(child)
+                    field["appearance"] = field["appearance"] or child.get("appearance")
+                elif tag in CONTROLS:
+                    field["control"] = tag
+                    field["label"] = self._label(child)
+                    field["hint"] = self._label(child, "hint")
+                    field["appearance"] = child.get("appearance")
+                    if tag in ("select", "select1", "rank"):
+                        field["choices"] = self._choices(child)
+            self._walk_body(child)
+
+    def _choices(self, control) -> list:
+        choices = []
+        for item in control.findall(f"{{{XFORMS_NS}}}item"):
+            choices.append(
+                {
+                    "value": _text(item.find(f"{{{XFORMS_NS}}}value")),
+                    "label": self._label(item),
+                }
+            )
+        itemset = control.find(f"{{{XFORMS_NS}}}itemset")
+        if itemset is not None:
+            choices.extend(self._itemset_choices(itemset))
+        return choices
+
+    def _itemset_choices(self, itemset) -> list:
+        match = _INSTANCE_REF.search(itemset.get("nodeset", ""))
+        instance = self.secondary.get(match.group(1)) if match else None
+        if instance is None:
+            # Choices computed from the primary instance or an external file
+            return []
+        value_element = itemset.find(f"{{{XFORMS_NS}}}value")
+        label_element = itemset.find(f"{{{XFORMS_NS}}}label")
+        value_ref = (
+            value_element.get("ref", "name") if value_element is not None else "name"
+        )
+        label_ref = (
+            label_element.get("ref", "label") if label_element is not None else "label"
+        )
+        itext_label = "itextId" in label_ref
+
+        choices = []
+        for item in instance.iter():
+            if _local(item.tag) != "item":
+                continue
+            values = {_local(child.tag): _text(child) for child in item}
+            if itext_label:
+                label = self.itext.get(values.get("itextId"))
+            else:
+                label = values.get(label_ref)
+            choices.append({"value": values.get(value_ref), "label": label})
+        return choices
+
+
+def parse_xform(xml_data: str | bytes) -> dict:
+    """
+    Parse XForm XML into a normalized tree: form id, version, title and the
+    fields of the primary instance in document order, each with its kind
+    (question, group or repeat), bind attributes, control, label and choices.
+    """
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode("utf-8")
+    return _XFormParser(xEt.fromstring(xml_data)).parse()
+
+
+def get_xform_tree(xml_data: str | bytes) -> dict:
+    """Parsed tree of an XForm, cached forever by the SHA-256 of the XML"""
+    cache_key = f"{TREE_CACHE_PREFIX}{ODKCacheManager.get_content_digest(xml_data)}"
+    tree = ODKCacheManager.get(cache_key)
+    if tree is None:
+        tree = parse_xform(xml_data)
+        cache.set(cache_key, tree, ODKCacheManager.FORM_VERSION_TIMEOUT)
+    return tree
+
+
+def get_cached_version_tree(project_id: int | str, form_id: str, version: str):
+    """Parsed tree of a form version whose XML is already cached, or None"""
+    cached = ODKCacheManager.get_form_version_xml(project_id, form_id, version)
+    return get_xform_tree(cached[1]) if cached else None
+
+
+def _diff_choices(old: list | None, new: list | None) -> dict | None:
+    old_choices = {c["value"]: c["label"] for c in old or []}
+    new_choices = {c["value"]: c["label"] for c in new or []}
+    diff = {
+        "added": [
+            {"value": v, "label": label}
+            for v, label in new_choices.items()
+            if v not in old_choices
+        ],
+        "removed": [
+            {"value": v, "label": label}
+            for v, label in old_choices.items()
+            if v not in new_choices
+        ],
+        "changed": [
+            {"value": v, "from": old_choices[v], "to": label}
+            for v, label in new_choices.items()
+            if v in old_choices and old_choices[v] != label
+        ],
+    }
+    return diff if any(diff.values()) else None
+
+
+def diff_xform_trees(old_tree: dict, new_tree: dict) -> dict:
+    """
+    Structural diff of two parsed versions: fields added, removed, and changed
+    (attribute by attribute, choices by value). Fields are matched by path, so
+    a renamed or moved question shows as removed and added.
+    """
+    old_fields = {f["path"]: f for f in old_tree["fields"]}
+    new_fields = {f["path"]: f for f in new_tree["fields"]}
+
+    changed = []
+    for path, new in new_fields.items():
+        old = old_fields.get(path)
+        if old is None:
+            continue
+        changes = {
+            attribute: {"from": old.get(attribute), "to": new.get(attribute)}
+            for attribute in COMPARED_ATTRIBUTES
+            if old.get(attribute) != new.get(attribute)
+        }
+        choices = _diff_choices(old.get("choices"), new.get("choices"))
+        if changes or choices:
+            changed.append({"path": path, "changes": changes, "choices": choices})
+
+    added = [f for path, f in new_fields.items() if path not in old_fields]
+    removed = [f for path, f in old_fields.items() if path not in new_fields]
+    return {
+        "from_version": old_tree.get("version"),
+        "to_version": new_tree.get("version"),
+        "summary": {
+            "added": len(added),
+            "removed": len(removed),
+            "changed": len(changed),
+        },
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+    }
@@ -0,0 +1,207 @@
+import hashlib
+import logging
+import multiprocessing
+import threading
+import time
+import xml.etree.ElementTree as xEt
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Pool workers import this module to run _convert: keep its imports free of
+# Django models (the services package is imported where errors are raised).
+
+logger = logging.getLogger(__name__)
+
+XLSFORM_EXTENSIONS = frozenset({"xlsx", "xls"})
+CACHE_PREFIX = "odk_xlsform_"
+# Conversions depend only on the file content: keep them for a month
+CACHE_TIMEOUT = 30 * 24 * 3600
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def is_xlsform(filename: str) -> bool:
+    return filename.rsplit(".", 1)[-1].lower() in XLSFORM_EXTENSIONS
+
+
+def get_file_digest(file_content: bytes) -> str:
+    return hashlib.sha256(file_content).hexdigest()
+
+
+def _warm_up() -> None:
+    """Import pyxform once per pool worker instead of on the first conversion"""
+    import pyxform.xls2xform  # noqa: F401
+
+
+def _convert(file_content: bytes, file_type: str) -> dict:
+    """Run pyxform, in a pool worker or in the current process"""
+    from pyxform.xls2xform import convert
+
+    warnings = []
+    try:
+        result = convert(
+            xlsform=BytesIO(file_content), warnings=warnings, file_type=file_type
+        )
+        root = xEt.fromstring(result.xform)
+    except Exception as e:
+        return {"error": str(e), "warnings": warnings}
+
+    # The primary instance is the first child of <instance>
+    instance = root.find(".//{http://www.w3.org/2002/xforms}instance")
+    data = instance[0] if instance is not None and len(instance) else None
+    return {
+        "xform": result.xform,
+        "warnings": warnings,
+        "form_id": data.get("id") if data is not None else None,
+        "version": data.get("version") if data is not None else None,
+    }
+
+
+def get_conversion_pool() -> ProcessPoolExecutor:
+    """Process pool kept warm for conversions, created lazily in each process"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, "ODK_XLSFORM_WORKERS", 2),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up,
+            )
+        return _pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor, terminate: bool = False) -> None:
+    """
+    Drop `pool`, a fresh one is started by the next conversion. Does nothing
+    when another caller already replaced it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not pool:
+            return
+        # shutdown() lets running conversions finish: stop stuck workers
+        workers = list((pool._processes or {}).values()) if terminate else []
+        pool.shutdown(wait=False, cancel_futures=True)
+        for worker in workers:
+            worker.terminate()
+        _pool = None
+
+
+def _run_conversion(file_content: bytes, file_type: str, use_pool: bool) -> dict:
+    """
+    Convert in the pool, within ODK_XLSFORM_CONVERSION_TIMEOUT. A dead worker
+    or another caller's timeout takes the whole pool down: the conversions it
+    cancelled or broke are submitted again to a fresh pool, never run in the
+    web process.
+    """
+    if not use_pool:
+        return _convert(file_content, file_type)
+    timeout = getattr(settings, "ODK_XLSFORM_CONVERSION_TIMEOUT", 60)
+    deadline = time.monotonic() + timeout
+    from core_apps.odk.services.exceptions import ODKValidationError
+
+    for _ in range(2):
+        pool = get_conversion_pool()
+        try:
+            future = pool.submit(_convert, file_content, file_type)
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except (BrokenProcessPool, CancelledError, RuntimeError) as e:
+            # RuntimeError: submitted while another caller shut the pool down
+            logger.warning(f"XLSForm conversion pool lost ({e!r}), resubmitting")
+            _reset_pool(pool)
+        except FuturesTimeoutError:
+            # The worker is still busy with the form: stop it rather than let
+            # it hold a pool slot, and do not cache the failure (load may be
+            # the cause)
+            logger.warning(f"XLSForm conversion timed out after {timeout}s")
+            future.cancel()
+            _reset_pool(pool, terminate=True)
+            raise ODKValidationError(
+                f"XLSForm conversion timed out after {timeout}s",
+                error_detail={
+                    "message": (
+                        f"The XLSForm could not be converted within {timeout} seconds. "
+                        "Check that the form is not unusually large, then try again."
+                    ),
+                    "details": {"error": "conversion timeout"},
+                },
+            )
+    raise ODKValidationError(
+        "XLSForm conversion workers stopped",
+        error_detail={
+            "message": "The XLSForm could not be converted, please try again.",
+            "details": {"error": "conversion workers stopped"},
+        },
+    )
+
+
+def convert_xlsform(file_content: bytes, filename: str, use_pool: bool = True) -> dict:
+    """
+    Convert an XLSForm to XForm, cached by the SHA-256 of the file.
+
+    Returns {"digest", "xform", "warnings", "form_id", "version", "cached"}.
+    Raises ODKValidationError, shaped like ODK Central's errors, when pyxform
+    rejects the form; failures are cached too so that re-uploading the same
+    broken file fails instantly.
+    """
+    digest = get_file_digest(file_content)
+    cache_key = f"{CACHE_PREFIX}{digest}"
+
+    result = cache.get(cache_key)
+    cached = result is not None
+    if not cached:
+        file_type = "." + filename.rsplit(".", 1)[-1].lower()
+        result = _run_conversion(file_content, file_type, use_pool)
+        cache.set(cache_key, result, CACHE_TIMEOUT)
+        logger.debug(f"XLSForm {filename} converted (sha256 {digest[:12]})")
+
+    if "error" in result:
+        from core_apps.odk.services.exceptions import ODKValidationError
+
+        raise ODKValidationError(
+            f"Invalid XLSForm {filename}: {result['error']}",
+            error_detail={
+                "message": "The given XLSForm file was not valid.",
+                "details": {
+                    "error": result["error"],
+                    "warnings": {"xlsFormWarnings": result["warnings"]},
+                },
+            },
+        )
+    return {**result, "digest": digest, "cached": cached}
+
+
+def validate_xlsform(
+    file_content: bytes, filename: str, ignore_warnings: bool = False
+) -> dict:
+    """
+    Validate an XLSForm locally before uploading it to ODK Central, which
+    rejects invalid forms, and forms with warnings unless ignoreWarnings is set.
+    """
+    conversion = convert_xlsform(file_content, filename)
+    if conversion["warnings"] and not ignore_warnings:
+        from core_apps.odk.services.exceptions import ODKValidationError
+
+        raise ODKValidationError(
+            f"XLSForm {filename} has warnings",
+            error_detail={
+                "message": "The XLSForm is valid, but it has warnings.",
+                "details": {
+                    "error": None,
+                    "warnings": {"xlsFormWarnings": conversion["warnings"]},
+                },
+            },
+        )
+    return conversion
+
+
+def get_cached_xform(digest: str) -> str | None:
+    """XForm of an already converted XLSForm, by SHA-256 digest"""
+    result = cache.get(f"{CACHE_PREFIX}{digest}")
+    return result.get("xform") if result else None